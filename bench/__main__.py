@@ -0,0 +1,118 @@
+"""Benchmarks hors ligne : vrais cogs et services, Discord/Postgres/Redis simulés en mémoire.
+
+    python -m bench                         # tous les scénarios, comparés à bench/baselines.json
+    python -m bench --only edits,daily      # un sous-ensemble
+    python -m bench --scale 0.1             # passe rapide (pas de comparaison)
+    python -m bench --send-latency 0.05     # latence simulée des envois Discord
+    python -m bench --update-baseline       # enregistre les résultats comme nouvelle référence
+
+Code de sortie 1 si une métrique régresse de plus de --tolerance par rapport à la référence
+(comparaison seulement si scale, latence et REMINDER_STORE sont ceux de la référence).
+"""
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import gc
+import os
+import platform
+import time
+
+from bench.scenarios import METRICS, SCENARIOS
+from utils.job_queue import REMINDER_MODE
+from utils.reminder_store import REMINDER_STORE
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_TOLERANCE = 0.30  # les machines de dev sont bruyantes
+
+
+def conditions(args) -> dict:
+    return {
+        "scale": args.scale,
+        "send_latency": args.send_latency,
+        "reminder_store": REMINDER_STORE,
+    }
+
+
+def compare(results: dict[str, float], baseline: dict, tolerance: float) -> tuple[list[str], list[str]]:
+    lines, regressions = [], []
+    for name, value in results.items():
+        unit, better = METRICS[name]
+        ref = baseline.get("metrics", {}).get(name)
+        if ref is None:
+            lines.append(f"  {name:<28} {value:>12.2f} {unit:<8} (no baseline)")
+            continue
+        delta = (value - ref) / ref if ref else 0.0
+        worse = -delta if better == "higher" else delta
+        status = "REGRESSION" if worse > tolerance else "ok"
+        if status != "ok":
+            regressions.append(name)
+        lines.append(f"  {name:<28} {value:>12.2f} {unit:<8} baseline {ref:>12.2f}  {delta:+7.1%}  {status}")
+    return lines, regressions
+
+
+async def run(names: list[str], args) -> dict[str, float]:
+    results: dict[str, float] = {}
+    for name in names:
+        gc.collect()
+        started = time.perf_counter()
+        metrics, info = await SCENARIOS[name](args.scale, args.send_latency)
+        print(f"▶ {name} ({time.perf_counter() - started:.1f}s) — {json.dumps(info)}")
+        results.update(metrics)
+    return results
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="scénarios séparés par des virgules")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplie la taille des jeux de données")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="latence simulée d'un envoi Discord (s)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--verbose", action="store_true", help="logs INFO des cogs")
+    args = parser.parse_args(argv)
+
+    # Les refus et salons introuvables simulés loggent en WARNING à chaque edit
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    if REMINDER_MODE != "scheduler":
+        parser.error("the benchmarks cover REMINDER_MODE=scheduler only")
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(run(names, args))
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    current = conditions(args)
+    comparable = baseline.get("conditions") == current
+    lines, regressions = compare(results, baseline if comparable else {}, args.tolerance)
+    print(f"\nPython {platform.python_version()} — {json.dumps(current)}")
+    if baseline and not comparable:
+        print(f"⚠️ Baseline recorded under {json.dumps(baseline.get('conditions'))}, not compared")
+    print("\n".join(lines))
+
+    if args.update_baseline:
+        metrics = {**baseline.get("metrics", {}), **results} if comparable else results
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"conditions": current, "metrics": {k: round(v, 3) for k, v in sorted(metrics.items())}},
+                      f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"💾 Baseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,618 @@
+import time
+import asyncio
+import fnmatch
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+
+import discord
+
+from utils.cluster import RELEASE_SCRIPT, RENEW_SCRIPT
+from utils.reminder_store import CANCEL_SCRIPT, POP_DUE_SCRIPT
+from utils.sharding import shard_for
+
+
+# --- Discord ---
+class FakeResponse:
+    status = 404
+    reason = "Not Found"
+
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str = "user"):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.bot = False
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+
+class FakeMember(FakeUser):
+    """Membre avec DM simulé (latence `send_latency`, échec si `dm_closed`)."""
+
+    def __init__(self, guild: "FakeGuild", user_id: int, send_latency: float = 0.0, dm_closed: bool = False):
+        super().__init__(user_id, f"member-{user_id}")
+        self.guild = guild
+        self.roles: list[FakeRole] = []
+        self.guild_permissions = discord.Permissions.none()
+        self.send_latency = send_latency
+        self.dm_closed = dm_closed
+        self.dm_channel = None
+        self.dms = 0
+
+    async def send(self, content: str = None, **kwargs):
+        await asyncio.sleep(self.send_latency)
+        if self.dm_closed:
+            raise discord.Forbidden(FakeResponse(), "Cannot send messages to this user")
+        self.dms += 1
+
+    async def create_dm(self) -> "FakeMember":
+        return self
+
+    async def add_roles(self, *roles: "FakeRole", reason: str | None = None):
+        await asyncio.sleep(self.send_latency)
+        self.roles += [r for r in roles if r not in self.roles]
+
+    async def remove_roles(self, *roles: "FakeRole", reason: str | None = None):
+        await asyncio.sleep(self.send_latency)
+        self.roles = [r for r in self.roles if r not in roles]
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str = "High Tier"):
+        self.id = role_id
+        self.name = name
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+
+class FakeChannel(discord.TextChannel):
+    """Vrai `discord.TextChannel` pour les isinstance des cogs, sans état de connexion."""
+
+    def __init__(self, guild: "FakeGuild", channel_id: int, name: str, send_latency: float = 0.0):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.send_latency = send_latency
+        self.sent = 0
+        self.last_content: str | None = None
+
+    async def send(self, content: str = None, **kwargs):
+        await asyncio.sleep(self.send_latency)
+        self.sent += 1
+        self.last_content = content
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, name: str | None = None):
+        self.id = guild_id
+        self.name = name or f"guild-{guild_id}"
+        self.shard_id = 0
+        self._members: dict[int, FakeMember] = {}
+        self._channels: dict[int, FakeChannel] = {}
+        self._roles: dict[int, FakeRole] = {}
+
+    @property
+    def members(self) -> list[FakeMember]:
+        return list(self._members.values())
+
+    def add_member(self, member: FakeMember) -> FakeMember:
+        self._members[member.id] = member
+        return member
+
+    def add_channel(self, channel: FakeChannel) -> FakeChannel:
+        self._channels[channel.id] = channel
+        return channel
+
+    def add_role(self, role: FakeRole) -> FakeRole:
+        self._roles[role.id] = role
+        return role
+
+    def get_member(self, user_id: int) -> FakeMember | None:
+        return self._members.get(user_id)
+
+    def get_channel(self, channel_id: int) -> FakeChannel | None:
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id: int) -> FakeRole | None:
+        return self._roles.get(role_id)
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, author: FakeUser, guild: FakeGuild | None, channel: FakeChannel | None,
+                 embeds: list[discord.Embed], content: str = ""):
+        self.id = message_id
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.embeds = embeds
+        self.content = content
+
+
+class FakeInteractionResponse:
+    def __init__(self, send_latency: float = 0.0):
+        self.send_latency = send_latency
+        self.messages: list[str | None] = []
+        self.view = None
+
+    def is_done(self) -> bool:
+        return bool(self.messages)
+
+    async def send_message(self, content: str = None, **kwargs):
+        if self.messages:
+            raise discord.InteractionResponded(None)
+        await asyncio.sleep(self.send_latency)
+        self.messages.append(content)
+        self.view = kwargs.get("view")
+
+    async def edit_message(self, content: str = None, **kwargs):
+        await asyncio.sleep(self.send_latency)
+        self.messages.append(content)
+
+    async def defer(self, **kwargs):
+        await self.send_message(None)
+
+
+class FakeInteraction:
+    """Commande slash déjà résolue : `response` et `followup` enregistrent les réponses."""
+
+    def __init__(self, user: FakeMember, guild: FakeGuild, channel: FakeChannel | None, send_latency: float = 0.0):
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = channel
+        self.channel_id = channel.id if channel else None
+        self.response = FakeInteractionResponse(send_latency)
+        self.followup = channel
+
+
+# --- Postgres ---
+class FakeConnection:
+    def __init__(self, db: "FakeDatabase"):
+        self.db = db
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def fetch(self, sql: str, *args) -> list[dict]:
+        return self.db.run(sql, args) or []
+
+    async def fetchrow(self, sql: str, *args) -> dict | None:
+        rows = self.db.run(sql, args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, sql: str, *args):
+        rows = self.db.run(sql, args)
+        return next(iter(rows[0].values())) if rows else None
+
+    async def execute(self, sql: str, *args) -> str:
+        self.db.run(sql, args)
+        return "OK"
+
+    async def executemany(self, sql: str, args: list[tuple]):
+        for row in args:
+            self.db.run(sql, row)
+
+
+class FakePool:
+    """Remplaçant d'`asyncpg.Pool` : chaque connexion exécute les requêtes nommées sur FakeDatabase."""
+
+    def __init__(self, db: "FakeDatabase", size: int = 10):
+        self.db = db
+        self.size = size
+
+    @asynccontextmanager
+    async def acquire(self):
+        await asyncio.sleep(0)  # un aller-retour de pool cède la main, comme asyncpg
+        yield FakeConnection(self.db)
+
+    def get_size(self) -> int:
+        return self.size
+
+    def get_idle_size(self) -> int:
+        return self.size
+
+    def get_min_size(self) -> int:
+        return self.size
+
+    def get_max_size(self) -> int:
+        return self.size
+
+    async def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Tables en mémoire et requêtes nommées du Repository réimplémentées en Python.
+
+    Le SQL reçu est retrouvé par son nom dans `queries` (le dict du Repository,
+    partagé : les requêtes enregistrées ensuite par les stores sont vues aussi).
+    Seules les requêtes des chemins mesurés par le bench sont couvertes ; une
+    autre lève NotImplementedError.
+    """
+
+    REMINDER_TABLES = {"reminders", "vote_reminders"}
+    REMINDER_OPS = {"upsert", "delete", "get", "due_between", "pop_due", "list_by_guild", "page_by_guild", "count_by_shard"}
+
+    def __init__(self):
+        self.queries: dict[str, str] = {}
+        self._names: dict[str, str] = {}
+        self.calls: dict[str, int] = {}
+        self.reminders: dict[str, dict[tuple, tuple[int, datetime]]] = {}
+        self.subscriptions: dict[int, datetime] = {}
+        self.subscription_codes: dict[str, tuple[int, datetime]] = {}
+        self.daily_subscribers: set[tuple[int, int]] = set()
+        self.daily_log_channels: dict[int, int] = {}
+        self.daily_runs: dict[tuple, datetime | None] = {}
+        self.daily_run_deliveries: dict[tuple, str] = {}
+        self.daily_run_guilds: set[tuple[date, int]] = set()
+        self.guild_config: dict[int, dict] = {}
+
+    def bind(self, queries: dict[str, str]):
+        self.queries = queries
+        self._names = {}
+
+    def _name(self, sql: str) -> str:
+        name = self._names.get(sql)
+        if name is None:
+            self._names = {q: n for n, q in self.queries.items()}
+            name = self._names.get(sql)
+            if name is None:
+                raise NotImplementedError(f"unknown SQL: {sql[:80]}")
+        return name
+
+    def run(self, sql: str, args: tuple) -> list[dict] | None:
+        name = self._name(sql)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        table, _, op = name.rpartition(".")
+        if table in self.REMINDER_TABLES and op in self.REMINDER_OPS:
+            return getattr(self, f"_reminder_{op}")(self.reminders.setdefault(table, {}), args)
+        handler = getattr(self, "_" + name.replace(".", "_"), None)
+        if handler is None:
+            raise NotImplementedError(f"query {name} is not emulated")
+        return handler(*args)
+
+    # --- Tables de rappels (PostgresReminderStore, colonnes de scope en tête) ---
+    @staticmethod
+    def _row(key: tuple, channel_id: int, expire_at: datetime) -> dict:
+        return {"guild_id": key[-2], "user_id": key[-1], "channel_id": channel_id, "expire_at": expire_at}
+
+    def _reminder_upsert(self, rows: dict, args: tuple):
+        *key, channel_id, expire_at = args
+        rows[tuple(key)] = (channel_id, expire_at)
+
+    def _reminder_delete(self, rows: dict, args: tuple):
+        *key, fired_at = args
+        current = rows.get(tuple(key))
+        if current and current[1] <= fired_at:
+            del rows[tuple(key)]
+
+    def _reminder_get(self, rows: dict, args: tuple):
+        current = rows.get(tuple(args))
+        return [self._row(tuple(args), *current)] if current else []
+
+    def _reminder_due_between(self, rows: dict, args: tuple):
+        *scope, start, until, shard_count, shard_ids = args
+        n, owned = len(scope), set(shard_ids)
+        return [
+            self._row(key, ch, exp) for key, (ch, exp) in rows.items()
+            if list(key[:n]) == scope and start < exp <= until and shard_for(key[n], shard_count) in owned
+        ]
+
+    def _reminder_pop_due(self, rows: dict, args: tuple):
+        *scope, now, limit = args
+        n = len(scope)
+        due = sorted(
+            ((key, ch, exp) for key, (ch, exp) in rows.items() if list(key[:n]) == scope and exp <= now),
+            key=lambda item: item[2],
+        )[:limit]
+        for key, _, _ in due:
+            del rows[key]
+        return [self._row(key, ch, exp) for key, ch, exp in due]
+
+    def _reminder_list_by_guild(self, rows: dict, args: tuple):
+        *scope, guild_id = args
+        n = len(scope)
+        return sorted(
+            (self._row(key, ch, exp) for key, (ch, exp) in rows.items() if list(key[:n]) == scope and key[n] == guild_id),
+            key=lambda r: r["expire_at"],
+        )
+
+    def _reminder_page_by_guild(self, rows: dict, args: tuple):
+        *scope, guild_id, after_at, after_user, limit = args
+        n = len(scope)
+        return sorted(
+            (self._row(key, ch, exp) for key, (ch, exp) in rows.items()
+             if list(key[:n]) == scope and key[n] == guild_id and (exp, key[n + 1]) > (after_at, after_user)),
+            key=lambda r: (r["expire_at"], r["user_id"]),
+        )[:limit]
+
+    def _reminder_count_by_shard(self, rows: dict, args: tuple):
+        *scope, shard_count, shard_ids = args
+        n, owned, now = len(scope), set(shard_ids), datetime.now(timezone.utc)
+        counts: dict[int, int] = {}
+        for key, (_, exp) in rows.items():
+            shard_id = shard_for(key[n], shard_count)
+            if list(key[:n]) == scope and exp > now and shard_id in owned:
+                counts[shard_id] = counts.get(shard_id, 0) + 1
+        return [{"shard_id": s, "pending": c} for s, c in sorted(counts.items())]
+
+    # --- Abonnements / configuration ---
+    def _subscriptions_active(self, now):
+        return [{"server_id": g, "expire_at": exp} for g, exp in self.subscriptions.items() if exp > now]
+
+    def _subscriptions_by_server(self, server_id):
+        exp = self.subscriptions.get(server_id)
+        return [{"expire_at": exp}] if exp else []
+
+    def _guild_config_get(self, guild_id):
+        config = self.guild_config.get(guild_id)
+        return [{"guild_id": guild_id, "high_tier_role_id": None, "required_role_id": None, **config}] if config else []
+
+    def _guild_config_set_high_tier_role(self, guild_id, role_id):
+        self.guild_config.setdefault(guild_id, {})["high_tier_role_id"] = role_id
+
+    def _guild_config_set_required_role(self, guild_id, role_id):
+        self.guild_config.setdefault(guild_id, {})["required_role_id"] = role_id
+
+    def _subscriptions_page(self, before_at, before_server, limit):
+        return sorted(({"server_id": g, "expire_at": exp} for g, exp in self.subscriptions.items()
+                       if (exp, g) < (before_at, before_server)),
+                      key=lambda r: (r["expire_at"], r["server_id"]), reverse=True)[:limit]
+
+    def _subscriptions_upsert(self, server_id, expire_at):
+        self.subscriptions[server_id] = expire_at
+
+    def _subscription_codes_redeem(self, code):
+        if code not in self.subscription_codes:
+            return []
+        server_id, expire_at = self.subscription_codes.pop(code)
+        self.subscriptions[server_id] = expire_at
+        return [{"server_id": server_id, "expire_at": expire_at}]
+
+    def _rarities_all(self):
+        return []
+
+    def _daily_log_channels_channel(self, guild_id):
+        channel_id = self.daily_log_channels.get(guild_id)
+        return [{"channel_id": channel_id}] if channel_id else []
+
+    # --- Daily ---
+    def _daily_subscriber(self, guild_id, user_id):
+        return [{"user_id": user_id}] if (guild_id, user_id) in self.daily_subscribers else []
+
+    def _daily_subscribe(self, guild_id, user_id):
+        self.daily_subscribers.add((guild_id, user_id))
+
+    def _daily_unsubscribe(self, guild_id, user_id):
+        self.daily_subscribers.discard((guild_id, user_id))
+
+    def _daily_subscribers_page(self, guild_id, after_user, limit):
+        return [{"user_id": u} for g, u in sorted(self.daily_subscribers) if g == guild_id and u > after_user][:limit]
+
+    def _daily_set_log_channel(self, guild_id, channel_id):
+        self.daily_log_channels[guild_id] = channel_id
+
+    def _daily_run_start(self, run_date, shard_key):
+        if (run_date, shard_key) in self.daily_runs:
+            return []
+        self.daily_runs[(run_date, shard_key)] = None
+        return [{"?column?": True}]
+
+    def _daily_run_finish(self, run_date, shard_key, finished_at):
+        self.daily_runs[(run_date, shard_key)] = finished_at
+
+    def _daily_run_unfinished(self, run_date, shard_key):
+        key = (run_date, shard_key)
+        return [{"?column?": True}] if key in self.daily_runs and self.daily_runs[key] is None else []
+
+    def _daily_run_pending(self, run_date, now, shard_count, shard_ids, after_guild, after_user, limit):
+        owned = set(shard_ids)
+        return [
+            {"guild_id": g, "user_id": u} for g, u in sorted(self.daily_subscribers)
+            if (g, u) > (after_guild, after_user)
+            and self.subscriptions.get(g, now) > now and shard_for(g, shard_count) in owned
+            and (run_date, g, u) not in self.daily_run_deliveries
+        ][:limit]
+
+    def _daily_record_delivery(self, run_date, guild_id, user_id, status):
+        self.daily_run_deliveries.setdefault((run_date, guild_id, user_id), status)
+
+    def _daily_deliveries_by_guild(self, run_date, guild_id):
+        return [
+            {"user_id": u, "status": status} for (d, g, u), status in self.daily_run_deliveries.items()
+            if d == run_date and g == guild_id
+        ]
+
+    def _daily_guild_summarized(self, run_date, guild_id):
+        self.daily_run_guilds.add((run_date, guild_id))
+
+    def _daily_unsummarized_guilds(self, run_date, shard_count, shard_ids):
+        owned = set(shard_ids)
+        guilds = {g for d, g, _ in self.daily_run_deliveries if d == run_date and shard_for(g, shard_count) in owned}
+        return [{"guild_id": g} for g in sorted(guilds) if (run_date, g) not in self.daily_run_guilds]
+
+    def _daily_prune_runs(self, before):
+        self.daily_run_deliveries = {k: v for k, v in self.daily_run_deliveries.items() if k[0] >= before}
+        self.daily_run_guilds = {k for k in self.daily_run_guilds if k[0] >= before}
+        self.daily_runs = {k: v for k, v in self.daily_runs.items() if k[0] >= before or v is None}
+
+
+# --- Redis ---
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self._calls: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> list:
+        calls, self._calls = self._calls, []
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._calls = []
+
+
+class FakeRedis:
+    """Sous-ensemble de redis.asyncio (decode_responses=True) utilisé par le bot.
+
+    Chaînes avec expiration, sorted sets, hashes, PUBLISH comptés par canal,
+    pipelines, et les scripts Lua du bot réimplémentés (eval par texte du script).
+    """
+
+    def __init__(self):
+        self._strings: dict[str, tuple[str, float | None]] = {}
+        self._zsets: dict[str, dict[str, float]] = {}
+        self._hashes: dict[str, dict[str, str]] = {}
+        self.published: dict[str, int] = {}
+        self._scripts = {
+            RENEW_SCRIPT: self._renew,
+            RELEASE_SCRIPT: self._release,
+            CANCEL_SCRIPT: self._cancel,
+            POP_DUE_SCRIPT: self._pop_due,
+        }
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    # --- Chaînes ---
+    def _live(self, key: str) -> str | None:
+        item = self._strings.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= time.monotonic():
+            del self._strings[key]
+            return None
+        return item[0]
+
+    async def get(self, key: str) -> str | None:
+        return self._live(key)
+
+    async def set(self, key: str, value, nx: bool = False, ex: int | None = None, px: int | None = None):
+        if nx and self._live(key) is not None:
+            return None
+        ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+        self._strings[key] = (str(value), time.monotonic() + ttl if ttl is not None else None)
+        return True
+
+    async def exists(self, *keys: str) -> int:
+        return sum(1 for k in keys if self._live(k) is not None or k in self._zsets or k in self._hashes)
+
+    async def delete(self, *keys: str) -> int:
+        return sum(
+            1 for k in keys
+            if any(store.pop(k, None) is not None for store in (self._strings, self._zsets, self._hashes))
+        )
+
+    async def publish(self, channel: str, message: str) -> int:
+        self.published[channel] = self.published.get(channel, 0) + 1
+        return 0
+
+    # --- Sorted sets / hashes ---
+    async def zadd(self, key: str, mapping: dict[str, float]) -> int:
+        zset = self._zsets.setdefault(key, {})
+        added = sum(1 for m in mapping if m not in zset)
+        zset.update({m: float(s) for m, s in mapping.items()})
+        return added
+
+    async def zrem(self, key: str, *members: str) -> int:
+        zset = self._zsets.get(key, {})
+        return sum(1 for m in members if zset.pop(m, None) is not None)
+
+    async def zscore(self, key: str, member: str) -> float | None:
+        return self._zsets.get(key, {}).get(member)
+
+    @staticmethod
+    def _bound(value) -> tuple[float, bool]:
+        text = str(value)
+        if text in ("-inf", "+inf", "inf"):
+            return (float("-inf") if text == "-inf" else float("inf")), False
+        if text.startswith("("):
+            return float(text[1:]), True
+        return float(text), False
+
+    async def zrangebyscore(self, key: str, min, max, withscores: bool = False, start=None, num=None):
+        low, low_open = self._bound(min)
+        high, high_open = self._bound(max)
+        items = sorted(
+            ((m, s) for m, s in self._zsets.get(key, {}).items()
+             if (s > low if low_open else s >= low) and (s < high if high_open else s <= high)),
+            key=lambda item: (item[1], item[0]),
+        )
+        if start is not None and num is not None and num >= 0:
+            items = items[start:start + num]
+        return items if withscores else [m for m, _ in items]
+
+    async def zscan_iter(self, key: str, match: str | None = None):
+        for member, score in list(self._zsets.get(key, {}).items()):
+            if match is None or fnmatch.fnmatchcase(member, match):
+                yield member, score
+
+    async def hset(self, key: str, field: str, value) -> int:
+        h = self._hashes.setdefault(key, {})
+        added = field not in h
+        h[field] = str(value)
+        return int(added)
+
+    async def hget(self, key: str, field: str) -> str | None:
+        return self._hashes.get(key, {}).get(field)
+
+    async def hmget(self, key: str, fields: list[str]) -> list[str | None]:
+        h = self._hashes.get(key, {})
+        return [h.get(f) for f in fields]
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        h = self._hashes.get(key, {})
+        return sum(1 for f in fields if h.pop(f, None) is not None)
+
+    # --- Scripts Lua du bot ---
+    async def eval(self, script: str, numkeys: int, *args):
+        handler = self._scripts.get(script)
+        if handler is None:
+            raise NotImplementedError("script not emulated")
+        return await handler(list(args[:numkeys]), list(args[numkeys:]))
+
+    async def _renew(self, keys, argv):
+        if self._live(keys[0]) != str(argv[0]):
+            return 0
+        self._strings[keys[0]] = (str(argv[0]), time.monotonic() + int(argv[1]) / 1000)
+        return 1
+
+    async def _release(self, keys, argv):
+        if self._live(keys[0]) != str(argv[0]):
+            return 0
+        return await self.delete(keys[0])
+
+    async def _cancel(self, keys, argv):
+        score = await self.zscore(keys[0], argv[0])
+        if score is not None and score <= float(argv[1]):
+            await self.zrem(keys[0], argv[0])
+            await self.zrem(keys[2], argv[2])
+            return await self.hdel(keys[1], argv[0])
+        return 0
+
+    async def _pop_due(self, keys, argv):
+        out = []
+        for i, guild_key in enumerate(keys[2:]):
+            member, guild_member = argv[1 + 2 * i], argv[2 + 2 * i]
+            score = await self.zscore(keys[0], member)
+            if score is None or score > float(argv[0]):
+                continue
+            out += [member, str(score), await self.hget(keys[1], member)]
+            await self.zrem(keys[0], member)
+            await self.hdel(keys[1], member)
+            await self.zrem(guild_key, guild_member)
+        return out
@@ -0,0 +1,200 @@
+import asyncio
+import inspect
+import importlib
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+from bench.fakes import FakeChannel, FakeDatabase, FakeGuild, FakeMember, FakePool, FakeRedis, FakeResponse, FakeRole, FakeUser
+from cogs.high_tier_forward import FORWARD_CHANNEL_ID
+from cogs.reminder import REMINDER_ANNOUNCE_CHANNEL_ID
+from utils.cluster import ClusterCoordinator
+from utils.db import Repository
+from utils.embeds import EmbedDispatcher
+from utils.events import EventPublisher
+from utils.members import MemberCache
+from utils.rarity import RarityEngine
+from utils.resolver import EntityResolver
+from utils.scheduler import ReminderScheduler
+from utils.subscriptions import SubscriptionService
+from utils.write_behind import WriteBehindWriter
+
+# Les mêmes cogs que main.load_cogs, sauf ceux qui ne font que des commandes slash
+BENCH_COGS = [
+    "guild_config", "high_tier", "high_tier_forward", "reminder", "vote_reminder", "daily_reminder",
+    "subscription_check",
+]
+
+GUILD_ID_BASE = 1_300_000_000_000_000_000
+USER_ID_BASE = 900_000_000_000_000_000
+SUMMON_CHANNEL_OFFSET = 1
+LOG_CHANNEL_OFFSET = 2
+HIGH_TIER_ROLE_OFFSET = 3
+
+
+class FakeBot:
+    """Ce que les cogs et les services utilisent de `commands.AutoShardedBot`.
+
+    La gateway ne devient jamais prête : les tâches `tasks.loop` des cogs
+    restent bloquées sur `wait_until_ready` et le bench appelle lui-même
+    les méthodes qu'il mesure.
+    """
+
+    def __init__(self, send_latency: float = 0.0):
+        self.user = FakeUser(1_000_000_000_000_000_001, "MemAssistant")
+        self.shard_count = 1
+        self.shard_ids = None
+        self.send_latency = send_latency
+        self.guilds: list[FakeGuild] = []
+        self.api_calls: dict[str, int] = {}
+        self._guilds: dict[int, FakeGuild] = {}
+        self._cogs: dict[str, object] = {}
+        self._ready = asyncio.Event()
+
+    def add_guild(self, guild: FakeGuild) -> FakeGuild:
+        self.guilds.append(guild)
+        self._guilds[guild.id] = guild
+        return guild
+
+    def get_guild(self, guild_id: int) -> FakeGuild | None:
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int) -> FakeChannel | None:
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel:
+                return channel
+        return None
+
+    async def fetch_channel(self, channel_id: int) -> FakeChannel:
+        # Appel REST simulé : compté, avec la latence d'un envoi
+        self.api_calls["fetch_channel"] = self.api_calls.get("fetch_channel", 0) + 1
+        await asyncio.sleep(self.send_latency)
+        channel = self.get_channel(channel_id)
+        if channel is None:
+            raise discord.NotFound(FakeResponse(), "Unknown Channel")
+        return channel
+
+    def get_cog(self, name: str):
+        return self._cogs.get(name)
+
+    async def add_cog(self, cog):
+        self._cogs[cog.qualified_name] = cog
+        await cog.cog_load()
+
+    def add_listener(self, func, name: str | None = None):
+        pass
+
+    async def wait_until_ready(self):
+        await self._ready.wait()
+
+
+class Harness:
+    """Bot factice complet : vrais services utils/*, vrais cogs, Postgres et Redis en mémoire.
+
+    `async with Harness(guilds=…, members_per_guild=…) as h:` puis `h.bot`, `h.db`,
+    `h.redis`, `h.cog("Reminder")`.
+    """
+
+    def __init__(self, guilds: int = 10, members_per_guild: int = 100, send_latency: float = 0.0,
+                 inactive_guilds: int = 0, redis: bool = True, guild_ids: list[int] | None = None):
+        # Espacement de 1 << 22 : les guildes générées se répartissent sur les shards
+        self.guild_ids = guild_ids if guild_ids is not None else [GUILD_ID_BASE + (i << 22) for i in range(guilds)]
+        self.members_per_guild = members_per_guild
+        self.send_latency = send_latency
+        self.inactive_guilds = inactive_guilds
+        self.db = FakeDatabase()
+        self.redis = FakeRedis() if redis else None
+        self.bot = FakeBot(send_latency)
+
+    def cog(self, name: str):
+        return self.bot.get_cog(name)
+
+    def guild(self, index: int) -> FakeGuild:
+        return self.bot.guilds[index]
+
+    def add_member(self, guild: FakeGuild, user_id: int) -> FakeMember:
+        return guild.add_member(FakeMember(guild, user_id, self.send_latency))
+
+    def add_channel(self, guild: FakeGuild, channel_id: int, name: str) -> FakeChannel:
+        return guild.get_channel(channel_id) or guild.add_channel(FakeChannel(guild, channel_id, name, self.send_latency))
+
+    def add_guild(self, guild_id: int, active: bool = True) -> FakeGuild:
+        """Guilde configurée : salon de summon, salon de log daily, rôle High Tier, abonnement."""
+        now = datetime.now(timezone.utc)
+        guild = self.bot.add_guild(FakeGuild(guild_id))
+        self.add_channel(guild, guild_id + SUMMON_CHANNEL_OFFSET, "summon")
+        self.add_channel(guild, guild_id + LOG_CHANNEL_OFFSET, "daily-log")
+        role = guild.add_role(FakeRole(guild_id + HIGH_TIER_ROLE_OFFSET))
+        self.db.subscriptions[guild_id] = now + (timedelta(days=30) if active else -timedelta(days=1))
+        self.db.guild_config[guild_id] = {"high_tier_role_id": role.id}
+        self.db.daily_log_channels[guild_id] = guild_id + LOG_CHANNEL_OFFSET
+        return guild
+
+    def _populate(self):
+        for i, guild_id in enumerate(self.guild_ids):
+            guild = self.add_guild(guild_id, active=i >= self.inactive_guilds)
+            for j in range(self.members_per_guild):
+                self.add_member(guild, USER_ID_BASE + i * 1_000_000 + j)
+        if not self.bot.guilds:
+            return
+        # Salons fixes du serveur support : vus des autres guildes via fetch_channel / get_channel
+        home = self.bot.guilds[0]
+        home.add_channel(FakeChannel(home, REMINDER_ANNOUNCE_CHANNEL_ID, "reminders", self.send_latency))
+        home.add_channel(FakeChannel(home, FORWARD_CHANNEL_ID, "high-tier-forward", self.send_latency))
+
+    async def start(self):
+        self._populate()
+        bot = self.bot
+        bot.redis = self.redis
+        bot.db_pool = FakePool(self.db)
+        bot.db = Repository(bot.db_pool)
+        self.db.bind(bot.db.queries)
+        bot.cluster = ClusterCoordinator(bot)
+        bot.cluster.start()
+        bot.events = EventPublisher(bot)
+        bot.events.start()
+        bot.rarities = RarityEngine()
+        await bot.rarities.load(bot.db)
+        bot.embeds = EmbedDispatcher(bot)
+        bot.members = MemberCache(bot)
+        bot.resolver = EntityResolver(bot)
+        bot.writer = WriteBehindWriter(bot)
+        bot.writer.start()
+        # Pas de boucle : le bench pilote la fenêtre et les échéances lui-même
+        bot.scheduler = ReminderScheduler(bot)
+        bot.subscriptions = SubscriptionService(bot)
+        await bot.subscriptions.warm()
+        for name in BENCH_COGS:
+            await importlib.import_module(f"cogs.{name}").setup(bot)
+        await self.load_window()
+
+    async def load_window(self):
+        """Premier tour de ReminderScheduler._run : charge la fenêtre depuis les stores."""
+        await self.bot.scheduler._refresh_window()
+
+    async def stop(self):
+        bot = self.bot
+        for cog in list(bot._cogs.values()):
+            result = cog.cog_unload()
+            if inspect.isawaitable(result):
+                await result
+        await bot.writer.stop()
+        await bot.events.stop()
+        await bot.cluster.stop()
+
+    async def lead(self, job: str, timeout: float = 1.0):
+        """Attend que ce process soit élu leader de `job` (élection réelle sur le FakeRedis)."""
+        self.bot.cluster.register(job)
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not self.bot.cluster.is_leader(job):
+            if asyncio.get_running_loop().time() > deadline:
+                raise TimeoutError(f"not elected leader for {job}")
+            await asyncio.sleep(0.001)
+
+    async def __aenter__(self) -> "Harness":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
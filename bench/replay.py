@@ -0,0 +1,213 @@
+"""Rejoue un enregistrement gateway (GATEWAY_RECORD_FILE) contre les vrais cogs.
+
+    python -m bench.replay spawn-night.jsonl                  # vitesse réelle
+    python -m bench.replay spawn-night.jsonl --speed 10       # 10x plus vite
+    python -m bench.replay spawn-night.jsonl --speed max      # aussi vite que possible
+    python -m bench.replay spawn-night.jsonl --send-latency 0.08
+
+Comme discord.py, chaque événement part dans sa propre tâche à l'heure où la
+gateway l'a reçu (divisée par --speed). Le retard de dispatch montre quand la
+boucle ne suit plus ; la latence des handlers montre où le temps passe.
+Les commandes slash sont appelées directement (sans les checks de permission).
+"""
+import re
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+import discord
+from discord import app_commands
+
+from bench.fakes import FakeInteraction, FakeMessage, FakeRole, FakeUser
+from bench.harness import Harness
+
+_MENTION_RE = re.compile(r"<@!?(\d+)>")
+
+
+def load(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return sorted(events, key=lambda e: e["ts"])
+
+
+def _mentions(event: dict) -> set[int]:
+    text = json.dumps(event.get("embeds", [])) + (event.get("content") or "")
+    return {int(m) for m in _MENTION_RE.findall(text)}
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class Replayer:
+    def __init__(self, h: Harness, events: list[dict]):
+        self.h = h
+        self.events = events
+        self.lag: list[float] = []
+        self.latency: dict[str, list[float]] = {}
+        self.errors = 0
+        self.skipped = 0
+        self.unhandled: dict[str, int] = {}  # commandes enregistrées qu'aucun cog chargé ne déclare
+        self._messages: dict[int, FakeMessage] = {}
+        self._commands: dict[str, app_commands.Command] = {}
+        for cog in h.bot._cogs.values():
+            for command in cog.walk_app_commands():
+                if isinstance(command, app_commands.Command):
+                    self._commands[command.name] = command
+
+    def prepare(self):
+        """Crée les salons et membres référencés par l'enregistrement (auteurs, mentions)."""
+        for event in self.events:
+            guild = self.h.bot.get_guild(event["guild_id"])
+            if event.get("channel_id"):
+                self.h.add_channel(guild, event["channel_id"], event.get("channel_name") or "channel")
+            user_ids = _mentions(event) | ({event["user_id"]} if "user_id" in event else set())
+            for user_id in user_ids:
+                if not guild.get_member(user_id):
+                    self.h.add_member(guild, user_id)
+
+    def _message(self, event: dict) -> FakeMessage:
+        guild = self.h.bot.get_guild(event["guild_id"])
+        return FakeMessage(
+            event["message_id"], FakeUser(event["author_id"]), guild, guild.get_channel(event["channel_id"]),
+            [discord.Embed.from_dict(e) for e in event.get("embeds", [])], event.get("content") or "",
+        )
+
+    def _option(self, guild, parameter: app_commands.Parameter, value):
+        if parameter.type == discord.AppCommandOptionType.role:
+            return guild.get_role(int(value)) or guild.add_role(FakeRole(int(value), "role"))
+        if parameter.type == discord.AppCommandOptionType.channel:
+            return self.h.add_channel(guild, int(value), "channel")
+        if parameter.type in (discord.AppCommandOptionType.user, discord.AppCommandOptionType.mentionable):
+            return guild.get_member(int(value)) or self.h.add_member(guild, int(value))
+        return value
+
+    async def _interaction(self, event: dict):
+        command = self._commands.get(event["command"])
+        if command is None:
+            self.skipped += 1
+            self.unhandled[event["command"]] = self.unhandled.get(event["command"], 0) + 1
+            return
+        guild = self.h.bot.get_guild(event["guild_id"])
+        member = guild.get_member(event["user_id"])
+        member.guild_permissions = discord.Permissions.all() if event.get("admin") else discord.Permissions.none()
+        params = {p.name: p for p in command.parameters}
+        kwargs = {
+            name: self._option(guild, params[name], value)
+            for name, value in event.get("options", {}).items() if name in params
+        }
+        interaction = FakeInteraction(member, guild, guild.get_channel(event.get("channel_id")), self.h.send_latency)
+        await command.callback(command.binding, interaction, **kwargs)
+
+    async def dispatch(self, event: dict):
+        kind = event["event"]
+        if kind == "message_edit":
+            after = self._message(event)
+            before = self._messages.get(after.id, after)
+            self._messages[after.id] = after
+            await self.h.bot.embeds.on_message_edit(before, after)
+        elif kind == "message":
+            message = self._message(event)
+            for cog in self.h.bot._cogs.values():
+                for name, listener in cog.get_listeners():
+                    if name == "on_message":
+                        await listener(message)
+        elif kind == "interaction":
+            await self._interaction(event)
+        else:
+            self.skipped += 1
+
+    async def _timed(self, event: dict):
+        started = time.perf_counter()
+        try:
+            await self.dispatch(event)
+        except Exception:
+            self.errors += 1
+            logging.getLogger("replay").exception("❌ Replay of %s failed", event["event"])
+        finally:
+            self.latency.setdefault(event["event"], []).append(time.perf_counter() - started)
+
+    async def run(self, speed: float | None) -> float:
+        loop = asyncio.get_running_loop()
+        tasks: list[asyncio.Task] = []
+        first_ts = self.events[0]["ts"]
+        started = loop.time()
+        for event in self.events:
+            if speed:
+                due = started + (event["ts"] - first_ts) / speed
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.lag.append(max(0.0, loop.time() - due))
+            tasks.append(asyncio.create_task(self._timed(event)))
+            # La lecture de la gateway cède la main entre deux trames
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return loop.time() - started
+
+    def report(self, elapsed: float, speed: float | None) -> list[str]:
+        recorded = self.events[-1]["ts"] - self.events[0]["ts"]
+        lines = [
+            f"{len(self.events)} events over {recorded:.1f}s recorded, replayed at "
+            f"{'max' if not speed else f'{speed:g}x'} in {elapsed:.2f}s — {len(self.events) / elapsed:.0f} events/s",
+        ]
+        if self.lag:
+            lines.append(f"  dispatch lag p50 {_percentile(self.lag, 0.5) * 1000:.1f}ms "
+                         f"p95 {_percentile(self.lag, 0.95) * 1000:.1f}ms max {max(self.lag) * 1000:.1f}ms")
+        for kind, values in sorted(self.latency.items()):
+            lines.append(f"  {kind:<13} {len(values):>7} handled  p50 {_percentile(values, 0.5) * 1000:.2f}ms "
+                         f"p95 {_percentile(values, 0.95) * 1000:.2f}ms p99 {_percentile(values, 0.99) * 1000:.2f}ms "
+                         f"max {max(values) * 1000:.2f}ms")
+        bot = self.h.bot
+        effects = {
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "unhandled_commands": dict(sorted(self.unhandled.items())),
+            "channel_sends": sum(c.sent for g in bot.guilds for c in g._channels.values()),
+            "dms": sum(m.dms for g in bot.guilds for m in g.members),
+            "fetch_channel_calls": bot.api_calls.get("fetch_channel", 0),
+            "db_calls": sum(self.h.db.calls.values()),
+            "events_queued": bot.events.queued,
+            "reminders_pending": bot.scheduler.pending(),
+        }
+        lines.append("  " + json.dumps(effects))
+        return lines
+
+
+async def replay(path: str, speed: float | None, send_latency: float) -> list[str]:
+    events = load(path)
+    if not events:
+        return [f"{path}: no events"]
+    guild_ids = sorted({e["guild_id"] for e in events})
+    async with Harness(members_per_guild=0, send_latency=send_latency, guild_ids=guild_ids) as h:
+        replayer = Replayer(h, events)
+        replayer.prepare()
+        elapsed = await replayer.run(speed)
+        # Les écritures différées font partie du coût
+        await h.bot.writer.flush()
+        return replayer.report(elapsed, speed)
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.replay", description=__doc__.splitlines()[0])
+    parser.add_argument("file", help="fichier JSONL produit avec GATEWAY_RECORD_FILE")
+    parser.add_argument("--speed", default="1", help="1, 10, … ou max")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="latence simulée d'un appel Discord (s)")
+    parser.add_argument("--verbose", action="store_true", help="logs INFO des cogs")
+    args = parser.parse_args(argv)
+    speed = None if args.speed == "max" else float(args.speed)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    print("\n".join(asyncio.run(replay(args.file, speed, args.send_latency))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
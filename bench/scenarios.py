@@ -0,0 +1,207 @@
+import time
+import random
+from datetime import datetime, timezone
+
+import discord
+
+from bench.fakes import FakeMessage, FakeUser
+from bench.harness import SUMMON_CHANNEL_OFFSET, USER_ID_BASE, Harness
+from cogs.reminder import BOT_NAME, SCHEDULER_KIND, TASK_NAME
+from utils.embeds import MAZOKU_BOT_ID, parse_summon_embed
+from utils.rarity import DEFAULT_RARITIES
+
+# nom → (unité, sens de l'amélioration)
+METRICS: dict[str, tuple[str, str]] = {
+    "edits.parse_per_sec": ("edits/s", "higher"),
+    "edits.dispatch_per_sec": ("edits/s", "higher"),
+    "scheduler.schedule_us": ("µs/op", "lower"),
+    "reminder.start_us": ("µs/op", "lower"),
+    "reminder.restore_seconds": ("s", "lower"),
+    "daily.fanout_seconds": ("s", "lower"),
+    "daily.dm_per_sec": ("DM/s", "higher"),
+}
+
+MAZOKU = FakeUser(MAZOKU_BOT_ID, "Mazoku")
+OTHER_BOT = FakeUser(1_000_000_000_000_000_002, "OtherBot")
+
+
+def _embed(title: str, description: str, footer: str | None = None) -> discord.Embed:
+    embed = discord.Embed(title=title, description=description)
+    if footer:
+        embed.set_footer(text=footer)
+    return embed
+
+
+def spawn_night(h: Harness, messages: int, seed: int = 42) -> list[tuple[FakeMessage, FakeMessage]]:
+    """Edits d'une soirée de spawns : auto summons (rares ou non) puis claims, summons manuels, bruit."""
+    rng = random.Random(seed)
+    edits: list[tuple[FakeMessage, FakeMessage]] = []
+    for message_id in range(1, messages + 1):
+        guild = rng.choice(h.bot.guilds)
+        channel = guild.get_channel(guild.id + SUMMON_CHANNEL_OFFSET)
+        claimer = rng.choice(guild.members)
+        rarity = rng.choice(DEFAULT_RARITIES) if rng.random() < 0.3 else None
+        card = f"<:{rarity.name}:{rarity.emoji_id}> **Card {message_id}**" if rarity else f"**Card {message_id}**"
+        roll = rng.random()
+        if roll < 0.6:
+            steps = [
+                _embed("Auto Summon", f"{card}\nClaim it before it flees!"),
+                _embed("Auto Summon Claimed", f"{card}\nClaimed by {claimer.mention}"),
+            ]
+        elif roll < 0.85:
+            steps = [_embed("Summon Claimed", f"{claimer.mention} claimed {card}", footer=f"Claimed by {claimer.name}")]
+        else:
+            steps = [_embed("Card Info", card)]
+        author = MAZOKU if roll < 0.95 else OTHER_BOT
+        before = FakeMessage(message_id, author, guild, channel, [])
+        for embed in steps:
+            after = FakeMessage(message_id, author, guild, channel, [embed])
+            edits.append((before, after))
+            before = after
+    return edits
+
+
+async def bench_edits(scale: float = 1.0, send_latency: float = 0.0) -> tuple[dict, dict]:
+    async with Harness(guilds=20, members_per_guild=500, inactive_guilds=2, send_latency=send_latency) as h:
+        edits = spawn_night(h, int(20_000 * scale))
+
+        classes = {"auto_summon": 0, "summon_claimed": 0, "high_tier": 0, "ignored": 0}
+        started = time.perf_counter()
+        for _, after in edits:
+            if after.author.id != MAZOKU_BOT_ID:
+                classes["ignored"] += 1
+                continue
+            event = parse_summon_embed(after, h.bot.rarities)
+            if event is None:
+                classes["ignored"] += 1
+                continue
+            classes["auto_summon"] += event.auto_summon
+            classes["summon_claimed"] += event.summon_claimed
+            classes["high_tier"] += bool(event.rarity)
+        parse_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for before, after in edits:
+            await h.bot.embeds.on_message_edit(before, after)
+        dispatch_elapsed = time.perf_counter() - started
+
+        info = {
+            "edits": len(edits),
+            **classes,
+            "reminders_started": h.bot.scheduler.pending(SCHEDULER_KIND),
+            "channel_sends": sum(c.sent for g in h.bot.guilds for c in g._channels.values()),
+            "fetch_channel_calls": h.bot.api_calls.get("fetch_channel", 0),
+            "events_queued": h.bot.events.queued,
+        }
+    return {
+        "edits.parse_per_sec": len(edits) / parse_elapsed,
+        "edits.dispatch_per_sec": len(edits) / dispatch_elapsed,
+    }, info
+
+
+async def bench_scheduling(scale: float = 1.0, send_latency: float = 0.0) -> tuple[dict, dict]:
+    pending = int(100_000 * scale)
+    async with Harness(guilds=20, members_per_guild=0, send_latency=send_latency) as h:
+        scheduler = h.bot.scheduler
+        rng = random.Random(7)
+        now = time.time()
+        guild_ids = [g.id for g in h.bot.guilds]
+        for i in range(pending):
+            key = (rng.choice(guild_ids), USER_ID_BASE + 10_000_000 + i)
+            scheduler.schedule(SCHEDULER_KIND, key, now + rng.uniform(60, scheduler.window), 0)
+
+        ops = int(20_000 * scale)
+        extra = [((rng.choice(guild_ids), USER_ID_BASE + 20_000_000 + i), now + rng.uniform(60, scheduler.window))
+                 for i in range(ops)]
+        started = time.perf_counter()
+        for key, due in extra:
+            scheduler.schedule(SCHEDULER_KIND, key, due, 0)
+        schedule_elapsed = time.perf_counter() - started
+
+        # start_reminder complet : dédup, abonnement, store, message de départ, timer
+        reminder = h.cog("Reminder")
+        starts = int(5_000 * scale)
+        members = []
+        for i in range(starts):
+            guild = h.bot.guilds[i % len(h.bot.guilds)]
+            members.append((h.add_member(guild, USER_ID_BASE + 30_000_000 + i), guild.get_channel(guild.id + SUMMON_CHANNEL_OFFSET)))
+        started = time.perf_counter()
+        for member, channel in members:
+            await reminder.start_reminder(member, channel)
+        start_elapsed = time.perf_counter() - started
+        await reminder.outbox.flush_all()
+
+        info = {
+            "pending_timers": scheduler.pending(),
+            "store": reminder.store.backend,
+            "start_notices": reminder.outbox.notices,
+            "start_messages": reminder.outbox.messages,
+            "fetch_channel_calls": h.bot.api_calls.get("fetch_channel", 0),
+        }
+    return {
+        "scheduler.schedule_us": schedule_elapsed / ops * 1e6,
+        "reminder.start_us": start_elapsed / starts * 1e6,
+    }, info
+
+
+async def bench_restore(scale: float = 1.0, send_latency: float = 0.0) -> tuple[dict, dict]:
+    rows = int(100_000 * scale)
+    async with Harness(guilds=20, members_per_guild=0, send_latency=send_latency) as h:
+        reminder = h.cog("Reminder")
+        rng = random.Random(11)
+        now = time.time()
+        guild_ids = [g.id for g in h.bot.guilds]
+        # Passe par le store actif (REMINDER_STORE) pour que le bench suive le backend choisi
+        for i in range(rows):
+            guild_id = rng.choice(guild_ids)
+            await reminder.store.put((guild_id, USER_ID_BASE + i), now + rng.uniform(60, 1800), guild_id + SUMMON_CHANNEL_OFFSET)
+        await h.bot.writer.flush()
+
+        # store.put seul ne programme rien : comme après un redémarrage, tout vient du store
+        started = time.perf_counter()
+        await h.load_window()
+        elapsed = time.perf_counter() - started
+
+        info = {
+            "rows": rows,
+            "restored": h.bot.scheduler.pending(SCHEDULER_KIND),
+            "store": reminder.store.backend,
+            "scope": f"{BOT_NAME}/{TASK_NAME}",
+        }
+    return {"reminder.restore_seconds": elapsed}, info
+
+
+async def bench_daily(scale: float = 1.0, send_latency: float = 0.0) -> tuple[dict, dict]:
+    members_per_guild = int(1_000 * scale)
+    async with Harness(guilds=10, members_per_guild=members_per_guild, send_latency=send_latency) as h:
+        for guild in h.bot.guilds:
+            h.db.daily_subscribers.update((guild.id, m.id) for m in guild.members)
+        daily = h.cog("DailyReminder")
+        await h.lead(daily.leader_job())
+
+        run_date = datetime.now(timezone.utc).date()
+        started = time.perf_counter()
+        await daily.run_daily(run_date)
+        await daily.log_buffer.flush_all()
+        elapsed = time.perf_counter() - started
+
+        subscribers = len(h.db.daily_subscribers)
+        info = {
+            "subscribers": subscribers,
+            "dms_sent": sum(m.dms for g in h.bot.guilds for m in g.members),
+            "log_messages": sum(c.sent for g in h.bot.guilds for c in g._channels.values()),
+            "db_calls": sum(h.db.calls.values()),
+            "events_queued": h.bot.events.queued,
+        }
+    return {
+        "daily.fanout_seconds": elapsed,
+        "daily.dm_per_sec": subscribers / elapsed,
+    }, info
+
+
+SCENARIOS = {
+    "edits": bench_edits,
+    "scheduling": bench_scheduling,
+    "restore": bench_restore,
+    "daily": bench_daily,
+}
@@ -1,93 +1,70 @@
+import os
 import logging
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-from datetime import datetime, timedelta, timezone
-import asyncpg
-import json
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+import time
+import asyncio
+import itertools
+
+from utils.fanout import DMFanout, FanoutStats
+from utils.log_buffer import GuildLogBuffer
+from utils.paginator import KeysetPaginator
+from utils.metrics import DAILY_DMS, DAILY_RUN_SECONDS, DAILY_RUN_THROUGHPUT
+from utils.db import Repository
+from utils.sharding import owned_shards, shard_for
 
 log = logging.getLogger("cog-dailyreminder")
 
 DAILY_MESSAGE = "Hello! Just a reminder that your Mazoku Daily is ready!"
+DAILY_RUN_CHUNK = 200
+DAILY_LIST_PAGE_SIZE = 50  # mentions par page, ~25 caractères chacune
+DAILY_RETENTION_DAYS = int(os.getenv("DAILY_RETENTION_DAYS", "7"))  # ledger des livraisons conservé
 
 class DailyReminder(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.pool: asyncpg.Pool | None = None
+        self.db: Repository | None = None
+        self.fanout = DMFanout()
+        self.log_buffer = GuildLogBuffer(bot)
+        self._run_lock = asyncio.Lock()
         self.daily_task.start()
 
     async def cog_load(self):
-        self.pool = self.bot.db_pool
-        log.info("✅ Pool Postgres attachée pour DailyReminder")
+        self.db = self.bot.db
+        self.log_buffer.start()
+        log.info("✅ Repository Postgres attaché pour DailyReminder")
 
     async def cog_unload(self):
         self.daily_task.cancel()
+        await self.log_buffer.stop()
 
     async def is_subscription_active(self, guild_id: int) -> bool:
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT expire_at FROM subscriptions WHERE server_id=$1", guild_id
-            )
-            if not row:
-                return False
-            expire_at = row["expire_at"]
-            return expire_at > datetime.now(timezone.utc)
+        return await self.bot.subscriptions.is_active(guild_id)
 
     async def send_log(self, guild: discord.Guild, message: str):
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT channel_id FROM daily_log_channels WHERE guild_id=$1", guild.id
-            )
-        if not row:
-            return
-        channel = guild.get_channel(int(row["channel_id"]))
-        if channel:
-            try:
-                await channel.send(message)
-            except discord.Forbidden:
-                log.warning("❌ Impossible d’envoyer le log dans %s", channel.name)
+        # Bufferisé : envoyé groupé par message de 2000 caractères max
+        await self.log_buffer.add(guild, message)
 
     async def publish_event(self, guild_id: int, user_id: int, event_type: str, details: dict | None = None):
-        if not getattr(self.bot, "redis", None):
-            return
-        event = {
-            "bot_name": "MemAssistant",   # ✅ nom du bot enfant
-            "bot_id": self.bot.user.id,
-            "guild_id": guild_id,
-            "user_id": user_id,
-            "event_type": event_type,
-            "details": details or {}
-        }
-        try:
-            await self.bot.redis.publish("bot_events", json.dumps(event))
-            log.info("📡 DailyReminder Event publié: %s", event)
-        except Exception as e:
-            log.error("❌ Impossible de publier l'événement Redis: %s", e)
+        """Publie un événement vers Redis pour le Master avec bot_name=MemAssistant (non bloquant)."""
+        await self.bot.events.publish("MemAssistant", guild_id, user_id, event_type, details)
 
     # --- Slash commands ---
     @app_commands.command(name="toggle-daily", description="Toggle daily Mazoku reminder on/off")
     async def toggle_daily(self, interaction: discord.Interaction):
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT user_id FROM daily_subscribers WHERE guild_id=$1 AND user_id=$2",
-                interaction.guild.id, interaction.user.id
-            )
-            if row:
-                await conn.execute(
-                    "DELETE FROM daily_subscribers WHERE guild_id=$1 AND user_id=$2",
-                    interaction.guild.id, interaction.user.id
-                )
-                await interaction.response.send_message("❌ You will no longer receive daily reminders.", ephemeral=True)
-                await self.send_log(interaction.guild, f"🚫 {interaction.user.mention} unsubscribed from daily reminder")
-                await self.publish_event(interaction.guild.id, interaction.user.id, "daily_unsubscribed")
-            else:
-                await conn.execute(
-                    "INSERT INTO daily_subscribers (guild_id, user_id) VALUES ($1, $2)",
-                    interaction.guild.id, interaction.user.id
-                )
-                await interaction.response.send_message("✅ You will now receive daily reminders.", ephemeral=True)
-                await self.send_log(interaction.guild, f"✅ {interaction.user.mention} subscribed to daily reminder")
-                await self.publish_event(interaction.guild.id, interaction.user.id, "daily_subscribed")
+        row = await self.db.fetchrow("daily.subscriber", interaction.guild.id, interaction.user.id)
+        if row:
+            await self.db.execute("daily.unsubscribe", interaction.guild.id, interaction.user.id)
+            await interaction.response.send_message("❌ You will no longer receive daily reminders.", ephemeral=True)
+            await self.send_log(interaction.guild, f"🚫 {interaction.user.mention} unsubscribed from daily reminder")
+            await self.publish_event(interaction.guild.id, interaction.user.id, "daily_unsubscribed")
+        else:
+            await self.db.execute("daily.subscribe", interaction.guild.id, interaction.user.id)
+            await interaction.response.send_message("✅ You will now receive daily reminders.", ephemeral=True)
+            await self.send_log(interaction.guild, f"✅ {interaction.user.mention} subscribed to daily reminder")
+            await self.publish_event(interaction.guild.id, interaction.user.id, "daily_subscribed")
 
     @app_commands.command(name="list-daily", description="List all users subscribed to daily reminders")
     async def list_daily(self, interaction: discord.Interaction):
@@ -95,32 +72,26 @@ class DailyReminder(commands.Cog):
             await interaction.response.send_message("⛔ You don’t have permission to use this command.", ephemeral=True)
             return
 
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT user_id FROM daily_subscribers WHERE guild_id=$1",
-                interaction.guild.id
-            )
-        if not rows:
-            await interaction.response.send_message("📭 No one is currently subscribed.", ephemeral=True)
-            return
+        guild = interaction.guild
+
+        async def fetch(after_user_id, limit):
+            return await self.db.fetch("daily.subscribers_page", guild.id, after_user_id, limit)
 
-        mentions = []
-        for row in rows:
-            member = interaction.guild.get_member(int(row["user_id"]))
-            mentions.append(member.mention if member else f"<@{row['user_id']}>")
+        async def render(rows):
+            mentions = []
+            for row in rows:
+                member = self.bot.members.get_cached(guild, int(row["user_id"]))
+                mentions.append(member.mention if member else f"<@{row['user_id']}>")
+            return [", ".join(mentions)]
 
-        await interaction.response.send_message(
-            f"👥 Subscribers ({len(rows)}):\n" + ", ".join(mentions),
-            ephemeral=True
+        paginator = KeysetPaginator(
+            interaction.user.id, "👥 Subscribers", fetch, lambda r: r["user_id"], render, 0, page_size=DAILY_LIST_PAGE_SIZE
         )
+        await paginator.start(interaction, "📭 No one is currently subscribed.")
 
     @app_commands.command(name="daily-debug", description="Check if you are subscribed to daily reminders")
     async def daily_debug(self, interaction: discord.Interaction):
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT user_id FROM daily_subscribers WHERE guild_id=$1 AND user_id=$2",
-                interaction.guild.id, interaction.user.id
-            )
+        row = await self.db.fetchrow("daily.subscriber", interaction.guild.id, interaction.user.id)
         status = "✅ You are subscribed." if row else "❌ You are not subscribed."
         await interaction.response.send_message(status, ephemeral=True)
 
@@ -130,75 +101,175 @@ class DailyReminder(commands.Cog):
             await interaction.response.send_message("⛔ You don’t have permission to use this command.", ephemeral=True)
             return
 
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "INSERT INTO daily_log_channels (guild_id, channel_id) VALUES ($1, $2) "
-                "ON CONFLICT (guild_id) DO UPDATE SET channel_id=$2",
-                interaction.guild.id, channel.id
-            )
+        await self.db.execute("daily.set_log_channel", interaction.guild.id, channel.id)
+        self.log_buffer.set_channel(interaction.guild.id, channel.id)
         await interaction.response.send_message(f"✅ Log channel set to {channel.mention}", ephemeral=True)
 
-    @tasks.loop(hours=24)
-    async def daily_task(self):
-        await self.bot.wait_until_ready()
-
+    # --- Daily run (set-based, checkpointé) ---
+    async def notify_inactive_guilds(self):
         for guild in self.bot.guilds:
             if not await self.is_subscription_active(guild.id):
                 await self.send_log(guild, "⚠️ Subscription not active — Daily reminders disabled.")
                 await self.publish_event(guild.id, 0, "daily_blocked")
-                continue
+        await self.log_buffer.flush_all()
 
-            async with self.pool.acquire() as conn:
-                rows = await conn.fetch(
-                    "SELECT user_id FROM daily_subscribers WHERE guild_id=$1",
-                    guild.id
-                )
-            if not rows:
-                continue
+    async def deliver_chunk(self, run_date: date, guild_id: int, rows: list, stats: FanoutStats):
+        guild = self.bot.get_guild(guild_id)
+        results: list[tuple[date, int, int, str]] = []
+        user_ids = [int(row["user_id"]) for row in rows]
+        # Un lot de query_members par 100 abonnés en mode lazy
+        found = await self.bot.members.get_many(guild, user_ids) if guild else {}
+        members = []
+        for user_id in user_ids:
+            member = found.get(user_id)
+            if member:
+                members.append(member)
+            else:
+                results.append((run_date, guild_id, user_id, "missing"))
 
-            success = 0
-            failed = 0
-            failed_users = []
+        async def on_result(member: discord.Member, ok: bool):
+            results.append((run_date, guild_id, member.id, "sent" if ok else "failed"))
+            if ok:
+                await self.send_log(guild, f"📨 Daily sent to {member.mention}")
+                await self.publish_event(guild_id, member.id, "daily_sent")
+            else:
+                await self.send_log(guild, f"❌ Failed to DM {member.mention}")
+                await self.publish_event(guild_id, member.id, "daily_failed")
 
-            for row in rows:
-                member = guild.get_member(int(row["user_id"]))
-                if member:
-                    try:
-                        await member.send(DAILY_MESSAGE)
-                        success += 1
-                        await self.send_log(guild, f"📨 Daily sent to {member.mention}")
-                        await self.publish_event(guild.id, member.id, "daily_sent")
-                    except (discord.Forbidden, discord.HTTPException):
-                        failed += 1
-                        failed_users.append(member.mention)
-                        await self.send_log(guild, f"❌ Failed to DM {member.mention}")
-                        await self.publish_event(guild.id, member.id, "daily_failed")
-
-            now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-            summary = (
-                f"📊 Daily summary at {now}:\n"
-                f"✅ Sent: {success}\n"
-                f"❌ Failed: {failed}\n"
-                f"👥 Total: {len(rows)}"
-            )
-            if failed_users:
-                summary += f"\n⚠️ Failed users: {', '.join(failed_users)}"
-
-            await self.send_log(guild, summary)
-            await self.publish_event(guild.id, 0, "daily_summary", {
-                "sent": success,
-                "failed": failed,
-                "total": len(rows)
-            })
+        try:
+            await self.fanout.run(members, DAILY_MESSAGE, on_result, stats)
+        finally:
+            for _, _, _, status in results:
+                DAILY_DMS.labels(status=status).inc()
+            # Checkpoint : ces utilisateurs ne seront plus relus si le run reprend
+            await self.db.executemany("daily.record_delivery", results)
+
+    async def finish_guild(self, run_date: date, guild_id: int, stats: FanoutStats):
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            await self.db.execute("daily.guild_summarized", run_date, guild_id)
+            return
+        # Totaux du run entier, y compris ce qui a été envoyé avant un éventuel redémarrage
+        rows = await self.db.fetch("daily.deliveries_by_guild", run_date, guild_id)
+        sent = sum(1 for r in rows if r["status"] == "sent")
+        failed_users = [f"<@{r['user_id']}>" for r in rows if r["status"] == "failed"]
+
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        summary = (
+            f"📊 Daily summary at {now}:\n"
+            f"✅ Sent: {sent}\n"
+            f"❌ Failed: {len(failed_users)}\n"
+            f"👥 Total: {len(rows)}\n"
+            f"{stats.summary_line()}"
+        )
+        if failed_users:
+            summary += f"\n⚠️ Failed users: {', '.join(failed_users)}"
+
+        # Les lignes "Daily sent" partent avant le résumé
+        await self.log_buffer.flush(guild_id)
+        await self.send_log(guild, summary)
+        await self.log_buffer.flush(guild_id)
+        await self.publish_event(guild_id, 0, "daily_summary", {
+            "sent": sent,
+            "failed": len(failed_users),
+            "total": len(rows),
+            "elapsed": round(stats.elapsed, 2),
+            "throughput": round(stats.throughput, 2),
+            "latency_p50": round(stats.percentile(0.5), 3),
+            "latency_p95": round(stats.percentile(0.95), 3)
+        })
+        # Marqué après l'envoi : un crash entre les deux redonne le résumé plutôt que de le perdre
+        await self.db.execute("daily.guild_summarized", run_date, guild_id)
+        log.info("📊 Daily %s: %s sent, %s failed — %s", guild.name, sent, len(failed_users), stats.summary_line())
+
+    def shard_key(self) -> str:
+        shard_count, shard_ids = owned_shards(self.bot)
+        return f"{shard_count}:{','.join(map(str, shard_ids))}"
+
+    def leader_job(self) -> str:
+        # Un run par ensemble de shards, exécuté par un seul process du cluster
+        return f"daily:{self.shard_key()}"
+
+    async def run_daily(self, run_date: date):
+        if self._run_lock.locked():
+            log.info("ℹ️ Daily run %s already in progress", run_date)
+            return
+        async with self._run_lock:
+            await self._run_daily(run_date)
+
+    async def _run_daily(self, run_date: date):
+        shard_count, shard_ids = owned_shards(self.bot)
+        shard_key = self.shard_key()
+        created = await self.db.fetchval("daily.run_start", run_date, shard_key)
+        if created:
+            log.info("▶️ Daily run %s started (shards %s)", run_date, shard_key)
+            await self.notify_inactive_guilds()
+        else:
+            log.info("♻️ Daily run %s resumed (shards %s)", run_date, shard_key)
+
+        started = time.monotonic()
+        current_guild: int | None = None
+        stats = FanoutStats()
+        per_shard: dict[int, int] = {}
+
+        # Pages keyset de (guild_id, user_id) : une requête courte par lot, aucune connexion
+        # gardée pendant l'envoi des DMs
+        now = datetime.now(timezone.utc)
+        after = (0, 0)
+        while rows := await self.db.fetch(
+            "daily.run_pending", run_date, now, shard_count, shard_ids, *after, DAILY_RUN_CHUNK
+        ):
+            if not self.bot.cluster.is_leader(self.leader_job()):
+                # Un autre process a repris le bail : il reprendra au dernier checkpoint
+                log.warning("⚠️ Daily run %s interrupted, leadership lost", run_date)
+                return
+            after = (rows[-1]["guild_id"], rows[-1]["user_id"])
+            for guild_id, group in itertools.groupby(rows, key=lambda r: r["guild_id"]):
+                group = list(group)
+                shard_id = shard_for(guild_id, shard_count)
+                per_shard[shard_id] = per_shard.get(shard_id, 0) + len(group)
+                if guild_id != current_guild:
+                    if current_guild is not None:
+                        await self.finish_guild(run_date, current_guild, stats)
+                    current_guild = guild_id
+                    stats = FanoutStats()
+                await self.deliver_chunk(run_date, guild_id, group, stats)
+
+        if current_guild is not None:
+            await self.finish_guild(run_date, current_guild, stats)
+
+        if not created:
+            # Guildes entièrement livrées avant l'interruption : aucune page ne les relit
+            for row in await self.db.fetch("daily.unsummarized_guilds", run_date, shard_count, shard_ids):
+                await self.finish_guild(run_date, row["guild_id"], FanoutStats())
+
+        await self.db.execute("daily.run_finish", run_date, shard_key, datetime.now(timezone.utc))
+        await self.db.execute("daily.prune_runs", run_date - timedelta(days=DAILY_RETENTION_DAYS))
+        elapsed = time.monotonic() - started
+        DAILY_RUN_SECONDS.set(elapsed)
+        DAILY_RUN_THROUGHPUT.set(sum(per_shard.values()) / elapsed if elapsed > 0 else 0.0)
+        log.info("✅ Daily run %s finished — subscribers per shard: %s", run_date, dict(sorted(per_shard.items())))
+
+    @tasks.loop(time=dt_time(hour=0, tzinfo=timezone.utc))
+    async def daily_task(self):
+        await self.bot.wait_until_ready()
+        if not self.bot.cluster.is_leader(self.leader_job()):
+            log.info("ℹ️ Daily run skipped, not leader for %s", self.leader_job())
+            return
+        await self.run_daily(datetime.now(timezone.utc).date())
 
     @daily_task.before_loop
     async def before_daily_task(self):
         await self.bot.wait_until_ready()
-        now = datetime.now(timezone.utc)
-        target = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        if now >= target:
-            target += timedelta(days=1)
-        await discord.utils.sleep_until(target)
+        # Appelé à chaque prise de leadership (démarrage ou failover)
+        self.bot.cluster.register(self.leader_job(), on_elected=self.resume_unfinished_run)
+
+    async def resume_unfinished_run(self):
+        # Reprise d'un run interrompu (crash / redémarrage / failover) au lieu d'attendre 24h
+        today = datetime.now(timezone.utc).date()
+        unfinished = await self.db.fetchval("daily.run_unfinished", today, self.shard_key())
+        if unfinished:
+            await self.run_daily(today)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(DailyReminder(bot))
@@ -1,76 +1,39 @@
-import time
 import logging
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
-from datetime import datetime, timezone
-import asyncpg
-import json
+from discord.ext import commands
+
+from utils.db import Repository
+from utils.dedup import make_dedup_store
+from utils.embeds import AUTO_SUMMON, SummonEmbed
 
 log = logging.getLogger("cog-high-tier-moonquil")
 
-RARITY_EMOJIS = {
-    "1342202597389373530": "SR",
-    "1342202212948115510": "SSR",
-    "1342202203515125801": "UR",
-}
-
-RARITY_CUSTOM_EMOJIS = {
-    "SR": "<a:13422080344824259361ezgifcomopti:1438537746863095858>",
-    "SSR": "<a:emoji_1763043426681:1438533139512430633>",
-    "UR": "<a:emoji_1763043453782:1438533253903679618>",
-}
-
-RARITY_MESSAGES = {
-    "SR":  "{emoji} has summoned, claim it!",
-    "SSR": "{emoji} has summoned, claim it!",
-    "UR":  "{emoji} has summoned, claim it!!",
-}
-
-RARITY_PRIORITY = {"SR": 1, "SSR": 2, "UR": 3}
 DEFAULT_COOLDOWN = 300  # secondes
+INACTIVE_WARNING_COOLDOWN = 3600  # secondes
+TRIGGERED_TTL = 6 * 3600  # secondes
 
 class HighTier(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.triggered_messages = {}
-        self.pool: asyncpg.Pool | None = None
-        self.cleanup_triggered.start()
+        self.triggered_messages = make_dedup_store(bot, "high-tier-triggered", TRIGGERED_TTL)
+        self.inactive_warned = make_dedup_store(bot, "high-tier-inactive-warned", INACTIVE_WARNING_COOLDOWN)
+        self.db: Repository | None = None
 
     async def cog_load(self):
-        self.pool = self.bot.db_pool
-        log.info("✅ Pool Postgres attachée pour HighTier (Moonquil)")
+        self.db = self.bot.db
+        self.bot.embeds.subscribe(AUTO_SUMMON, self.on_auto_summon)
+        log.info("✅ Repository Postgres attaché pour HighTier (Moonquil)")
 
     def cog_unload(self):
-        self.cleanup_triggered.cancel()
+        self.bot.embeds.unsubscribe(AUTO_SUMMON, self.on_auto_summon)
 
     async def publish_event(self, guild_id: int, user_id: int, event_type: str, details: dict | None = None):
-        """Publie un événement vers Redis pour le Master avec bot_name=Moonquil."""
-        if not getattr(self.bot, "redis", None):
-            return
-        event = {
-            "bot_name": "Moonquil",       # ✅ nom du bot enfant
-            "bot_id": self.bot.user.id,   # ID du bot enfant
-            "guild_id": guild_id,
-            "user_id": user_id,
-            "event_type": event_type,
-            "details": details or {}
-        }
-        try:
-            await self.bot.redis.publish("bot_events", json.dumps(event))
-            log.info("📡 HighTier Event publié: %s", event)
-        except Exception as e:
-            log.error("❌ Impossible de publier l'événement Redis: %s", e)
+        """Publie un événement vers Redis pour le Master avec bot_name=Moonquil (non bloquant)."""
+        await self.bot.events.publish("Moonquil", guild_id, user_id, event_type, details)
 
     async def is_subscription_active(self, guild_id: int) -> bool:
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT expire_at FROM subscriptions WHERE server_id=$1", guild_id
-            )
-            if not row:
-                return False
-            expire_at = row["expire_at"]
-            return expire_at > datetime.now(timezone.utc)
+        return await self.bot.subscriptions.is_active(guild_id)
 
     async def get_config(self, guild: discord.Guild):
         config_cog = self.bot.get_cog("GuildConfig")
@@ -78,6 +41,10 @@ class HighTier(commands.Cog):
             return await config_cog.get_config(guild.id)
         return None
 
+    async def get_role_id(self, guild: discord.Guild) -> int | None:
+        config = await self.get_config(guild)
+        return config.get("high_tier_role_id") if config else None
+
     @app_commands.command(name="high-tier", description="Get the High Tier role to be notified of rare spawn")
     async def high_tier(self, interaction: discord.Interaction):
         await self._give_high_tier(interaction)
@@ -137,54 +104,27 @@ class HighTier(commands.Cog):
         except discord.Forbidden:
             await interaction.response.send_message("❌ Missing permissions to remove the role.", ephemeral=True)
 
-    @tasks.loop(minutes=30)
-    async def cleanup_triggered(self):
-        now = time.time()
-        self.triggered_messages = {
-            mid: ts for mid, ts in self.triggered_messages.items()
-            if now - ts < 6 * 3600
-        }
-
-    @cleanup_triggered.before_loop
-    async def before_cleanup_triggered(self):
-        await self.bot.wait_until_ready()
-
-    @commands.Cog.listener()
-    async def on_message_edit(self, before: discord.Message, after: discord.Message):
-        if not after.guild or not after.embeds:
+    # Appelé par l'EmbedDispatcher (topic AUTO_SUMMON)
+    async def on_auto_summon(self, event: SummonEmbed):
+        after = event.message
+        if await self.triggered_messages.seen(after.id):
             return
-        if after.id in self.triggered_messages:
-            return
-
-        embed = after.embeds[0]
-        title = (embed.title or "").lower()
-        desc = (embed.description or "")
-
-        if "auto summon" not in title:
-            return
-
-        found_rarity = None
-        highest_priority = 0
-        for emoji_id, rarity in RARITY_EMOJIS.items():
-            if str(emoji_id) in desc:
-                if RARITY_PRIORITY[rarity] > highest_priority:
-                    found_rarity = rarity
-                    highest_priority = RARITY_PRIORITY[rarity]
 
-        if found_rarity:
+        rarity = event.rarity
+        if rarity:
+            found_rarity = rarity.name
             if not await self.is_subscription_active(after.guild.id):
+                # Un seul avertissement par guilde et par période, pas un par edit
+                if not await self.inactive_warned.add(after.guild.id):
+                    return
                 await after.channel.send("⚠️ Subscription not active — High Tier spawn detected but notifications disabled.")
                 log.info("⛔ High Tier blocked: %s in %s › #%s (subscription inactive)", found_rarity, after.guild.name, after.channel.name)
                 return
 
-            config = await self.get_config(after.guild)
-            role_id = config["high_tier_role_id"] if config else None
-            role = after.guild.get_role(role_id) if role_id else None
+            role = await self.bot.resolver.role(after.guild, "high_tier", lambda: self.get_role_id(after.guild))
 
-            if role:
-                self.triggered_messages[after.id] = time.time()
-                emoji = RARITY_CUSTOM_EMOJIS.get(found_rarity, "🌸")
-                msg = RARITY_MESSAGES[found_rarity].format(emoji=emoji)
+            if role and await self.triggered_messages.add(after.id):
+                msg = rarity.message.format(emoji=rarity.custom_emoji)
 
                 log.info("🌸 High Tier Detected: %s in %s › #%s → notifying %s",
                          found_rarity, after.guild.name, after.channel.name, role.name if role else "None")
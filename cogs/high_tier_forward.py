@@ -1,49 +1,30 @@
 import discord
 from discord.ext import commands
 import logging
-import re
 
-log = logging.getLogger("cog-high-tier-forward")
-
-RARITY_EMOJIS = {
-    "1342202597389373530": "SR",
-    "1342202212948115510": "SSR",
-    "1342202203515125801": "UR",
-}
-
-RARITY_CUSTOM_EMOJIS = {
-    "SR": "<a:13422080344824259361ezgifcomopti:1438537746863095858>",
-    "SSR": "<a:emoji_1763043426681:1438533139512430633>",
-    "UR": "<a:emoji_1763043453782:1438533253903679618>",
-}
+from utils.dedup import make_dedup_store
+from utils.embeds import SUMMON_CLAIMED, SummonEmbed
+from utils.rarity import RarityEngine
 
-RARITY_PRIORITY = {"SR": 1, "SSR": 2, "UR": 3}
-HIGH_TIER_RARITIES = {"SR", "SSR", "UR"}
+log = logging.getLogger("cog-high-tier-forward")
 
 FORWARD_CHANNEL_ID = 1438519407751069778
+FORWARDED_TTL = 24 * 3600  # secondes
 
-def replace_rarity_tokens(text: str | None) -> str | None:
-    if not text:
-        return text
-    def repl(match):
-        token = match.group(0).upper()
-        return RARITY_CUSTOM_EMOJIS.get(token, token)
-    return re.sub(r"\b(SR|SSR|UR)\b", repl, text, flags=re.IGNORECASE)
-
-def clone_embed_with_emojis(source: discord.Embed) -> discord.Embed:
+def clone_embed_with_emojis(source: discord.Embed, rarities: RarityEngine) -> discord.Embed:
     new = discord.Embed(
-        title=replace_rarity_tokens(source.title),
-        description=replace_rarity_tokens(source.description),
+        title=rarities.replace_tokens(source.title),
+        description=rarities.replace_tokens(source.description),
         color=source.color
     )
     if source.author:
         new.set_author(
-            name=replace_rarity_tokens(source.author.name),
+            name=rarities.replace_tokens(source.author.name),
             icon_url=source.author.icon_url
         )
     if source.footer:
         new.set_footer(
-            text=replace_rarity_tokens(source.footer.text),
+            text=rarities.replace_tokens(source.footer.text),
             icon_url=source.footer.icon_url
         )
     if source.thumbnail:
@@ -53,8 +34,8 @@ def clone_embed_with_emojis(source: discord.Embed) -> discord.Embed:
     new.url = source.url
     for field in source.fields:
         new.add_field(
-            name=replace_rarity_tokens(field.name),
-            value=replace_rarity_tokens(field.value),
+            name=rarities.replace_tokens(field.name),
+            value=rarities.replace_tokens(field.value),
             inline=field.inline
         )
     return new
@@ -62,40 +43,37 @@ def clone_embed_with_emojis(source: discord.Embed) -> discord.Embed:
 class HighTierForward(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.forwarded_ids = set()
+        self.forwarded_ids = make_dedup_store(bot, "high-tier-forwarded", FORWARDED_TTL)
 
-    @commands.Cog.listener()
-    async def on_message_edit(self, before: discord.Message, after: discord.Message):
-        if not after.guild or not after.embeds:
-            return
-        if after.id in self.forwarded_ids:
-            return
+    async def cog_load(self):
+        self.bot.embeds.subscribe(SUMMON_CLAIMED, self.on_summon_claimed)
 
-        embed = after.embeds[0]
-        title = (embed.title or "").lower()
-        desc = embed.description or ""
+    def cog_unload(self):
+        self.bot.embeds.unsubscribe(SUMMON_CLAIMED, self.on_summon_claimed)
 
-        if "summon claimed" not in title:
+    # Appelé par l'EmbedDispatcher (topic SUMMON_CLAIMED)
+    async def on_summon_claimed(self, event: SummonEmbed):
+        after = event.message
+        if await self.forwarded_ids.seen(after.id):
             return
 
-        found_rarity = None
-        highest_priority = 0
-        for emoji_id, rarity in RARITY_EMOJIS.items():
-            if emoji_id in desc:
-                if RARITY_PRIORITY[rarity] > highest_priority:
-                    found_rarity = rarity
-                    highest_priority = RARITY_PRIORITY[rarity]
-
-        if not found_rarity or found_rarity not in HIGH_TIER_RARITIES:
+        embed = event.embed
+        rarity = event.rarity
+        if not rarity or not rarity.high_tier:
             return
+        found_rarity = rarity.name
 
         target_channel = self.bot.get_channel(FORWARD_CHANNEL_ID)
         if not target_channel:
             log.warning("❌ Salon de forwarding introuvable (%s)", FORWARD_CHANNEL_ID)
             return
 
-        emoji = RARITY_CUSTOM_EMOJIS.get(found_rarity, "🌸")
-        cloned = clone_embed_with_emojis(embed)
+        # Réservation avant l'envoi : un seul replica forwarde ce message
+        if not await self.forwarded_ids.add(after.id):
+            return
+
+        emoji = rarity.custom_emoji
+        cloned = clone_embed_with_emojis(embed, self.bot.rarities)
         source_name = after.guild.name
         source_channel = after.channel.name
 
@@ -107,7 +85,6 @@ class HighTierForward(commands.Cog):
         )
 
         await target_channel.send(header, embed=cloned)
-        self.forwarded_ids.add(after.id)
         log.info("📤 Forwarded High Tier (%s) from %s › #%s", found_rarity, source_name, source_channel)
 
 async def setup(bot: commands.Bot):
@@ -1,10 +1,17 @@
 import os
+import time
 import logging
 import asyncio
-import re
 import discord
 from discord.ext import commands, tasks
 import asyncpg
+
+from utils.coalescer import MENTIONS, MentionCoalescer
+from utils.embeds import MANUAL_SUMMON_CLAIMED, SummonEmbed
+from utils.job_queue import REMINDER_MODE, PostgresJobQueue
+from utils.reminder_store import REMINDER_STORE, ReminderStore, make_reminder_store
+from utils.db import Repository
+from utils.sharding import owned_shards, shard_counts
 from datetime import datetime, timedelta, timezone
 
 log = logging.getLogger("cog-reminder-memassistant")
@@ -13,6 +20,8 @@ COOLDOWN_SECONDS = int(os.getenv("COOLDOWN_SECONDS", "1800"))  # 30 min
 REMINDER_CLEANUP_MINUTES = int(os.getenv("REMINDER_CLEANUP_MINUTES", "10"))
 BOT_NAME = "MemAssistant"
 TASK_NAME = "Reminder"
+SCHEDULER_KIND = "summon-reminder"
+CLEANUP_JOB = "cleanup:reminders"
 
 REMINDER_ANNOUNCE_CHANNEL_ID = 1439274847115939982
 REMINDER_DENY_CHANNEL_ID = 1438563704751915018
@@ -20,189 +29,214 @@ REMINDER_DENY_CHANNEL_ID = 1438563704751915018
 class Reminder(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.active_reminders: dict[str, asyncio.Task] = {}
-        self.pool: asyncpg.Pool | None = None
+        self.db: Repository | None = None
+        self.queue: PostgresJobQueue | None = None
+        self.store: ReminderStore | None = None
+        # Annonces regroupées par salon : une vague de rappels = quelques messages
+        self.outbox = MentionCoalescer()
         self.cleanup_task.start()
 
     async def cog_load(self):
-        self.pool = self.bot.db_pool
-        log.info("✅ Postgres pool attached for Reminder (%s)", BOT_NAME)
-
-    def cog_unload(self):
+        self.db = self.bot.db
+        # La file de jobs repose sur SKIP LOCKED : stockage Postgres obligatoire en mode queue
+        self.store = make_reminder_store(
+            self.bot, "reminders", {"bot_name": BOT_NAME, "task": TASK_NAME},
+            backend="postgres" if REMINDER_MODE == "queue" else REMINDER_STORE
+        )
+        if REMINDER_MODE == "queue":
+            self.queue = PostgresJobQueue(self.bot, "reminders", self.claim_due, self.deliver_due, self.complete_due)
+            self.queue.start()
+        else:
+            self.bot.scheduler.register(SCHEDULER_KIND, self.fire_reminders, self.load_due_reminders)
+        self.bot.embeds.subscribe(MANUAL_SUMMON_CLAIMED, self.on_summon_claimed)
+        self.bot.cluster.register(CLEANUP_JOB)
+        log.info("✅ Reminder ready (%s, mode %s, store %s)", BOT_NAME, REMINDER_MODE, self.store.backend)
+
+    async def cog_unload(self):
         self.cleanup_task.cancel()
+        self.bot.embeds.unsubscribe(MANUAL_SUMMON_CLAIMED, self.on_summon_claimed)
+        if self.queue:
+            await self.queue.stop()
+        await self.outbox.stop()
 
     async def _get_channel(self, guild: discord.Guild, channel_id: int) -> discord.TextChannel | None:
-        channel = guild.get_channel(channel_id)
-        if channel and isinstance(channel, discord.TextChannel):
-            return channel
-        try:
-            fetched = await self.bot.fetch_channel(channel_id)
-            return fetched if isinstance(fetched, discord.TextChannel) else None
-        except discord.HTTPException:
-            return None
+        channel = await self.bot.resolver.channel(guild, channel_id)
+        return channel if isinstance(channel, discord.TextChannel) else None
+
+    async def _announce(self, channel: discord.TextChannel, template: str, member: discord.Member):
+        if self.queue:
+            # Mode queue : la ligne n'est supprimée qu'après l'envoi, rien ne doit attendre en mémoire.
+            # Forbidden est définitif ; les autres erreurs remontent pour que le job soit retenté.
+            try:
+                await channel.send(template.replace(MENTIONS, member.mention),
+                                   allowed_mentions=discord.AllowedMentions(users=True))
+            except discord.Forbidden:
+                log.warning("❌ Cannot send in #%s", channel.name)
+            return
+        await self.outbox.notify(channel, template, member)
 
     async def send_start_message(self, guild: discord.Guild, member: discord.Member):
         channel = await self._get_channel(guild, REMINDER_ANNOUNCE_CHANNEL_ID)
         if channel:
-            await channel.send(
-                f"▶️ **Reminder** started for {member.mention} — next availability in {COOLDOWN_SECONDS // 60} minutes.",
-                allowed_mentions=discord.AllowedMentions(users=True)
+            await self._announce(
+                channel,
+                f"▶️ **Reminder** started for {MENTIONS} — next availability in {COOLDOWN_SECONDS // 60} minutes.",
+                member
             )
 
     async def send_finish_message(self, guild: discord.Guild, member: discord.Member):
         channel = await self._get_channel(guild, REMINDER_ANNOUNCE_CHANNEL_ID)
         if channel:
-            await channel.send(
-                f"⏹️ **Reminder** finished for {member.mention}.",
-                allowed_mentions=discord.AllowedMentions(users=True)
-            )
+            await self._announce(channel, f"⏹️ **Reminder** finished for {MENTIONS}.", member)
 
     async def send_reminder_message(self, channel: discord.TextChannel, member: discord.Member):
-        try:
-            await channel.send(
-                f"⏱️ Hey {member.mention}, your </summon:1301277778385174601> is available <:KDYEY:1438589525537591346>",
-                allowed_mentions=discord.AllowedMentions(users=True)
-            )
-            log.info("⏰ Reminder sent to %s in #%s", member.display_name, channel.name)
-        except discord.Forbidden:
-            log.warning("❌ Cannot send reminder in #%s", channel.name)
+        await self._announce(
+            channel,
+            f"⏱️ Hey {MENTIONS}, your </summon:1301277778385174601> is available <:KDYEY:1438589525537591346>",
+            member
+        )
+        log.info("⏰ Reminder queued for %s in #%s", member.display_name, channel.name)
 
     async def send_deny_message(self, guild: discord.Guild, member: discord.Member):
         channel = guild.get_channel(REMINDER_DENY_CHANNEL_ID)
         if channel:
-            await channel.send(
-                f"🚫 **Reminder** — action denied for {member.mention}\n🔒 Subscription inactive or expired.",
-                allowed_mentions=discord.AllowedMentions(users=True)
+            await self._announce(
+                channel, f"🚫 **Reminder** — action denied for {MENTIONS}\n🔒 Subscription inactive or expired.", member
             )
 
+    async def has_active_reminder(self, key: tuple[int, int]) -> bool:
+        if self.bot.scheduler.is_scheduled(SCHEDULER_KIND, key):
+            return True
+        # Hors de la fenêtre du scheduler (cooldown plus long, fenêtre pas encore rechargée) : le store fait foi
+        entry = await self.store.get(key)
+        return entry is not None and entry[1] > time.time()
+
     async def start_reminder(self, member: discord.Member, summon_channel: discord.TextChannel):
-        key = f"{member.guild.id}:{member.id}"
-        if key in self.active_reminders:
+        key = (member.guild.id, member.id)
+        if not self.queue and await self.has_active_reminder(key):
             return
 
         # Check subscription
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT expire_at FROM public.subscriptions WHERE server_id = $1",
-                member.guild.id
-            )
-        now = datetime.now(timezone.utc)
-        if not row or row["expire_at"] < now:
+        if not await self.bot.subscriptions.is_active(member.guild.id):
             await self.send_deny_message(member.guild, member)
             log.warning("🔒 Reminder denied for %s — no active subscription", member.display_name)
             return
 
-        expire_at = now + timedelta(seconds=COOLDOWN_SECONDS)
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "INSERT INTO reminders (bot_name, task, guild_id, user_id, channel_id, expire_at) "
-                "VALUES ($1, $2, $3, $4, $5, $6) "
-                "ON CONFLICT (bot_name, task, guild_id, user_id) DO UPDATE SET channel_id=$5, expire_at=$6",
-                BOT_NAME, TASK_NAME, member.guild.id, member.id, summon_channel.id, expire_at
-            )
+        expire_at = datetime.now(timezone.utc) + timedelta(seconds=COOLDOWN_SECONDS)
+        if self.queue:
+            # La ligne est le job : écriture immédiate, dédup par la base entre tous les process
+            # (n'écrase qu'un rappel déjà échu, sinon le membre a déjà un rappel actif)
+            if not await self.db.fetchval(
+                "reminders.queue_upsert", BOT_NAME, TASK_NAME, *key, summon_channel.id, expire_at
+            ):
+                return
+        else:
+            # Planifié avant tout await : un fire_reminders concurrent voit le rappel relancé
+            # et n'annule pas la ligne qu'on écrit
+            self.bot.scheduler.schedule(SCHEDULER_KIND, key, expire_at.timestamp(), summon_channel.id)
+            await self.store.put(key, expire_at.timestamp(), summon_channel.id)
 
         # Start message in fixed channel
         await self.send_start_message(member.guild, member)
-
-        async def reminder_task():
-            try:
-                await asyncio.sleep(COOLDOWN_SECONDS)
-                # Reminder in summon channel
-                await self.send_reminder_message(summon_channel, member)
-            finally:
-                # Finish message in fixed channel
-                await self.send_finish_message(member.guild, member)
-                self.active_reminders.pop(key, None)
-                async with self.pool.acquire() as conn:
-                    await conn.execute(
-                        "DELETE FROM reminders WHERE bot_name=$1 AND task=$2 AND guild_id=$3 AND user_id=$4",
-                        BOT_NAME, TASK_NAME, member.guild.id, member.id
-                    )
-                log.info("🗑️ Reminder deleted for %s", member.display_name)
-
-        self.active_reminders[key] = asyncio.create_task(reminder_task())
         log.info("▶️ Reminder started for %s (%ss)", member.display_name, COOLDOWN_SECONDS)
 
-    async def restore_reminders(self):
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT guild_id, user_id, channel_id, expire_at FROM reminders WHERE bot_name=$1 AND task=$2",
-                BOT_NAME, TASK_NAME
-            )
-        now = datetime.now(timezone.utc)
-
-        for row in rows:
-            remaining = (row["expire_at"] - now).total_seconds()
-            if remaining <= 0:
-                async with self.pool.acquire() as conn:
-                    await conn.execute(
-                        "DELETE FROM reminders WHERE bot_name=$1 AND task=$2 AND guild_id=$3 AND user_id=$4",
-                        BOT_NAME, TASK_NAME, row["guild_id"], row["user_id"]
-                    )
-                continue
-
-            guild = self.bot.get_guild(row["guild_id"])
-            if not guild:
-                continue
-            member = guild.get_member(row["user_id"])
-            if not member:
-                continue
-            summon_channel = guild.get_channel(row["channel_id"])
-            if not summon_channel:
+    async def load_due_reminders(self, until: float):
+        """Reminders due inside the scheduler window for our shards (already expired ones are left to cleanup_task)."""
+        entries = await self.store.due_between(time.time(), until)
+        if entries:
+            shard_count, _ = owned_shards(self.bot)
+            log.info("🧩 Reminder window per shard: %s", shard_counts((key[0] for key, _, _ in entries), shard_count))
+        return entries
+
+    async def _fire_reminder(self, guild_id: int, user_id: int, channel_id: int):
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
+        member = await self.bot.members.get(guild, user_id)
+        if not member:
+            return
+        summon_channel = guild.get_channel(channel_id)
+        try:
+            # Reminder in summon channel
+            if summon_channel:
+                await self.send_reminder_message(summon_channel, member)
+        finally:
+            # Finish message in fixed channel
+            await self.send_finish_message(guild, member)
+            log.info("🗑️ Reminder deleted for %s", member.display_name)
+
+    async def fire_reminders(self, batch: list[tuple[tuple[int, int], int]]):
+        results = await asyncio.gather(
+            *(self._fire_reminder(guild_id, user_id, channel_id) for (guild_id, user_id), channel_id in batch),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                log.error("❌ Reminder delivery failed: %s", result)
+        # Les pings du lot partent groupés, mais avant que le store ne les oublie
+        await self.outbox.flush_all()
+
+        fired_at = time.time()
+        for key, _ in batch:
+            # Un nouveau rappel a déjà été lancé pour ce membre : son put écrase l'entrée
+            if self.bot.scheduler.is_scheduled(SCHEDULER_KIND, key):
                 continue
-
-            key = f"{guild.id}:{member.id}"
-
-            async def reminder_task():
-                try:
-                    await asyncio.sleep(remaining)
-                    await self.send_reminder_message(summon_channel, member)
-                finally:
-                    await self.send_finish_message(guild, member)
-                    self.active_reminders.pop(key, None)
-                    async with self.pool.acquire() as conn:
-                        await conn.execute(
-                            "DELETE FROM reminders WHERE bot_name=$1 AND task=$2 AND guild_id=$3 AND user_id=$4",
-                            BOT_NAME, TASK_NAME, guild.id, member.id
-                        )
-
-            self.active_reminders[key] = asyncio.create_task(reminder_task())
-            log.info("♻️ Restored reminder for %s (%ss left)", member.display_name, remaining)
+            await self.store.cancel(key, fired_at)
+
+    # --- Mode queue (REMINDER_MODE=queue) ---
+    async def claim_due(self, limit: int, lease_seconds: int):
+        shard_count, shard_ids = owned_shards(self.bot)
+        return await self.db.fetch(
+            "reminders.claim_due", BOT_NAME, TASK_NAME, shard_count, shard_ids, limit, lease_seconds
+        )
+
+    async def deliver_due(self, rows: list[asyncpg.Record]) -> list[asyncpg.Record]:
+        results = await asyncio.gather(
+            *(self._fire_reminder(row["guild_id"], row["user_id"], row["channel_id"]) for row in rows),
+            return_exceptions=True
+        )
+        delivered = []
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                log.error("❌ Reminder delivery failed (will retry): %s", result)
+            else:
+                delivered.append(row)
+        return delivered
+
+    async def complete_due(self, rows: list[asyncpg.Record]):
+        await self.db.execute(
+            "reminders.complete_due", BOT_NAME, TASK_NAME,
+            [row["guild_id"] for row in rows], [row["user_id"] for row in rows], [row["expire_at"] for row in rows]
+        )
 
     @tasks.loop(minutes=REMINDER_CLEANUP_MINUTES)
     async def cleanup_task(self):
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "DELETE FROM reminders WHERE expire_at <= $1",
-                datetime.now(timezone.utc)
-            )
-        log.info("🧹 Cleanup: expired reminders deleted")
+        # En mode queue, les lignes échues sont des jobs en attente : on n'y touche pas
+        if self.queue:
+            return
+        # DELETE global : un seul process du cluster s'en charge
+        if not self.bot.cluster.is_leader(CLEANUP_JOB):
+            return
+        expired = await self.store.pop_due(time.time())
+        log.info("🧹 Cleanup: %s expired reminders deleted", len(expired))
 
     @cleanup_task.before_loop
     async def before_cleanup(self):
         await self.bot.wait_until_ready()
-        await self.restore_reminders()
+        shard_count, shard_ids = owned_shards(self.bot)
+        log.info("📋 Pending reminders per shard (%s/%s): %s",
+                 shard_ids, shard_count, await self.store.count_by_shard())
 
-    @commands.Cog.listener()
-    async def on_message_edit(self, before: discord.Message, after: discord.Message):
-        if not after.guild or not after.embeds:
+    # Appelé par l'EmbedDispatcher (topic MANUAL_SUMMON_CLAIMED)
+    async def on_summon_claimed(self, event: SummonEmbed):
+        if event.claimer_id is None:
             return
-
-        embed = after.embeds[0]
-        title = (embed.title or "").lower()
-        desc = embed.description or ""
-        footer = embed.footer.text.lower() if embed.footer and embed.footer.text else ""
-
-        if "summon claimed" in title and "auto summon claimed" not in title:
-            match = re.search(r"<@!?(\d+)>", desc) or (re.search(r"<@!?(\d+)>", footer) if "claimed by" in footer else None)
-            if not match:
-                return
-            user_id = int(match.group(1))
-            member = after.guild.get_member(user_id)
-            if not member:
-                return
-            await self.start_reminder(member, after.channel)
+        after = event.message
+        member = await self.bot.members.get(after.guild, event.claimer_id)
+        if not member:
+            return
+        await self.start_reminder(member, after.channel)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Reminder(bot))
-    log.info("⚙️ Reminder cog loaded (%s + Postgres)", BOT_NAME)
+    log.info("⚙️ Reminder cog loaded (%s + %s)", BOT_NAME, REMINDER_STORE)
@@ -1,10 +1,22 @@
+import io
 import discord
+from discord import app_commands
 from discord.ext import commands
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+from utils.paginator import KeysetPaginator
+from utils.codes import MAX_CODES_PER_BATCH, codes_csv, generate_codes, import_codes, parse_codes_csv
 
 log = logging.getLogger("cog-memassistant-subscription")
 
+MAX_SUBSCRIPTION_DAYS = 3650
+
+
+async def _is_bot_owner(interaction: discord.Interaction) -> bool:
+    # Les codes valent des abonnements pour n'importe quel serveur : réservé au propriétaire du bot
+    return await interaction.client.is_owner(interaction.user)
+
 class MemAssistantSubscription(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -14,30 +26,59 @@ class MemAssistantSubscription(commands.Cog):
         description="Activate a subscription using a code"
     )
     async def activate_subscription(self, interaction: discord.Interaction, code: str):
-        async with self.bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT server_id, expire_at FROM public.subscription_codes WHERE code = $1",
-                code
-            )
-            if not row:
-                await interaction.response.send_message("❌ Invalid code.", ephemeral=True)
-                return
-
-            server_id, expire_at = row["server_id"], row["expire_at"]
+        # Une seule instruction : le code est consommé et l'abonnement écrit ensemble, ou rien
+        row = await self.bot.db.fetchrow("subscription_codes.redeem", code)
+        if not row:
+            await interaction.response.send_message("❌ Invalid code.", ephemeral=True)
+            return
 
-            await conn.execute("""
-                INSERT INTO public.subscriptions (server_id, expire_at)
-                VALUES ($1, $2)
-                ON CONFLICT (server_id) DO UPDATE SET expire_at = $2
-            """, server_id, expire_at)
+        server_id, expire_at = row["server_id"], row["expire_at"]
 
-            await conn.execute("DELETE FROM public.subscription_codes WHERE code = $1", code)
+        # Invalide le cache d'abonnement de tous les process du bot
+        await self.bot.subscriptions.invalidate(server_id)
 
         await interaction.response.send_message(
             f"✅ Subscription activated for server `{server_id}` until {expire_at:%Y-%m-%d}",
             ephemeral=True
         )
 
+    @app_commands.command(name="generate_codes", description="Generate subscription codes (bot owner)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.check(_is_bot_owner)
+    async def generate_codes_command(self, interaction: discord.Interaction, server_id: str,
+                                     days: app_commands.Range[int, 1, MAX_SUBSCRIPTION_DAYS],
+                                     count: app_commands.Range[int, 1, MAX_CODES_PER_BATCH]):
+        # Les ids de serveur dépassent les entiers 53 bits des options Discord : passés en texte
+        if not server_id.isdigit():
+            await interaction.response.send_message("❌ Invalid server id.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        expire_at = datetime.now(timezone.utc) + timedelta(days=days)
+        # Le fichier ne liste que les codes réellement écrits : un code en conflit n'est pas utilisable
+        inserted = await import_codes(self.bot.db, generate_codes(int(server_id), expire_at, count))
+        log.info("🎟️ %s codes generated by %s for %s", len(inserted), interaction.user, server_id)
+        await interaction.followup.send(
+            f"✅ {len(inserted)} codes for `{server_id}` until {expire_at:%Y-%m-%d}",
+            file=discord.File(io.BytesIO(codes_csv(inserted).encode()), filename=f"codes-{server_id}.csv"),
+            ephemeral=True
+        )
+
+    @app_commands.command(name="import_codes", description="Import subscription codes from a CSV (bot owner)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.check(_is_bot_owner)
+    async def import_codes_command(self, interaction: discord.Interaction, file: discord.Attachment):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            records = parse_codes_csv((await file.read()).decode("utf-8-sig"))
+        except (ValueError, UnicodeDecodeError) as e:
+            await interaction.followup.send(f"❌ Invalid CSV ({e}). Expected `code,server_id,expire_at`.", ephemeral=True)
+            return
+        inserted = len(await import_codes(self.bot.db, records))
+        log.info("🎟️ %s/%s codes imported by %s", inserted, len(records), interaction.user)
+        await interaction.followup.send(
+            f"✅ {inserted} codes imported ({len(records) - inserted} already present).", ephemeral=True
+        )
+
     @discord.app_commands.command(
         name="check_subscription",
         description="Check the subscription status of this server"
@@ -46,11 +87,7 @@ class MemAssistantSubscription(commands.Cog):
         server_id = int(interaction.guild.id)
         log.info("🔍 Vérification de la souscription pour server_id = %s", server_id)
 
-        async with self.bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT expire_at FROM public.subscriptions WHERE server_id = $1",
-                server_id
-            )
+        row = await self.bot.db.fetchrow("subscriptions.by_server", server_id)
 
         if not row:
             await interaction.response.send_message(
@@ -78,16 +115,18 @@ class MemAssistantSubscription(commands.Cog):
         description="List all subscriptions visible to this bot"
     )
     async def raw_subs(self, interaction: discord.Interaction):
-        async with self.bot.db_pool.acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT server_id, expire_at FROM public.subscriptions ORDER BY expire_at DESC"
-            )
+        async def fetch(cursor, limit):
+            return await self.bot.db.fetch("subscriptions.page", *cursor, limit)
 
-        if not rows:
-            await interaction.response.send_message("❌ No subscriptions found.", ephemeral=True)
-        else:
-            msg = "\n".join([f"`{r['server_id']}` → {r['expire_at']:%Y-%m-%d}" for r in rows])
-            await interaction.response.send_message(f"📋 Visible subscriptions:\n{msg}", ephemeral=True)
+        async def render(rows):
+            return [f"`{r['server_id']}` → {r['expire_at']:%Y-%m-%d}" for r in rows]
+
+        # Du plus lointain au plus proche : le premier curseur est après toute date réelle
+        paginator = KeysetPaginator(
+            interaction.user.id, "📋 Visible subscriptions", fetch,
+            lambda r: (r["expire_at"], r["server_id"]), render, (datetime.max.replace(tzinfo=timezone.utc), 2 ** 63 - 1)
+        )
+        await paginator.start(interaction, "❌ No subscriptions found.")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(MemAssistantSubscription(bot))
@@ -1,3 +1,4 @@
+import time
 import logging
 import asyncio
 import re
@@ -6,49 +7,58 @@ from discord import app_commands
 from discord.ext import commands, tasks
 from datetime import datetime, timedelta, timezone
 import asyncpg
-import json
+
+from utils.embeds import MAZOKU_BOT_ID
+from utils.metrics import HANDLER_SECONDS
+from utils.paginator import KeysetPaginator
+from utils.job_queue import REMINDER_MODE, PostgresJobQueue
+from utils.reminder_store import REMINDER_STORE, ReminderStore, make_reminder_store
+from utils.db import Repository
+from utils.sharding import owned_shards, shard_counts
 
 log = logging.getLogger("cog-vote-reminder")
 
 VOTE_REMINDER_COOLDOWN_HOURS = 12
-MAZOKU_BOT_ID = 1242388858897956906  # ID du bot Mazoku
+SCHEDULER_KIND = "vote-reminder"
+CLEANUP_JOB = "cleanup:vote_reminders"
 
 class VoteReminder(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.pool: asyncpg.Pool | None = None
-        self.active_reminders = {}
+        self.db: Repository | None = None
+        self.queue: PostgresJobQueue | None = None
+        self.store: ReminderStore | None = None
         self.cleanup_task.start()
         self._restored = False
 
     async def cog_load(self):
-        self.pool = self.bot.db_pool
-        log.info("✅ Pool Postgres attachée pour VoteReminder")
-
-    def cog_unload(self):
+        self.db = self.bot.db
+        # La file de jobs repose sur SKIP LOCKED : stockage Postgres obligatoire en mode queue
+        self.store = make_reminder_store(
+            self.bot, "vote_reminders", backend="postgres" if REMINDER_MODE == "queue" else REMINDER_STORE
+        )
+        if REMINDER_MODE == "queue":
+            self.queue = PostgresJobQueue(self.bot, "vote_reminders", self.claim_due, self.deliver_due, self.complete_due)
+            self.queue.start()
+        else:
+            self.bot.scheduler.register(SCHEDULER_KIND, self.fire_vote_reminders, self.load_due_reminders)
+        self.bot.cluster.register(CLEANUP_JOB)
+        log.info("✅ VoteReminder prêt (mode %s, stockage %s)", REMINDER_MODE, self.store.backend)
+
+    async def cog_unload(self):
         self.cleanup_task.cancel()
+        if self.queue:
+            await self.queue.stop()
 
     async def publish_event(self, guild_id: int, user_id: int, event_type: str, details: dict | None = None):
-        """Publie un événement vers Redis pour le Master avec bot_name=MemAssistant."""
-        if not getattr(self.bot, "redis", None):
-            return
-        event = {
-            "bot_name": "MemAssistant",   # ✅ nom du bot enfant
-            "bot_id": self.bot.user.id,   # ID du bot enfant
-            "guild_id": guild_id,
-            "user_id": user_id,
-            "event_type": event_type,
-            "details": details or {}
-        }
-        try:
-            await self.bot.redis.publish("bot_events", json.dumps(event))
-            log.info("📡 VoteReminder Event publié: %s", event)
-        except Exception as e:
-            log.error("❌ Impossible de publier l'événement Redis: %s", e)
+        """Publie un événement vers Redis pour le Master avec bot_name=MemAssistant (non bloquant)."""
+        await self.bot.events.publish("MemAssistant", guild_id, user_id, event_type, details)
 
     async def send_vote_reminder(self, member: discord.Member):
+        dm_channel = await self.bot.resolver.dm_channel(member)
+        if dm_channel is None:
+            return
         try:
-            dm_channel = await member.create_dm()
             await dm_channel.send("Hey you can vote for Mazoku again ! <:KDYEY:1438589525537591346>")
             log.info("🔔 Vote reminder DM sent to %s", member.display_name)
             await self.publish_event(member.guild.id, member.id, "vote_reminder_triggered")
@@ -56,97 +66,98 @@ class VoteReminder(commands.Cog):
             log.warning("❌ Cannot send DM to %s", member.display_name)
 
     async def start_vote_reminder(self, member: discord.Member, channel: discord.TextChannel):
-        key = f"{member.guild.id}:{member.id}"
-        if key in self.active_reminders:
+        key = (member.guild.id, member.id)
+        # Le store, pas le scheduler : un rappel de 12h est hors de sa fenêtre. Un second vote
+        # ne relance pas le compte à rebours
+        entry = await self.store.get(key)
+        if entry and entry[1] > time.time():
             return
 
         expire_at = datetime.now(timezone.utc) + timedelta(hours=VOTE_REMINDER_COOLDOWN_HOURS)
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "INSERT INTO vote_reminders (guild_id, user_id, channel_id, expire_at) "
-                "VALUES ($1, $2, $3, $4) "
-                "ON CONFLICT (guild_id, user_id) DO UPDATE SET channel_id=$3, expire_at=$4",
-                member.guild.id, member.id, channel.id, expire_at
-            )
+        # 12h > fenêtre du scheduler : la ligne sera chargée quand elle y entrera.
+        # Planifié avant tout await, comme pour les rappels de summon
+        if not self.queue:
+            self.bot.scheduler.schedule(SCHEDULER_KIND, key, expire_at.timestamp(), channel.id)
+        await self.store.put(key, expire_at.timestamp(), channel.id)
 
         await self.publish_event(member.guild.id, member.id, "vote_reminder_started", {
             "channel": channel.id,
             "expire_at": expire_at.isoformat()
         })
-
-        async def reminder_task():
-            try:
-                log.info("▶️ Vote reminder task started for %s (%sh)", member.display_name, VOTE_REMINDER_COOLDOWN_HOURS)
-                await asyncio.sleep(VOTE_REMINDER_COOLDOWN_HOURS * 3600)
+        log.info("▶️ Vote reminder started for %s (%sh)", member.display_name, VOTE_REMINDER_COOLDOWN_HOURS)
+
+    async def load_due_reminders(self, until: float):
+        entries = await self.store.due_between(time.time(), until)
+        if entries:
+            shard_count, _ = owned_shards(self.bot)
+            log.info("🧩 Vote reminder window per shard: %s", shard_counts((key[0] for key, _, _ in entries), shard_count))
+        return entries
+
+    async def _fire_vote_reminder(self, guild_id: int, user_id: int):
+        guild = self.bot.get_guild(guild_id)
+        member = await self.bot.members.get(guild, user_id) if guild else None
+        try:
+            if member:
                 await self.send_vote_reminder(member)
-            finally:
-                self.active_reminders.pop(key, None)
-                async with self.pool.acquire() as conn:
-                    await conn.execute(
-                        "DELETE FROM vote_reminders WHERE guild_id=$1 AND user_id=$2",
-                        member.guild.id, member.id
-                    )
-                log.info("🗑️ Vote reminder deleted for %s", member.display_name)
-                await self.publish_event(member.guild.id, member.id, "vote_reminder_deleted")
-
-        task = asyncio.create_task(reminder_task())
-        self.active_reminders[key] = task
-
-    async def restore_reminders(self):
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch("SELECT guild_id, user_id, channel_id, expire_at FROM vote_reminders")
-        now = datetime.now(timezone.utc)
-
-        restored_count = 0
-
-        for row in rows:
-            guild = self.bot.get_guild(row["guild_id"])
-            if not guild:
-                continue
-            member = guild.get_member(row["user_id"])
-            if not member:
+        finally:
+            log.info("🗑️ Vote reminder deleted for %s", member.display_name if member else user_id)
+            await self.publish_event(guild_id, user_id, "vote_reminder_deleted")
+
+    async def fire_vote_reminders(self, batch: list[tuple[tuple[int, int], int]]):
+        results = await asyncio.gather(
+            *(self._fire_vote_reminder(guild_id, user_id) for (guild_id, user_id), _ in batch),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                log.error("❌ Vote reminder delivery failed: %s", result)
+
+        fired_at = time.time()
+        for key, _ in batch:
+            if self.bot.scheduler.is_scheduled(SCHEDULER_KIND, key):
                 continue
+            await self.store.cancel(key, fired_at)
+
+    # --- Mode queue (REMINDER_MODE=queue) ---
+    async def claim_due(self, limit: int, lease_seconds: int):
+        shard_count, shard_ids = owned_shards(self.bot)
+        return await self.db.fetch("vote_reminders.claim_due", shard_count, shard_ids, limit, lease_seconds)
+
+    async def deliver_due(self, rows: list[asyncpg.Record]) -> list[asyncpg.Record]:
+        results = await asyncio.gather(
+            *(self._fire_vote_reminder(row["guild_id"], row["user_id"]) for row in rows),
+            return_exceptions=True
+        )
+        delivered = []
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                log.error("❌ Vote reminder delivery failed (will retry): %s", result)
+            else:
+                delivered.append(row)
+        return delivered
+
+    async def complete_due(self, rows: list[asyncpg.Record]):
+        await self.db.execute(
+            "vote_reminders.complete_due",
+            [row["guild_id"] for row in rows], [row["user_id"] for row in rows], [row["expire_at"] for row in rows]
+        )
 
-            remaining = (row["expire_at"] - now).total_seconds()
-            if remaining <= 0:
-                async with self.pool.acquire() as conn:
-                    await conn.execute(
-                        "DELETE FROM vote_reminders WHERE guild_id=$1 AND user_id=$2",
-                        row["guild_id"], row["user_id"]
-                    )
-                continue
+    async def restore_reminders(self):
+        # Les rappels eux-mêmes sont rechargés par le scheduler, fenêtre par fenêtre
+        per_shard = await self.store.count_by_shard()
+        restored_count = sum(per_shard.values())
 
-            async def reminder_task():
-                try:
-                    log.info("♻️ Restored vote reminder for %s (%ss left)", member.display_name, remaining)
-                    await asyncio.sleep(remaining)
-                    await self.send_vote_reminder(member)
-                finally:
-                    self.active_reminders.pop(f"{guild.id}:{member.id}", None)
-                    async with self.pool.acquire() as conn:
-                        await conn.execute(
-                            "DELETE FROM vote_reminders WHERE guild_id=$1 AND user_id=$2",
-                            guild.id, member.id
-                        )
-                    log.info("🗑️ Restored vote reminder deleted for %s", member.display_name)
-                    await self.publish_event(guild.id, member.id, "vote_reminder_deleted")
-
-            task = asyncio.create_task(reminder_task())
-            self.active_reminders[f"{guild.id}:{member.id}"] = task
-            restored_count += 1
-
-            await self.publish_event(guild.id, member.id, "vote_reminder_restored", {
-                "remaining": remaining
-            })
-
-        log.info("📋 Checklist: %s vote reminders restored after restart", restored_count)
+        log.info("📋 Checklist: %s vote reminders restored after restart (per shard: %s)",
+                 restored_count, per_shard)
         await self.publish_event(0, 0, "vote_reminder_checklist", {"restored_count": restored_count})
 
     @tasks.loop(minutes=30)
     async def cleanup_task(self):
-        async with self.pool.acquire() as conn:
-            await conn.execute("DELETE FROM vote_reminders WHERE expire_at <= $1", datetime.now(timezone.utc))
-        log.info("🧹 Cleanup: expired vote reminders deleted")
+        # En mode queue, les lignes échues sont des jobs en attente : on n'y touche pas
+        if self.queue or not self.bot.cluster.is_leader(CLEANUP_JOB):
+            return
+        expired = await self.store.pop_due(time.time())
+        log.info("🧹 Cleanup: %s expired vote reminders deleted", len(expired))
 
     @cleanup_task.before_loop
     async def before_cleanup(self):
@@ -162,7 +173,10 @@ class VoteReminder(commands.Cog):
             return
         if str(message.author.id) != str(MAZOKU_BOT_ID):
             return
+        with HANDLER_SECONDS.labels(handler="VoteReminder.on_message").time():
+            await self._handle_vote(message)
 
+    async def _handle_vote(self, message: discord.Message):
         embed = message.embeds[0]
         footer_text = embed.footer.text if embed.footer else ""
         author_name = embed.author.name if embed.author else ""
@@ -173,7 +187,7 @@ class VoteReminder(commands.Cog):
                 return
 
             user_id = int(match.group(1))
-            member = message.guild.get_member(user_id)
+            member = await self.bot.members.get(message.guild, user_id)
             if not member:
                 return
 
@@ -184,27 +198,28 @@ class VoteReminder(commands.Cog):
     @app_commands.command(name="vote-status", description="Show active vote reminders in this server")
     @app_commands.checks.has_permissions(administrator=True)
     async def vote_status(self, interaction: discord.Interaction):
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT user_id, expire_at FROM vote_reminders WHERE guild_id=$1",
-                interaction.guild.id
-            )
-
-        if not rows:
-            await interaction.response.send_message("ℹ️ No active vote reminders in this server.", ephemeral=True)
-            return
-
-        now = datetime.now(timezone.utc)
-        lines = []
-        for row in rows:
-            member = interaction.guild.get_member(row["user_id"])
-            if not member:
-                continue
-            remaining = int((row["expire_at"] - now).total_seconds() // 60)
-            lines.append(f"🗳️ {member.mention} → {remaining} minutes left")
-
-        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+        guild = interaction.guild
+
+        async def fetch(cursor, limit):
+            return await self.store.page_by_guild(guild.id, cursor, limit)
+
+        async def render(entries):
+            now = time.time()
+            lines = []
+            members = await self.bot.members.get_many(guild, [user_id for (_, user_id), _, _ in entries])
+            for (_, user_id), due_ts, _ in entries:
+                member = members.get(user_id)
+                if not member:
+                    continue
+                remaining = int((due_ts - now) // 60)
+                lines.append(f"🗳️ {member.mention} → {remaining} minutes left")
+            return lines
+
+        paginator = KeysetPaginator(
+            interaction.user.id, "🗳️ Active vote reminders", fetch, lambda e: (e[1], e[0][1]), render, (0.0, 0)
+        )
+        await paginator.start(interaction, "ℹ️ No active vote reminders in this server.")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(VoteReminder(bot))
-    log.info("⚙️ VoteReminder cog loaded (MemAssistant + Postgres + Redis events + checklist)")
+    log.info("⚙️ VoteReminder cog loaded (MemAssistant + %s + Redis events + checklist)", REMINDER_STORE)
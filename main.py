@@ -2,10 +2,29 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
-import asyncpg
+import signal
 import redis.asyncio as redis
 import logging
 
+from utils.scheduler import ReminderScheduler
+from utils.subscriptions import SubscriptionService
+from utils.events import EventPublisher
+from utils.embeds import EmbedDispatcher
+from utils.rarity import RarityEngine
+from utils.sharding import SHARD_COUNT, SHARD_IDS, owned_shards, shard_counts
+from utils.cluster import ClusterCoordinator, cluster_shard_ids
+from utils.write_behind import WriteBehindWriter
+from utils.members import MEMBER_CACHE_MODE, MemberCache, member_cache_options, rss_mb
+from utils.resolver import EntityResolver
+from utils.startup import StartupTimer, sync_commands_if_changed
+from utils.migrations import RUN_MIGRATIONS, run_migrations
+from utils.db import Repository, create_pool
+from utils.metrics import MetricsServer, register_bot_collector
+from utils.recorder import GatewayRecorder
+
+startup = StartupTimer()
+BOOT_RSS_MB = rss_mb()
+
 # --- Logging global (formatter simple, tu peux remplacer par colorlog si dispo) ---
 logging.basicConfig(
     level=logging.INFO,
@@ -19,13 +38,25 @@ intents = discord.Intents.default()
 intents.members = True
 intents.message_content = True
 
-bot = commands.Bot(command_prefix="?", intents=intents)
+# --- Sharding (SHARD_COUNT / SHARD_IDS, sinon recommandé par Discord) ---
+# En mode cluster (CLUSTER_COUNT > 1), chaque process prend une plage de shards (SHARD_COUNT obligatoire)
+# MEMBER_CACHE_MODE=lazy : pas de chunking, membres résolus à la demande (bot.members)
+bot = commands.AutoShardedBot(
+    command_prefix="?",
+    intents=intents,
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS or cluster_shard_ids(SHARD_COUNT),
+    **member_cache_options()
+)
 
 # --- Setup Postgres ---
 async def setup_db(bot):
     if not hasattr(bot, "db_pool") or bot.db_pool is None:
-        bot.db_pool = await asyncpg.create_pool(dsn=os.getenv("DATABASE_URL"))
-        log.info("✅ Connexion Postgres établie (pool globale)")
+        bot.db_pool = await create_pool(os.getenv("DATABASE_URL"))
+        bot.db = Repository(bot.db_pool)
+        log.info("✅ Connexion Postgres établie (pool globale %s)", bot.db.pool_stats())
+        if RUN_MIGRATIONS:
+            await run_migrations(bot.db_pool)
 
 # --- Setup Redis ---
 async def setup_redis(bot):
@@ -38,14 +69,114 @@ async def setup_redis(bot):
         bot.redis = redis.from_url(redis_url, decode_responses=True)
         log.info("✅ Connexion Redis établie (globale)")
 
+# --- Setup cluster (élection de leader Redis pour les jobs singleton) ---
+def setup_cluster(bot):
+    if not hasattr(bot, "cluster") or bot.cluster is None:
+        bot.cluster = ClusterCoordinator(bot)
+        bot.cluster.start()
+
+# --- Setup publication d'événements (file + pipeline Redis) ---
+def setup_events(bot):
+    if not hasattr(bot, "events") or bot.events is None:
+        bot.events = EventPublisher(bot)
+        bot.events.start()
+
+# --- Setup moteur de raretés (base > RARITY_CONFIG > défauts) ---
+async def setup_rarities(bot):
+    if not hasattr(bot, "rarities") or bot.rarities is None:
+        bot.rarities = RarityEngine()
+        await bot.rarities.load(bot.db)
+
+# --- Setup dispatcher des embeds Mazoku (un seul on_message_edit) ---
+def setup_embed_dispatcher(bot):
+    if not hasattr(bot, "embeds") or bot.embeds is None:
+        bot.embeds = EmbedDispatcher(bot)
+        bot.add_listener(bot.embeds.on_message_edit, "on_message_edit")
+
+# --- Setup cache d'abonnements partagé ---
+async def setup_subscriptions(bot):
+    if not hasattr(bot, "subscriptions") or bot.subscriptions is None:
+        bot.subscriptions = SubscriptionService(bot)
+        await bot.subscriptions.start()
+
+# --- Setup résolution des membres (cache discord.py + LRU à la demande) ---
+def setup_members(bot):
+    if not hasattr(bot, "members") or bot.members is None:
+        bot.members = MemberCache(bot)
+        bot.add_listener(bot.members.on_member_join, "on_member_join")
+        bot.add_listener(bot.members.on_member_update, "on_member_update")
+        bot.add_listener(bot.members.on_raw_member_remove, "on_raw_member_remove")
+        log.info("✅ Cache de membres en mode %s", MEMBER_CACHE_MODE)
+
+# --- Setup cache de résolution des salons, rôles et DM ---
+def setup_resolver(bot):
+    if not hasattr(bot, "resolver") or bot.resolver is None:
+        bot.resolver = EntityResolver(bot)
+        for event in ("on_guild_channel_create", "on_guild_channel_update", "on_guild_channel_delete",
+                      "on_guild_role_update", "on_guild_role_delete", "on_guild_remove"):
+            bot.add_listener(getattr(bot.resolver, event), event)
+
+# --- Setup persistance différée des rappels ---
+def setup_writer(bot):
+    if not hasattr(bot, "writer") or bot.writer is None:
+        bot.writer = WriteBehindWriter(bot)
+        bot.writer.start()
+
+# --- Setup scheduler partagé (rappels) ---
+def setup_scheduler(bot):
+    if not hasattr(bot, "scheduler") or bot.scheduler is None:
+        bot.scheduler = ReminderScheduler(bot)
+        bot.scheduler.start()
+        log.info("✅ Scheduler de rappels démarré (fenêtre %ss)", bot.scheduler.window)
+
+# --- Setup endpoint Prometheus (/metrics, METRICS_PORT=0 pour désactiver) ---
+async def setup_metrics(bot):
+    if not hasattr(bot, "metrics") or bot.metrics is None:
+        register_bot_collector(bot)
+        bot.metrics = MetricsServer()
+        try:
+            await bot.metrics.start()
+        except OSError as e:
+            log.error(f"❌ Endpoint metrics indisponible : {e}")
+
+# --- Setup enregistrement gateway (GATEWAY_RECORD_FILE, rejoué par bench.replay) ---
+def setup_recorder(bot):
+    if not hasattr(bot, "recorder") or bot.recorder is None:
+        bot.recorder = GatewayRecorder(bot)
+        if bot.recorder.enabled:
+            bot.add_listener(bot.recorder.on_message_edit, "on_message_edit")
+            bot.add_listener(bot.recorder.on_message, "on_message")
+            bot.add_listener(bot.recorder.on_interaction, "on_interaction")
+            bot.recorder.start()
+
+@bot.event
+async def on_shard_ready(shard_id: int):
+    guilds = sum(1 for g in bot.guilds if g.shard_id == shard_id)
+    log.info("🧩 Shard %s prêt (%s guildes)", shard_id, guilds)
+
+@bot.event
+async def setup_hook():
+    # Après le login, avant la gateway : une seule fois par process, pas à chaque reconnexion
+    startup.mark("login")
+    with startup.phase("command sync"):
+        try:
+            await sync_commands_if_changed(bot)
+        except Exception as e:
+            log.error(f"❌ Erreur de sync des commandes : {e}")
+
 @bot.event
 async def on_ready():
     log.info(f"✅ Bot connecté : {bot.user} (ID: {bot.user.id})")
-    try:
-        synced = await bot.tree.sync()
-        log.info(f"✅ {len(synced)} commandes slash synchronisées.")
-    except Exception as e:
-        log.error(f"❌ Erreur de sync des commandes : {e}")
+    shard_count, shard_ids = owned_shards(bot)
+    log.info("🧩 Shards %s/%s — guildes par shard : %s",
+             shard_ids, shard_count, shard_counts((g.id for g in bot.guilds), shard_count))
+    if not getattr(bot, "startup_reported", False):
+        bot.startup_reported = True
+        startup.mark("gateway")
+        log.info("⏱️ Démarrage : %s", startup.summary())
+        log.info("⏱️ Démarrage en %.1fs (membres %s) — RSS %.0f Mo → %.0f Mo, %s membres en cache",
+                 startup.elapsed(), MEMBER_CACHE_MODE, BOOT_RSS_MB, rss_mb(),
+                 sum(len(g.members) for g in bot.guilds) + len(bot.members))
 
 # --- Handler global des erreurs slash ---
 @bot.tree.error
@@ -63,16 +194,19 @@ async def on_app_command_error(interaction: discord.Interaction, error: discord.
             ephemeral=True
         )
 
-# --- Chargement des cogs ---
+# --- Chargement des cogs (en parallèle) ---
+async def load_cog(cog_name: str):
+    try:
+        await bot.load_extension(cog_name)
+        # ⚠️ On ne log plus ici, chaque cog logge son propre état
+    except Exception as e:
+        log.error(f"[ERROR] Échec du chargement du cog {cog_name} : {e}")
+
 async def load_cogs():
-    for filename in os.listdir("./cogs"):
-        if filename.endswith(".py"):
-            cog_name = f"cogs.{filename[:-3]}"
-            try:
-                await bot.load_extension(cog_name)
-                # ⚠️ On ne log plus ici, chaque cog logge son propre état
-            except Exception as e:
-                log.error(f"[ERROR] Échec du chargement du cog {cog_name} : {e}")
+    await asyncio.gather(*(
+        load_cog(f"cogs.{filename[:-3]}")
+        for filename in sorted(os.listdir("./cogs")) if filename.endswith(".py")
+    ))
 
 # --- Main ---
 async def main():
@@ -80,23 +214,75 @@ async def main():
     if not token:
         raise RuntimeError("❌ DISCORD_TOKEN non défini dans les variables d'environnement")
 
+    # SIGTERM (arrêt de la plateforme) passe par le même chemin que Ctrl+C
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+
     async with bot:
-        await setup_db(bot)
-        await setup_redis(bot)
-        await load_cogs()
-        await bot.start(token)
+        with startup.phase("postgres+redis"):
+            await asyncio.gather(setup_db(bot), setup_redis(bot))
+        with startup.phase("services"):
+            setup_cluster(bot)
+            setup_events(bot)
+            setup_embed_dispatcher(bot)
+            setup_members(bot)
+            setup_resolver(bot)
+            setup_writer(bot)
+            setup_scheduler(bot)
+            setup_recorder(bot)
+        with startup.phase("rarities+subscriptions"):
+            await asyncio.gather(setup_rarities(bot), setup_subscriptions(bot), setup_metrics(bot))
+        with startup.phase("cogs"):
+            await load_cogs()
+        try:
+            await bot.start(token)
+        finally:
+            # Vide les écritures différées et les événements avant de fermer les connexions
+            await shutdown()
 
 # --- Shutdown ---
 async def shutdown():
+    if getattr(bot, "recorder", None):
+        await bot.recorder.stop()
+        bot.recorder = None
+    if getattr(bot, "metrics", None):
+        await bot.metrics.stop()
+        bot.metrics = None
+    if getattr(bot, "scheduler", None):
+        await bot.scheduler.stop()
+        bot.scheduler = None
+        log.info("🛑 Scheduler arrêté")
+    if getattr(bot, "writer", None):
+        await bot.writer.stop()
+        bot.writer = None
+    if getattr(bot, "subscriptions", None):
+        await bot.subscriptions.stop()
+        bot.subscriptions = None
+    if getattr(bot, "cluster", None):
+        await bot.cluster.stop()
+        bot.cluster = None
+        log.info("🛑 Baux de leader libérés")
+    if getattr(bot, "events", None):
+        await bot.events.stop()
+        log.info("🛑 Événements Redis vidés (%s)", bot.events.stats())
+        bot.events = None
     if getattr(bot, "db_pool", None):
+        log.info("🐢 Requêtes les plus coûteuses : %s", ", ".join(
+            f"{name} {s.calls}x avg {s.avg_ms:.1f}ms max {s.max * 1000:.1f}ms" for name, s in bot.db.slowest(5)
+        ))
         await bot.db_pool.close()
+        bot.db_pool = None
+        bot.db = None
         log.info("🛑 Pool Postgres fermée")
     if getattr(bot, "redis", None):
         await bot.redis.close()
+        bot.redis = None
         log.info("🛑 Connexion Redis fermée")
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         asyncio.run(shutdown())
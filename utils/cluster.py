@@ -0,0 +1,156 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+log = logging.getLogger("cluster")
+
+CLUSTER_COUNT = int(os.getenv("CLUSTER_COUNT", "1"))
+CLUSTER_INDEX = int(os.getenv("CLUSTER_INDEX", "0"))
+LEADER_LEASE_SECONDS = float(os.getenv("LEADER_LEASE_SECONDS", "10"))
+LEADER_HEARTBEAT_SECONDS = LEADER_LEASE_SECONDS / 3
+
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class ClusterConfigError(RuntimeError):
+    pass
+
+
+def cluster_shard_ids(shard_count: int | None, cluster_count: int = CLUSTER_COUNT, index: int = CLUSTER_INDEX) -> list[int] | None:
+    """Plage contiguë de shards pour le process `index` sur `cluster_count`."""
+    if cluster_count <= 1:
+        return None
+    # Sans SHARD_COUNT chaque process prendrait tous les shards : rappels envoyés en double
+    if not shard_count:
+        raise ClusterConfigError(f"CLUSTER_COUNT={cluster_count} requires SHARD_COUNT (or explicit SHARD_IDS)")
+    if not 0 <= index < cluster_count:
+        raise ClusterConfigError(f"CLUSTER_INDEX={index} out of range for CLUSTER_COUNT={cluster_count}")
+    per_cluster, extra = divmod(shard_count, cluster_count)
+    start = index * per_cluster + min(index, extra)
+    end = start + per_cluster + (1 if index < extra else 0)
+    return list(range(start, end))
+
+
+class ClusterCoordinator:
+    """Élection de leader par job via Redis (SET NX PX + renouvellement du bail).
+
+    Chaque job singleton (daily, cleanup…) a sa clé `leader:<job>`. Le détenteur
+    renouvelle son bail toutes les LEADER_HEARTBEAT_SECONDS ; s'il meurt, un
+    autre process reprend la clé au plus tard LEADER_LEASE_SECONDS après.
+    Sans Redis, le process est leader de tout.
+    """
+
+    def __init__(self, bot, lease: float = LEADER_LEASE_SECONDS):
+        self.bot = bot
+        self.lease = lease
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._jobs: dict[str, Callable[[], Awaitable[None]] | None] = {}
+        self._lease_until: dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._callbacks: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(self.bot, "redis", None) is not None
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._heartbeat())
+            log.info("✅ Cluster node %s (%s/%s)", self.node_id, CLUSTER_INDEX, CLUSTER_COUNT)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._callbacks):
+            task.cancel()
+        for job in list(self._lease_until):
+            try:
+                await self.bot.redis.eval(RELEASE_SCRIPT, 1, f"leader:{job}", self.node_id)
+            except Exception:
+                pass
+        self._lease_until.clear()
+
+    def register(self, job: str, on_elected: Callable[[], Awaitable[None]] | None = None):
+        """Déclare un job singleton ; `on_elected` est lancé à chaque prise de leadership."""
+        self._jobs[job] = on_elected
+        if not self.enabled:
+            if on_elected:
+                self._spawn(job, on_elected)
+            return
+        self._wakeup.set()
+
+    def _spawn(self, job: str, callback: Callable[[], Awaitable[None]]):
+        # Référence gardée jusqu'à la fin : sinon la tâche peut être ramassée en cours de route
+        task = asyncio.create_task(callback())
+        self._callbacks.add(task)
+        task.add_done_callback(lambda t: self._on_callback_done(job, t))
+
+    def _on_callback_done(self, job: str, task: asyncio.Task):
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception():
+            log.error("❌ on_elected for %s failed", job, exc_info=task.exception())
+
+    def is_leader(self, job: str) -> bool:
+        if not self.enabled:
+            return True
+        return self._lease_until.get(job, 0) > time.monotonic()
+
+    async def _campaign(self, job: str):
+        key = f"leader:{job}"
+        ms = int(self.lease * 1000)
+        started = time.monotonic()
+        was_leader = self.is_leader(job)
+        if was_leader:
+            held = await self.bot.redis.eval(RENEW_SCRIPT, 1, key, self.node_id, ms)
+        else:
+            held = await self.bot.redis.set(key, self.node_id, nx=True, px=ms)
+            if not held:
+                # On détenait peut-être encore la clé (bail local expiré de justesse)
+                held = await self.bot.redis.eval(RENEW_SCRIPT, 1, key, self.node_id, ms)
+
+        if held:
+            # Marge : le bail local expire avant celui de Redis
+            self._lease_until[job] = started + self.lease * 0.8
+            if not was_leader:
+                log.info("👑 Leader for %s (%s)", job, self.node_id)
+                callback = self._jobs.get(job)
+                if callback:
+                    self._spawn(job, callback)
+        else:
+            self._lease_until.pop(job, None)
+            if was_leader:
+                log.warning("⚠️ Leadership lost for %s", job)
+
+    async def _heartbeat(self):
+        while True:
+            for job in list(self._jobs):
+                try:
+                    await self._campaign(job)
+                except Exception as e:
+                    log.error("❌ Leader election error for %s: %s", job, e)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=LEADER_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
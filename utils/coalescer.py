@@ -0,0 +1,102 @@
+import os
+import asyncio
+import logging
+
+import discord
+
+from utils.log_buffer import MESSAGE_LIMIT
+
+log = logging.getLogger("coalescer")
+
+COALESCE_WINDOW_MS = int(os.getenv("COALESCE_WINDOW_MS", "1500"))
+# Sous le seuil par défaut de l'AutoMod "mention spam" des serveurs
+COALESCE_MAX_MENTIONS = int(os.getenv("COALESCE_MAX_MENTIONS", "20"))
+MENTIONS = "{mentions}"  # emplacement des mentions dans un modèle de message
+
+
+def render_mentions(template: str, mentions: list[str], limit: int = MESSAGE_LIMIT,
+                    max_mentions: int = COALESCE_MAX_MENTIONS) -> list[str]:
+    """Messages issus de `template`, chacun sous `limit` caractères et `max_mentions` mentions."""
+    messages, chunk = [], []
+    for mention in mentions:
+        candidate = chunk + [mention]
+        if chunk and (len(candidate) > max_mentions or len(template.replace(MENTIONS, ", ".join(candidate))) > limit):
+            messages.append(template.replace(MENTIONS, ", ".join(chunk)))
+            candidate = [mention]
+        chunk = candidate
+    if chunk:
+        messages.append(template.replace(MENTIONS, ", ".join(chunk)))
+    return messages
+
+
+class _Group:
+    __slots__ = ("channel", "template", "mentions", "timer")
+
+    def __init__(self, channel: discord.abc.Messageable, template: str):
+        self.channel = channel
+        self.template = template
+        self.mentions: list[str] = []
+        self.timer: asyncio.Task | None = None
+
+
+class MentionCoalescer:
+    """Regroupe les annonces d'un même salon en un seul message à plusieurs mentions.
+
+    Les notices de même modèle pour un salon sont retenues COALESCE_WINDOW_MS
+    après la première, puis envoyées ensemble ; le groupe part tout de suite
+    s'il atteint COALESCE_MAX_MENTIONS. Un membre n'est mentionné qu'une fois
+    par groupe. `stop()` envoie ce qui reste.
+    """
+
+    def __init__(self, window_ms: int = COALESCE_WINDOW_MS, max_mentions: int = COALESCE_MAX_MENTIONS):
+        self.window = window_ms / 1000
+        self.max_mentions = max(1, max_mentions)
+        self._groups: dict[tuple[int, str], _Group] = {}
+        self.notices = 0
+        self.messages = 0
+
+    async def notify(self, channel: discord.abc.Messageable, template: str, member: discord.abc.User):
+        key = (channel.id, template)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(channel, template)
+        if member.mention in group.mentions:
+            return
+        group.mentions.append(member.mention)
+        self.notices += 1
+        if len(group.mentions) >= self.max_mentions:
+            await self.flush(key)
+        elif group.timer is None:
+            group.timer = asyncio.create_task(self._flush_later(key))
+
+    async def _flush_later(self, key: tuple[int, str]):
+        await asyncio.sleep(self.window)
+        group = self._groups.get(key)
+        if group:
+            group.timer = None  # le flush ne doit pas annuler la tâche qui l'exécute
+        await self.flush(key)
+
+    async def flush(self, key: tuple[int, str]):
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        if group.timer:
+            group.timer.cancel()
+        channel = group.channel
+        for content in render_mentions(group.template, group.mentions, max_mentions=self.max_mentions):
+            try:
+                await channel.send(content, allowed_mentions=discord.AllowedMentions(users=True))
+                self.messages += 1
+            except discord.Forbidden:
+                log.warning("❌ Cannot send in #%s", getattr(channel, "name", channel.id))
+                return
+            except discord.HTTPException as e:
+                log.error("❌ Coalesced send failed in #%s: %s", getattr(channel, "name", channel.id), e)
+        log.debug("📨 %s mentions in #%s", len(group.mentions), getattr(channel, "name", channel.id))
+
+    async def flush_all(self):
+        for key in list(self._groups):
+            await self.flush(key)
+
+    async def stop(self):
+        await self.flush_all()
@@ -0,0 +1,104 @@
+import io
+import os
+import sys
+import csv
+import base64
+import asyncio
+import logging
+import secrets
+from datetime import datetime, timezone
+
+import asyncpg
+
+from utils.db import Repository
+
+log = logging.getLogger("codes")
+
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # sans 0/O ni 1/I
+CODE_GROUPS = 4  # MEMA-XXXX-XXXX-XXXX-XXXX : 80 bits aléatoires
+CODE_PREFIX = "MEMA"
+MAX_CODES_PER_BATCH = 100_000
+CSV_HEADER = ("code", "server_id", "expire_at")
+# base32 standard → alphabet sans caractères ambigus (même taille : 32)
+_B32_TO_CODE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ234567", CODE_ALPHABET)
+
+
+def generate_code() -> str:
+    # 5 bits par caractère : 10 octets aléatoires = 16 caractères, sans padding base32
+    raw = base64.b32encode(secrets.token_bytes(CODE_GROUPS * 5 // 2)).decode().translate(_B32_TO_CODE)
+    return "-".join((CODE_PREFIX, *(raw[i:i + 4] for i in range(0, len(raw), 4))))
+
+
+def generate_codes(server_id: int, expire_at: datetime, count: int) -> list[tuple[str, int, datetime]]:
+    return [(generate_code(), server_id, expire_at) for _ in range(count)]
+
+
+def parse_codes_csv(text: str) -> list[tuple[str, int, datetime]]:
+    """Lignes `code,server_id,expire_at` (en-tête facultatif, dates ISO, UTC par défaut)."""
+    records = []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        if not row or (line_no == 1 and tuple(c.strip().lower() for c in row) == CSV_HEADER):
+            continue
+        try:
+            code, server_id, expire_at = (c.strip() for c in row)
+            expires = datetime.fromisoformat(expire_at)
+            records.append((code, int(server_id), expires if expires.tzinfo else expires.replace(tzinfo=timezone.utc)))
+        except ValueError as e:
+            raise ValueError(f"line {line_no}: {e}") from None
+    return records
+
+
+def codes_csv(records: list[tuple[str, int, datetime]]) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    writer.writerows((code, server_id, expire_at.isoformat()) for code, server_id, expire_at in records)
+    return out.getvalue()
+
+
+async def import_codes(db: Repository, records: list[tuple[str, int, datetime]]) -> list[tuple[str, int, datetime]]:
+    """COPY des codes dans une table temporaire puis fusion ; les codes déjà présents sont ignorés.
+
+    Retourne les lignes réellement ajoutées (un code en double n'y figure qu'une fois).
+    """
+    async with db.transaction() as conn:
+        await db.execute("subscription_codes.import_stage", conn=conn)
+        await db.copy_records("subscription_codes_import", records, list(CSV_HEADER), conn=conn)
+        rows = await db.fetch("subscription_codes.import_merge", conn=conn)
+    added = {row["code"] for row in rows}
+    inserted = []
+    for record in records:
+        # Code en double dans le lot : seule la première ligne a été écrite
+        if record[0] in added:
+            added.discard(record[0])
+            inserted.append(record)
+    log.info("🎟️ %s/%s codes importés", len(inserted), len(records))
+    return inserted
+
+
+async def _main(argv: list[str]) -> int:
+    """`python -m utils.codes generate SERVER_ID EXPIRE_AT COUNT > codes.csv` puis `import codes.csv`."""
+    if argv[:1] == ["generate"] and len(argv) == 4:
+        _, server_id, expire_at, count = argv
+        expires = datetime.fromisoformat(expire_at)
+        records = generate_codes(int(server_id), expires if expires.tzinfo else expires.replace(tzinfo=timezone.utc),
+                                 min(int(count), MAX_CODES_PER_BATCH))
+        sys.stdout.write(codes_csv(records))
+        return 0
+    if argv[:1] == ["import"] and len(argv) == 2:
+        with open(argv[1], encoding="utf-8") as f:
+            records = parse_codes_csv(f.read())
+        pool = await asyncpg.create_pool(dsn=os.getenv("DATABASE_URL"), min_size=1, max_size=1)
+        try:
+            inserted = len(await import_codes(Repository(pool), records))
+        finally:
+            await pool.close()
+        print(f"{inserted}/{len(records)} codes imported ({len(records) - inserted} already present)")
+        return 0
+    print(_main.__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,283 @@
+import os
+import time
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import asyncpg
+
+from utils.metrics import Counter, Histogram
+from utils.sharding import shard_clause
+
+log = logging.getLogger("db")
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+# Toutes les requêtes applicatives, par nom. Les stores de rappels et le tampon
+# de logs enregistrent en plus les leurs (par table) via Repository.register.
+QUERIES: dict[str, str] = {
+    # --- Rappels (mode queue) ---
+    "reminders.queue_upsert": (
+        "INSERT INTO reminders (bot_name, task, guild_id, user_id, channel_id, expire_at) "
+        "VALUES ($1, $2, $3, $4, $5, $6) "
+        # Une ligne existante (rappel actif, ou échu pas encore livré) n'est jamais remplacée
+        "ON CONFLICT (bot_name, task, guild_id, user_id) DO NOTHING RETURNING true"
+    ),
+    # Bail posé en une instruction : rien n'est verrouillé pendant la livraison
+    "reminders.claim_due": (
+        "UPDATE reminders SET claimed_until = now() + $6 * interval '1 second' WHERE ctid IN ("
+        "SELECT ctid FROM reminders "
+        "WHERE bot_name=$1 AND task=$2 AND expire_at <= now() "
+        f"AND (claimed_until IS NULL OR claimed_until < now()) AND {shard_clause('guild_id', 3, 4)} "
+        "ORDER BY expire_at LIMIT $5 FOR UPDATE SKIP LOCKED"
+        ") RETURNING guild_id, user_id, channel_id, expire_at"
+    ),
+    # expire_at fait partie de la clé : un rappel relancé entre-temps n'est pas supprimé
+    "reminders.complete_due": (
+        "DELETE FROM reminders WHERE bot_name=$1 AND task=$2 AND (guild_id, user_id, expire_at) IN "
+        "(SELECT * FROM unnest($3::bigint[], $4::bigint[], $5::timestamptz[]))"
+    ),
+    "vote_reminders.claim_due": (
+        "UPDATE vote_reminders SET claimed_until = now() + $4 * interval '1 second' WHERE ctid IN ("
+        "SELECT ctid FROM vote_reminders "
+        "WHERE expire_at <= now() AND (claimed_until IS NULL OR claimed_until < now()) "
+        f"AND {shard_clause('guild_id', 1, 2)} "
+        "ORDER BY expire_at LIMIT $3 FOR UPDATE SKIP LOCKED"
+        ") RETURNING guild_id, user_id, expire_at"
+    ),
+    "vote_reminders.complete_due": (
+        "DELETE FROM vote_reminders WHERE (guild_id, user_id, expire_at) IN "
+        "(SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::timestamptz[]))"
+    ),
+    # --- Daily ---
+    "daily.subscriber": "SELECT user_id FROM daily_subscribers WHERE guild_id=$1 AND user_id=$2",
+    "daily.subscribe": "INSERT INTO daily_subscribers (guild_id, user_id) VALUES ($1, $2)",
+    "daily.unsubscribe": "DELETE FROM daily_subscribers WHERE guild_id=$1 AND user_id=$2",
+    "daily.subscribers_page": (
+        "SELECT user_id FROM daily_subscribers WHERE guild_id=$1 AND user_id > $2 ORDER BY user_id LIMIT $3"
+    ),
+    "daily.set_log_channel": (
+        "INSERT INTO daily_log_channels (guild_id, channel_id) VALUES ($1, $2) "
+        "ON CONFLICT (guild_id) DO UPDATE SET channel_id=$2"
+    ),
+    "daily.run_start": (
+        "INSERT INTO daily_runs (run_date, shard_key) VALUES ($1, $2) ON CONFLICT DO NOTHING RETURNING true"
+    ),
+    "daily.run_finish": "UPDATE daily_runs SET finished_at=$3 WHERE run_date=$1 AND shard_key=$2",
+    "daily.run_unfinished": (
+        "SELECT true FROM daily_runs WHERE run_date=$1 AND shard_key=$2 AND finished_at IS NULL"
+    ),
+    # Abonnés de toutes les guildes actives de nos shards, moins ceux déjà traités par ce run.
+    # Une page par appel (keyset sur la clé primaire) : aucune transaction ne dure pendant le fan-out
+    "daily.run_pending": f"""
+        SELECT d.guild_id, d.user_id
+        FROM daily_subscribers d
+        JOIN subscriptions s ON s.server_id = d.guild_id AND s.expire_at > $2
+        WHERE {shard_clause("d.guild_id", 3, 4)}
+          AND (d.guild_id, d.user_id) > ($5, $6)
+          AND NOT EXISTS (
+              SELECT 1 FROM daily_run_deliveries r
+              WHERE r.run_date = $1 AND r.guild_id = d.guild_id AND r.user_id = d.user_id
+          )
+        ORDER BY d.guild_id, d.user_id
+        LIMIT $7
+    """,
+    "daily.record_delivery": (
+        "INSERT INTO daily_run_deliveries (run_date, guild_id, user_id, status) "
+        "VALUES ($1, $2, $3, $4) ON CONFLICT DO NOTHING"
+    ),
+    "daily.deliveries_by_guild": (
+        "SELECT user_id, status FROM daily_run_deliveries WHERE run_date=$1 AND guild_id=$2"
+    ),
+    "daily.guild_summarized": (
+        "INSERT INTO daily_run_guilds (run_date, guild_id) VALUES ($1, $2) ON CONFLICT DO NOTHING"
+    ),
+    # Guildes de nos shards avec des livraisons mais sans résumé (livrées en entier avant un crash)
+    "daily.unsummarized_guilds": f"""
+        SELECT DISTINCT r.guild_id
+        FROM daily_run_deliveries r
+        WHERE r.run_date = $1 AND {shard_clause("r.guild_id", 2, 3)}
+          AND NOT EXISTS (SELECT 1 FROM daily_run_guilds g WHERE g.run_date = $1 AND g.guild_id = r.guild_id)
+        ORDER BY r.guild_id
+    """,
+    # Rétention : seul le run du jour peut reprendre, le ledger des jours passés n'est plus relu
+    "daily.prune_runs": """
+        WITH deliveries AS (DELETE FROM daily_run_deliveries WHERE run_date < $1),
+             guilds AS (DELETE FROM daily_run_guilds WHERE run_date < $1)
+        DELETE FROM daily_runs WHERE run_date < $1 AND finished_at IS NOT NULL
+    """,
+    # --- Abonnements ---
+    "subscriptions.active": "SELECT server_id, expire_at FROM subscriptions WHERE expire_at > $1",
+    "subscriptions.by_server": "SELECT expire_at FROM subscriptions WHERE server_id=$1",
+    # Keyset : la page suivante repart de la dernière ligne affichée, jamais d'OFFSET
+    "subscriptions.page": (
+        "SELECT server_id, expire_at FROM subscriptions WHERE (expire_at, server_id) < ($1, $2) "
+        "ORDER BY expire_at DESC, server_id DESC LIMIT $3"
+    ),
+    "subscriptions.upsert": (
+        "INSERT INTO subscriptions (server_id, expire_at) VALUES ($1, $2) "
+        "ON CONFLICT (server_id) DO UPDATE SET expire_at = $2"
+    ),
+    # Le DELETE verrouille la ligne : deux rachats simultanés du même code, un seul obtient une ligne
+    "subscription_codes.redeem": (
+        "WITH c AS (DELETE FROM subscription_codes WHERE code = $1 RETURNING server_id, expire_at) "
+        "INSERT INTO subscriptions (server_id, expire_at) SELECT server_id, expire_at FROM c "
+        "ON CONFLICT (server_id) DO UPDATE SET expire_at = EXCLUDED.expire_at "
+        "RETURNING server_id, expire_at"
+    ),
+    "subscription_codes.import_stage": (
+        "CREATE TEMP TABLE subscription_codes_import (LIKE subscription_codes) ON COMMIT DROP"
+    ),
+    "subscription_codes.import_merge": (
+        "INSERT INTO subscription_codes SELECT * FROM subscription_codes_import "
+        "ON CONFLICT (code) DO NOTHING RETURNING code"
+    ),
+    # --- Configuration ---
+    "guild_config.get": (
+        "SELECT guild_id, high_tier_role_id, required_role_id FROM guild_config WHERE guild_id = $1"
+    ),
+    "guild_config.set_high_tier_role": (
+        "INSERT INTO guild_config (guild_id, high_tier_role_id) VALUES ($1, $2) "
+        "ON CONFLICT (guild_id) DO UPDATE "
+        "SET high_tier_role_id = EXCLUDED.high_tier_role_id, updated_at = CURRENT_TIMESTAMP"
+    ),
+    "guild_config.set_required_role": (
+        "INSERT INTO guild_config (guild_id, required_role_id) VALUES ($1, $2) "
+        "ON CONFLICT (guild_id) DO UPDATE "
+        "SET required_role_id = EXCLUDED.required_role_id, updated_at = CURRENT_TIMESTAMP"
+    ),
+    "rarities.all": "SELECT name, emoji_id, priority, custom_emoji, message, high_tier FROM rarities",
+}
+
+DB_QUERY_SECONDS = Histogram("memassistant_db_query_seconds", "Latency of named Postgres queries.", ["query"])
+DB_QUERY_ERRORS = Counter("memassistant_db_query_errors_total", "Named Postgres queries that raised.", ["query"])
+
+
+async def create_pool(dsn: str | None) -> asyncpg.Pool:
+    """Pool unique du process, dimensionnée et bornée par la configuration DB_*."""
+    return await asyncpg.create_pool(
+        dsn=dsn,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_cache_size=max(DB_STATEMENT_CACHE_SIZE, len(QUERIES) * 2),
+        server_settings={"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+    )
+
+
+@dataclass(slots=True)
+class QueryStats:
+    calls: int = 0
+    errors: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total / self.calls * 1000 if self.calls else 0.0
+
+
+class Repository:
+    """Accès aux données : requêtes nommées sur la pool partagée, chronométrées.
+
+    Le SQL de chaque nom est constant, donc le cache de statements d'asyncpg le
+    prépare une fois par connexion et réutilise ensuite le plan. Chaque appel
+    est compté et chronométré sous son nom ; au-delà de DB_SLOW_QUERY_MS, un
+    warning donne le nom de la requête.
+
+    Toutes les méthodes acceptent `conn=` pour s'exécuter dans une transaction
+    ouverte par l'appelant (`async with db.transaction() as conn`).
+    """
+
+    def __init__(self, pool: asyncpg.Pool, queries: dict[str, str] = QUERIES):
+        self.pool = pool
+        self.queries = dict(queries)
+        self.stats: dict[str, QueryStats] = {}
+
+    def register(self, name: str, sql: str):
+        self.queries[name] = sql
+
+    def acquire(self):
+        return self.pool.acquire()
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+
+    def pool_stats(self) -> dict:
+        return {
+            "size": self.pool.get_size(),
+            "idle": self.pool.get_idle_size(),
+            "min": self.pool.get_min_size(),
+            "max": self.pool.get_max_size(),
+        }
+
+    def slowest(self, limit: int = 10) -> list[tuple[str, QueryStats]]:
+        return sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)[:limit]
+
+    def _record(self, name: str, started: float, failed: bool):
+        elapsed = time.perf_counter() - started
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = QueryStats()
+        stats.calls += 1
+        stats.errors += failed
+        stats.total += elapsed
+        stats.max = max(stats.max, elapsed)
+        DB_QUERY_SECONDS.labels(query=name).observe(elapsed)
+        if failed:
+            DB_QUERY_ERRORS.labels(query=name).inc()
+        if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+            log.warning("🐢 Slow query %s: %.1fms", name, elapsed * 1000)
+
+    async def _run(self, method: str, name: str, args: tuple, conn: asyncpg.Connection | None):
+        sql = self.queries[name]
+        started = time.perf_counter()
+        failed = True
+        try:
+            if conn is not None:
+                result = await getattr(conn, method)(sql, *args)
+            else:
+                async with self.pool.acquire() as pooled:
+                    result = await getattr(pooled, method)(sql, *args)
+            failed = False
+            return result
+        finally:
+            self._record(name, started, failed)
+
+    async def fetch(self, name: str, *args, conn: asyncpg.Connection | None = None) -> list[asyncpg.Record]:
+        return await self._run("fetch", name, args, conn)
+
+    async def fetchrow(self, name: str, *args, conn: asyncpg.Connection | None = None) -> asyncpg.Record | None:
+        return await self._run("fetchrow", name, args, conn)
+
+    async def fetchval(self, name: str, *args, conn: asyncpg.Connection | None = None):
+        return await self._run("fetchval", name, args, conn)
+
+    async def execute(self, name: str, *args, conn: asyncpg.Connection | None = None) -> str:
+        return await self._run("execute", name, args, conn)
+
+    async def executemany(self, name: str, args: list[tuple], conn: asyncpg.Connection | None = None):
+        return await self._run("executemany", name, (args,), conn)
+
+    async def copy_records(self, table: str, records: list[tuple], columns: list[str],
+                           conn: asyncpg.Connection | None = None) -> str:
+        """COPY binaire de `records` dans `table`, chronométré sous `copy:<table>`."""
+        name = f"copy:{table}"
+        started = time.perf_counter()
+        failed = True
+        try:
+            if conn is not None:
+                result = await conn.copy_records_to_table(table, records=records, columns=columns)
+            else:
+                async with self.pool.acquire() as pooled:
+                    result = await pooled.copy_records_to_table(table, records=records, columns=columns)
+            failed = False
+            return result
+        finally:
+            self._record(name, started, failed)
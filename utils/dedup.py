@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Hashable
+
+log = logging.getLogger("dedup")
+
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "memory")  # memory | redis
+
+
+class DedupStore:
+    """Ensemble borné avec expiration (TTL constant, éviction O(1) amortie).
+
+    Les clés sont rangées par ordre d'insertion ; avec un TTL unique c'est
+    aussi l'ordre d'expiration, donc la purge ne regarde que la tête.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict[Hashable, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _evict(self, now: float):
+        items = self._items
+        while items:
+            expires_at = next(iter(items.values()))
+            if expires_at > now and len(items) <= self.max_size:
+                break
+            items.popitem(last=False)
+
+    async def seen(self, key: Hashable) -> bool:
+        expires_at = self._items.get(key)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    async def add(self, key: Hashable) -> bool:
+        """Ajoute la clé ; False si elle était déjà présente (non expirée)."""
+        now = time.monotonic()
+        if await self.seen(key):
+            return False
+        self._items.pop(key, None)
+        self._items[key] = now + self.ttl
+        self._evict(now)
+        return True
+
+
+class RedisDedupStore:
+    """Même interface, partagée entre replicas et redémarrages (SET NX EX).
+
+    Un DedupStore local évite l'aller-retour Redis pour les clés déjà vues ici.
+    """
+
+    def __init__(self, redis, namespace: str, ttl: float, max_size: int = 10_000):
+        self.redis = redis
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = DedupStore(ttl, max_size)
+
+    def _key(self, key: Hashable) -> str:
+        return f"dedup:{self.namespace}:{key}"
+
+    async def seen(self, key: Hashable) -> bool:
+        if await self.local.seen(key):
+            return True
+        try:
+            return bool(await self.redis.exists(self._key(key)))
+        except Exception as e:
+            log.error("❌ Redis dedup lookup failed (%s): %s", self.namespace, e)
+            return False
+
+    async def add(self, key: Hashable) -> bool:
+        if await self.local.seen(key):
+            return False
+        try:
+            added = bool(await self.redis.set(self._key(key), 1, nx=True, ex=max(1, int(self.ttl))))
+        except Exception as e:
+            log.error("❌ Redis dedup claim failed (%s): %s", self.namespace, e)
+            added = True
+        await self.local.add(key)
+        return added
+
+
+def make_dedup_store(bot, namespace: str, ttl: float, max_size: int = 10_000) -> DedupStore | RedisDedupStore:
+    if DEDUP_BACKEND == "redis" and getattr(bot, "redis", None):
+        return RedisDedupStore(bot.redis, namespace, ttl, max_size)
+    return DedupStore(ttl, max_size)
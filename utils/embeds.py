@@ -0,0 +1,110 @@
+import re
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import discord
+
+from utils.metrics import HANDLER_ERRORS, HANDLER_SECONDS
+from utils.rarity import Rarity, RarityEngine
+
+log = logging.getLogger("embed-dispatcher")
+
+MAZOKU_BOT_ID = 1242388858897956906  # ID du bot Mazoku
+
+# Topics auxquels les cogs s'abonnent
+AUTO_SUMMON = "auto_summon"                      # titre contient "auto summon" (claim compris)
+SUMMON_CLAIMED = "summon_claimed"                # titre contient "summon claimed" (auto compris)
+MANUAL_SUMMON_CLAIMED = "manual_summon_claimed"  # "summon claimed" hors "auto summon claimed"
+
+_MENTION_RE = re.compile(r"<@!?(\d+)>")
+
+
+@dataclass(frozen=True, slots=True)
+class SummonEmbed:
+    message: discord.Message
+    embed: discord.Embed
+    auto_summon: bool
+    summon_claimed: bool
+    auto_summon_claimed: bool
+    rarity: Rarity | None
+    claimer_id: int | None
+
+
+def parse_summon_embed(message: discord.Message, rarities: RarityEngine) -> SummonEmbed | None:
+    """Parse l'embed Mazoku une seule fois ; None si ce n'est pas un summon."""
+    embed = message.embeds[0]
+    title = (embed.title or "").lower()
+    auto_summon = "auto summon" in title
+    summon_claimed = "summon claimed" in title
+    if not auto_summon and not summon_claimed:
+        return None
+
+    desc = embed.description or ""
+    claimer_id = None
+    if summon_claimed:
+        footer = embed.footer.text.lower() if embed.footer and embed.footer.text else ""
+        match = _MENTION_RE.search(desc) or (_MENTION_RE.search(footer) if "claimed by" in footer else None)
+        claimer_id = int(match.group(1)) if match else None
+
+    return SummonEmbed(
+        message=message,
+        embed=embed,
+        auto_summon=auto_summon,
+        summon_claimed=summon_claimed,
+        auto_summon_claimed="auto summon claimed" in title,
+        rarity=rarities.detect(desc),
+        claimer_id=claimer_id,
+    )
+
+
+Handler = Callable[[SummonEmbed], Awaitable[None]]
+
+
+class EmbedDispatcher:
+    """Listener `on_message_edit` unique : parse l'embed puis route vers les cogs abonnés."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._handlers: dict[str, list[Handler]] = {}
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def unsubscribe(self, topic: str, handler: Handler):
+        handlers = self._handlers.get(topic, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    @staticmethod
+    async def _timed(handler: Handler, event: SummonEmbed):
+        with HANDLER_SECONDS.labels(handler=handler.__qualname__).time():
+            await handler(event)
+
+    async def on_message_edit(self, before: discord.Message, after: discord.Message):
+        if after.author.id != MAZOKU_BOT_ID or not after.guild or not after.embeds:
+            return
+        with HANDLER_SECONDS.labels(handler="EmbedDispatcher.on_message_edit").time():
+            await self._dispatch(after)
+
+    async def _dispatch(self, after: discord.Message):
+        event = parse_summon_embed(after, self.bot.rarities)
+        if event is None:
+            return
+
+        handlers: list[Handler] = []
+        if event.auto_summon:
+            handlers += self._handlers.get(AUTO_SUMMON, [])
+        if event.summon_claimed:
+            handlers += self._handlers.get(SUMMON_CLAIMED, [])
+            if not event.auto_summon_claimed:
+                handlers += self._handlers.get(MANUAL_SUMMON_CLAIMED, [])
+        if not handlers:
+            return
+
+        results = await asyncio.gather(*(self._timed(handler, event) for handler in handlers), return_exceptions=True)
+        for handler, result in zip(handlers, results):
+            if isinstance(result, Exception):
+                HANDLER_ERRORS.labels(handler=handler.__qualname__).inc()
+                log.error("❌ Embed handler %s failed: %r", handler.__qualname__, result, exc_info=result)
@@ -0,0 +1,129 @@
+import os
+import json
+import asyncio
+import logging
+
+from utils.metrics import Histogram
+
+log = logging.getLogger("events")
+
+EVENT_CHANNEL = "bot_events"
+EVENT_QUEUE_MAX = int(os.getenv("EVENT_QUEUE_MAX", "10000"))
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "200"))
+EVENT_FLUSH_INTERVAL = float(os.getenv("EVENT_FLUSH_INTERVAL", "0.05"))  # secondes
+EVENT_OVERFLOW_POLICY = os.getenv("EVENT_OVERFLOW_POLICY", "drop")       # drop | block
+
+REDIS_PUBLISH_SECONDS = Histogram(
+    "memassistant_redis_publish_seconds", "Latency of one pipelined batch of event publishes."
+)
+
+
+class EventPublisher:
+    """Publication des événements vers le Master (canal Redis `bot_events`).
+
+    `publish` ne fait que mettre l'événement en file ; une tâche de fond
+    les envoie par lots dans un pipeline Redis. File pleine : l'événement
+    est abandonné (policy=drop) ou l'appelant attend (policy=block).
+    """
+
+    def __init__(
+        self,
+        bot,
+        max_queue: int = EVENT_QUEUE_MAX,
+        batch_size: int = EVENT_BATCH_SIZE,
+        flush_interval: float = EVENT_FLUSH_INTERVAL,
+        policy: str = EVENT_OVERFLOW_POLICY,
+    ):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(self.bot, "redis", None) is not None
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Dernier envoi de ce qui reste en file
+        while not self.queue.empty():
+            await self._flush(self._drain([]))
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "pending": self.queue.qsize(),
+        }
+
+    async def publish(self, bot_name: str, guild_id: int, user_id: int, event_type: str, details: dict | None = None):
+        if not self.enabled:
+            return
+        event = {
+            "bot_name": bot_name,
+            "bot_id": self.bot.user.id if self.bot.user else 0,
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "event_type": event_type,
+            "details": details or {}
+        }
+        payload = json.dumps(event)
+        if self.policy == "block":
+            await self.queue.put(payload)
+        else:
+            try:
+                self.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    log.warning("⚠️ Event queue full, %s events dropped so far", self.dropped)
+                return
+        self.queued += 1
+
+    def _drain(self, batch: list[str]) -> list[str]:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _flush(self, batch: list[str]):
+        if not batch:
+            return
+        try:
+            pipe = self.bot.redis.pipeline(transaction=False)
+            for payload in batch:
+                pipe.publish(EVENT_CHANNEL, payload)
+            with REDIS_PUBLISH_SECONDS.time():
+                await pipe.execute()
+            self.flushed += len(batch)
+            log.debug("📡 %s events publiés", len(batch))
+        except Exception as e:
+            self.failed += len(batch)
+            log.error("❌ Impossible de publier %s événements Redis: %s", len(batch), e)
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Petite fenêtre pour regrouper les rafales dans un seul pipeline
+            await asyncio.sleep(self.flush_interval)
+            await self._flush(self._drain(batch))
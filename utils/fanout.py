@@ -0,0 +1,155 @@
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable
+
+import discord
+
+log = logging.getLogger("dm-fanout")
+
+DM_FANOUT_CONCURRENCY = int(os.getenv("DM_FANOUT_CONCURRENCY", "8"))
+DM_FANOUT_RETRIES = int(os.getenv("DM_FANOUT_RETRIES", "3"))
+# Au-delà, on considère que discord.py a attendu un rate limit en interne
+DM_FANOUT_SLOW_SECONDS = float(os.getenv("DM_FANOUT_SLOW_SECONDS", "2.0"))
+
+
+@dataclass
+class FanoutStats:
+    sent: int = 0
+    failed: int = 0
+    rate_limited: int = 0
+    latencies: list[float] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        return (self.sent + self.failed) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def summary_line(self) -> str:
+        return (
+            f"⚡ {self.throughput:.1f} DM/s in {self.elapsed:.1f}s — "
+            f"latency p50 {self.percentile(0.5) * 1000:.0f}ms / p95 {self.percentile(0.95) * 1000:.0f}ms"
+            + (f" — 429: {self.rate_limited}" if self.rate_limited else "")
+        )
+
+
+class DMFanout:
+    """Envoi de DMs en parallèle sous une limite de concurrence adaptative.
+
+    La limite suit un schéma AIMD : +1 après une fenêtre d'envois rapides,
+    divisée par deux sur un 429 (ou un envoi anormalement lent, signe que
+    discord.py a dormi sur un rate limit) avec une pause globale de `retry_after`.
+    """
+
+    def __init__(self, max_concurrency: int = DM_FANOUT_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self._in_flight = 0
+        self._streak = 0
+        self._resume_at = 0.0
+        self._cond = asyncio.Condition()
+
+    async def _wait_resume(self):
+        # La pause peut être prolongée par un autre envoi pendant qu'on dort
+        while (pause := self._resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(pause)
+
+    async def _acquire(self):
+        await self._wait_resume()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        await self._wait_resume()
+
+    async def _release(self):
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_throttled(self, retry_after: float):
+        self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+        self._streak = 0
+        if self.limit > 1:
+            self.limit = max(1, self.limit // 2)
+            log.warning("🐢 DM fan-out throttled, concurrency → %s (pause %.1fs)", self.limit, retry_after)
+
+    async def _on_success(self, latency: float):
+        if latency >= DM_FANOUT_SLOW_SECONDS:
+            self._on_throttled(0)
+            return
+        self._streak += 1
+        if self._streak >= self.limit and self.limit < self.max_concurrency:
+            self._streak = 0
+            async with self._cond:
+                self.limit += 1
+                self._cond.notify_all()
+
+    async def send(self, target: discord.abc.Messageable, content: str, stats: FanoutStats) -> bool:
+        await self._acquire()
+        try:
+            for _ in range(DM_FANOUT_RETRIES):
+                # Après un 429 (ici ou dans un envoi parallèle), on attend retry_after avant de réessayer
+                await self._wait_resume()
+                started = time.monotonic()
+                try:
+                    await target.send(content)
+                except discord.RateLimited as e:
+                    stats.rate_limited += 1
+                    self._on_throttled(e.retry_after)
+                    continue
+                except discord.HTTPException as e:
+                    if e.status != 429:
+                        stats.failed += 1
+                        return False
+                    stats.rate_limited += 1
+                    retry_after = float(e.response.headers.get("Retry-After", 1)) if e.response else 1.0
+                    self._on_throttled(retry_after)
+                    continue
+                except Exception as e:
+                    # Erreur réseau, timeout… : un échec pour ce destinataire, pas pour tout le lot
+                    log.warning("⚠️ DM to %s failed: %r", getattr(target, "id", target), e)
+                    stats.failed += 1
+                    return False
+                latency = time.monotonic() - started
+                stats.latencies.append(latency)
+                stats.sent += 1
+                await self._on_success(latency)
+                return True
+            stats.failed += 1
+            return False
+        finally:
+            await self._release()
+
+    async def run(
+        self,
+        targets: Iterable[discord.abc.Messageable],
+        content: str,
+        on_result: Callable[[discord.abc.Messageable, bool], Awaitable[None]] | None = None,
+        stats: FanoutStats | None = None,
+    ) -> FanoutStats:
+        stats = stats or FanoutStats()
+
+        async def deliver(target):
+            ok = await self.send(target, content, stats)
+            if on_result:
+                try:
+                    await on_result(target, ok)
+                except Exception:
+                    log.exception("❌ DM fan-out result handler failed for %s", getattr(target, "id", target))
+
+        await asyncio.gather(*(deliver(t) for t in targets))
+        stats.finished_at = time.monotonic()
+        return stats
@@ -0,0 +1,95 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+import asyncpg
+
+log = logging.getLogger("job-queue")
+
+REMINDER_MODE = os.getenv("REMINDER_MODE", "scheduler")  # scheduler | queue
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "2"))
+JOB_QUEUE_BATCH = int(os.getenv("JOB_QUEUE_BATCH", "50"))
+JOB_QUEUE_POLL_SECONDS = float(os.getenv("JOB_QUEUE_POLL_SECONDS", "1"))
+JOB_QUEUE_LEASE_SECONDS = int(os.getenv("JOB_QUEUE_LEASE_SECONDS", "120"))
+
+ClaimFn = Callable[[int, int], Awaitable[list[asyncpg.Record]]]
+CompleteFn = Callable[[list[asyncpg.Record]], Awaitable[None]]
+# Renvoie les lignes effectivement livrées ; les autres seront retentées
+HandlerFn = Callable[[list[asyncpg.Record]], Awaitable[list[asyncpg.Record]]]
+
+
+class PostgresJobQueue:
+    """File de jobs durable : les lignes dues sont les jobs.
+
+    Chaque worker réclame un lot de lignes dues en posant un bail
+    (`claimed_until`, une seule instruction en autocommit, `SKIP LOCKED`),
+    livre le lot hors transaction, puis supprime seulement les lignes
+    livrées. Aucune connexion n'est gardée pendant les appels Discord. Une
+    ligne dont la livraison a échoué, ou dont le process a crashé, redevient
+    réclamable à l'expiration du bail (JOB_QUEUE_LEASE_SECONDS).
+    """
+
+    def __init__(
+        self,
+        bot,
+        name: str,
+        claim: ClaimFn,
+        handler: HandlerFn,
+        complete: CompleteFn,
+        workers: int = JOB_QUEUE_WORKERS,
+        batch_size: int = JOB_QUEUE_BATCH,
+        poll_interval: float = JOB_QUEUE_POLL_SECONDS,
+        lease_seconds: int = JOB_QUEUE_LEASE_SECONDS,
+    ):
+        self.bot = bot
+        self.name = name
+        self.claim = claim
+        self.handler = handler
+        self.complete = complete
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.processed = 0
+        self.failed = 0
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+            log.info("✅ Job queue %s: %s workers (batch %s)", self.name, self.workers, self.batch_size)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_once(self) -> int:
+        rows = await self.claim(self.batch_size, self.lease_seconds)
+        if not rows:
+            return 0
+        delivered = await self.handler(rows)
+        if delivered:
+            await self.complete(delivered)
+        self.processed += len(delivered)
+        if len(delivered) < len(rows):
+            self.failed += len(rows) - len(delivered)
+            log.warning("⚠️ Job queue %s: %s/%s jobs failed, retried after %ss",
+                        self.name, len(rows) - len(delivered), len(rows), self.lease_seconds)
+        return len(rows)
+
+    async def _worker(self, index: int):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                claimed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("❌ Job queue %s worker %s failed", self.name, index)
+                claimed = 0
+            # Lot plein : il reste sûrement du travail, on enchaîne sans attendre
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,121 @@
+import os
+import time
+import asyncio
+import logging
+
+import discord
+
+log = logging.getLogger("log-buffer")
+
+LOG_FLUSH_SECONDS = float(os.getenv("LOG_FLUSH_SECONDS", "5"))
+LOG_CHANNEL_TTL = int(os.getenv("LOG_CHANNEL_TTL", "600"))
+MESSAGE_LIMIT = 2000
+CHANNEL_QUERY = "SELECT channel_id FROM {table} WHERE guild_id=$1"
+
+
+def chunk_lines(lines: list[str], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """Regroupe des lignes en messages de `limit` caractères max (les lignes trop longues sont coupées)."""
+    chunks, current = [], ""
+    for line in lines:
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class GuildLogBuffer:
+    """Tampon de logs par guilde vers le salon `daily_log_channels`.
+
+    Les lignes sont envoyées en messages groupés, soit quand le tampon
+    atteint la taille d'un message, soit toutes les LOG_FLUSH_SECONDS.
+    """
+
+    def __init__(self, bot, table: str = "daily_log_channels"):
+        self.bot = bot
+        self.table = table
+        self.query = f"{table}.channel"
+        self._channels: dict[int, tuple[int | None, float]] = {}
+        self._lines: dict[int, list[str]] = {}
+        self._sizes: dict[int, int] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self.bot.db.register(self.query, CHANNEL_QUERY.format(table=self.table))
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_all()
+
+    # --- Cache des salons de log ---
+    def set_channel(self, guild_id: int, channel_id: int | None):
+        self._channels[guild_id] = (channel_id, time.monotonic() + LOG_CHANNEL_TTL)
+
+    async def get_channel_id(self, guild_id: int) -> int | None:
+        cached = self._channels.get(guild_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        row = await self.bot.db.fetchrow(self.query, guild_id)
+        channel_id = int(row["channel_id"]) if row else None
+        self.set_channel(guild_id, channel_id)
+        return channel_id
+
+    # --- Tampon ---
+    async def add(self, guild: discord.Guild, line: str):
+        if await self.get_channel_id(guild.id) is None:
+            return
+        self._lines.setdefault(guild.id, []).append(line)
+        self._sizes[guild.id] = self._sizes.get(guild.id, 0) + len(line) + 1
+        if self._sizes[guild.id] >= MESSAGE_LIMIT:
+            await self.flush(guild.id)
+
+    async def flush(self, guild_id: int):
+        lock = self._locks.setdefault(guild_id, asyncio.Lock())
+        async with lock:
+            lines = self._lines.pop(guild_id, None)
+            self._sizes.pop(guild_id, None)
+            if not lines:
+                return
+            guild = self.bot.get_guild(guild_id)
+            channel_id = await self.get_channel_id(guild_id)
+            channel = guild.get_channel(channel_id) if guild and channel_id else None
+            if not channel:
+                return
+            for chunk in chunk_lines(lines):
+                try:
+                    await channel.send(chunk)
+                except discord.Forbidden:
+                    log.warning("❌ Impossible d’envoyer le log dans %s", channel.name)
+                    return
+                except discord.HTTPException as e:
+                    log.error("❌ Log flush failed in %s: %s", channel.name, e)
+
+    async def flush_all(self):
+        for guild_id in list(self._lines):
+            await self.flush(guild_id)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(LOG_FLUSH_SECONDS)
+            try:
+                await self.flush_all()
+            except Exception:
+                log.exception("❌ Log buffer flush loop error")
@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+
+import discord
+
+log = logging.getLogger("members")
+
+MEMBER_CACHE_MODE = os.getenv("MEMBER_CACHE_MODE", "full")  # full | lazy
+MEMBER_CACHE_SIZE = int(os.getenv("MEMBER_CACHE_SIZE", "50000"))
+MEMBER_CACHE_TTL = int(os.getenv("MEMBER_CACHE_TTL", "900"))
+MEMBER_NEGATIVE_TTL = 120
+QUERY_MEMBERS_BATCH = 100  # limite Discord pour query_members(user_ids=...)
+
+
+def member_cache_options(mode: str = MEMBER_CACHE_MODE) -> dict:
+    """Arguments du Bot : en mode lazy, ni chunking au démarrage ni cache de membres discord.py."""
+    if mode == "lazy":
+        return {"chunk_guilds_at_startup": False, "member_cache_flags": discord.MemberCacheFlags.none()}
+    return {}
+
+
+def rss_mb() -> float:
+    """Mémoire résidente actuelle du process (Linux), 0 si indisponible."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class MemberCache:
+    """Résolution des membres : cache discord.py, puis LRU borné, puis API.
+
+    En mode full le cache discord.py répond presque toujours. En mode lazy le
+    LRU (MEMBER_CACHE_SIZE entrées, TTL MEMBER_CACHE_TTL) est rempli à la
+    demande par `fetch_member`, ou par `query_members` par lots de 100 pour
+    `get_many`. Les membres introuvables sont mémorisés MEMBER_NEGATIVE_TTL.
+    """
+
+    def __init__(self, bot, max_size: int = MEMBER_CACHE_SIZE, ttl: float = MEMBER_CACHE_TTL):
+        self.bot = bot
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict[tuple[int, int], tuple[float, discord.Member | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses, "fetched": self.fetched}
+
+    def _store(self, guild_id: int, user_id: int, member: discord.Member | None):
+        key = (guild_id, user_id)
+        ttl = self.ttl if member else MEMBER_NEGATIVE_TTL
+        self._items.pop(key, None)
+        self._items[key] = (time.monotonic() + ttl, member)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def put(self, member: discord.Member):
+        self._store(member.guild.id, member.id, member)
+
+    def discard(self, guild_id: int, user_id: int):
+        self._items.pop((guild_id, user_id), None)
+
+    def _lookup(self, guild: discord.Guild, user_id: int) -> tuple[bool, discord.Member | None]:
+        member = guild.get_member(user_id)
+        if member:
+            return True, member
+        key = (guild.id, user_id)
+        entry = self._items.get(key)
+        if entry is None:
+            return False, None
+        expires_at, member = entry
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return False, None
+        self._items.move_to_end(key)
+        return True, member
+
+    def get_cached(self, guild: discord.Guild, user_id: int) -> discord.Member | None:
+        """Sans appel réseau."""
+        return self._lookup(guild, user_id)[1]
+
+    async def get(self, guild: discord.Guild, user_id: int) -> discord.Member | None:
+        found, member = self._lookup(guild, user_id)
+        if found:
+            self.hits += 1
+            return member
+        self.misses += 1
+        try:
+            member = await guild.fetch_member(user_id)
+            self.fetched += 1
+        except discord.NotFound:
+            member = None
+        except discord.HTTPException as e:
+            log.warning("⚠️ fetch_member %s/%s failed: %s", guild.id, user_id, e)
+            return None
+        self._store(guild.id, user_id, member)
+        return member
+
+    async def get_many(self, guild: discord.Guild, user_ids: list[int]) -> dict[int, discord.Member]:
+        """Membres trouvés parmi `user_ids` ; les absents du cache sont demandés par lots via la gateway."""
+        found: dict[int, discord.Member] = {}
+        missing: list[int] = []
+        for user_id in user_ids:
+            hit, member = self._lookup(guild, user_id)
+            if not hit:
+                missing.append(user_id)
+            elif member:
+                found[user_id] = member
+        self.hits += len(user_ids) - len(missing)
+        self.misses += len(missing)
+
+        for i in range(0, len(missing), QUERY_MEMBERS_BATCH):
+            batch = missing[i:i + QUERY_MEMBERS_BATCH]
+            try:
+                members = await guild.query_members(user_ids=batch, limit=len(batch), cache=False)
+            except (discord.ClientException, TimeoutError, discord.HTTPException) as e:
+                log.warning("⚠️ query_members on %s failed (%s), falling back to fetch_member", guild.id, e)
+                for user_id in batch:
+                    member = await self.get(guild, user_id)
+                    if member:
+                        found[user_id] = member
+                continue
+            self.fetched += len(members)
+            returned = {m.id: m for m in members}
+            for user_id in batch:
+                member = returned.get(user_id)
+                self._store(guild.id, user_id, member)
+                if member:
+                    found[user_id] = member
+        return found
+
+    # --- Listeners gateway (branchés par main.py) ---
+    async def on_member_join(self, member: discord.Member):
+        self.put(member)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if (after.guild.id, after.id) in self._items:
+            self.put(after)
+
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        self.discard(payload.guild_id, payload.user.id)
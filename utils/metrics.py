@@ -0,0 +1,260 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+from aiohttp import web
+
+log = logging.getLogger("metrics")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 = désactivé
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), registry: "Registry | None" = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        (registry or REGISTRY).add(self)
+
+    def labels(self, *values, **kwargs):
+        key = tuple(kwargs[n] for n in self.labelnames) if kwargs else tuple(values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines += self._render_child(key, child)
+        return lines
+
+    def _render_child(self, key: tuple, child) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS, registry: "Registry | None" = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key: tuple, child: _HistogramValue) -> list[str]:
+        lines = []
+        cumulative = 0
+        labels = _labels(self.labelnames, key)
+        for bound, count in zip(child.buckets, child.counts):
+            cumulative += count
+            le = f'le="{_number(bound)}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        # +Inf = toutes les observations, y compris celles au-delà de la dernière borne
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {child.count}")
+        lines.append(f"{self.name}_sum{labels} {_number(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    """Métriques du process + collecteurs appelés juste avant chaque scrape."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def add(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def collector(self, fn: Callable[[], None]):
+        """`fn` met à jour des Gauge à partir de l'état courant (pool, files, scheduler…)."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                log.exception("❌ Metrics collector %s failed", getattr(fn, "__qualname__", fn))
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Partagé par tous les listeners (dispatcher d'embeds, on_message des cogs)
+HANDLER_SECONDS = Histogram(
+    "memassistant_handler_seconds", "Latency of gateway event handlers.", ["handler"]
+)
+HANDLER_ERRORS = Counter(
+    "memassistant_handler_errors_total", "Gateway event handlers that raised.", ["handler"]
+)
+
+# Daily : définies ici et non dans le cog, qu'un reload_extension réimporterait
+DAILY_DMS = Counter("memassistant_daily_dms_total", "Daily reminder deliveries by outcome.", ["status"])
+DAILY_RUN_SECONDS = Gauge("memassistant_daily_run_seconds", "Duration of the last daily run.")
+DAILY_RUN_THROUGHPUT = Gauge("memassistant_daily_run_throughput", "Subscribers handled per second by the last daily run.")
+
+# Jauges lues sur l'état des services à chaque scrape
+DB_POOL_CONNECTIONS = Gauge("memassistant_db_pool_connections", "Postgres pool connections.", ["state"])
+PENDING_REMINDERS = Gauge("memassistant_pending_reminders", "Reminders held by the scheduler.", ["kind"])
+EVENT_QUEUE_PENDING = Gauge("memassistant_event_queue_pending", "Events waiting to be published to Redis.")
+EVENTS_TOTAL = Counter("memassistant_events_total", "Events handled by the Redis publisher.", ["status"])
+WRITE_BEHIND_PENDING = Gauge("memassistant_write_behind_pending", "Reminder writes waiting to be flushed.")
+MEMBER_CACHE_SIZE = Gauge("memassistant_member_cache_size", "Entries in the lazy member LRU.")
+
+
+def register_bot_collector(bot, registry: "Registry | None" = None):
+    @(registry or REGISTRY).collector
+    def collect():
+        if getattr(bot, "db", None):
+            stats = bot.db.pool_stats()
+            DB_POOL_CONNECTIONS.labels(state="idle").set(stats["idle"])
+            DB_POOL_CONNECTIONS.labels(state="in_use").set(stats["size"] - stats["idle"])
+            DB_POOL_CONNECTIONS.labels(state="max").set(stats["max"])
+        if getattr(bot, "scheduler", None):
+            for kind in bot.scheduler.kinds():
+                PENDING_REMINDERS.labels(kind=kind).set(bot.scheduler.pending(kind))
+        if getattr(bot, "events", None):
+            stats = bot.events.stats()
+            EVENT_QUEUE_PENDING.set(stats["pending"])
+            for status in ("flushed", "dropped", "failed"):
+                # Compteurs déjà cumulés par EventPublisher, recopiés tels quels
+                EVENTS_TOTAL.labels(status=status).set(stats[status])
+        if getattr(bot, "writer", None):
+            WRITE_BEHIND_PENDING.set(bot.writer.stats()["pending"])
+        if getattr(bot, "members", None):
+            MEMBER_CACHE_SIZE.set(len(bot.members))
+
+
+class MetricsServer:
+    """Endpoint HTTP local `/metrics` au format texte Prometheus (aiohttp, déjà requis par discord.py)."""
+
+    def __init__(self, registry: Registry = REGISTRY, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        if not self.port or self._runner is not None:
+            return
+
+        async def handle(request):
+            return web.Response(body=self.registry.render().encode(),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info("✅ Metrics exposées sur http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+
+import asyncpg
+
+from utils.db import QUERIES
+from utils.log_buffer import CHANNEL_QUERY
+from utils.reminder_store import store_queries
+
+log = logging.getLogger("migrations")
+
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "1") == "1"
+SCHEMA_PLAN_CHECK = os.getenv("SCHEMA_PLAN_CHECK", "warn")  # off | warn | fail
+MIGRATION_LOCK_ID = 0x6D656D61  # pg_advisory_lock : un seul process migre à la fois
+SAMPLE_TS = datetime(2000, 1, 1, tzinfo=timezone.utc)  # valeurs d'exemple pour EXPLAIN
+SAMPLE_DATE = date(2000, 1, 1)
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+# (version, nom, SQL) — uniquement en ajout, ne jamais modifier une version déjà appliquée.
+# Tout est en IF NOT EXISTS : les bases existantes créées à la main passent sans erreur.
+MIGRATIONS: list[tuple[int, str, str]] = [
+    (1, "base schema", """
+        CREATE TABLE IF NOT EXISTS reminders (
+            bot_name TEXT NOT NULL,
+            task TEXT NOT NULL,
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            expire_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (bot_name, task, guild_id, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS vote_reminders (
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            expire_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS daily_subscribers (
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS daily_log_channels (
+            guild_id BIGINT PRIMARY KEY,
+            channel_id BIGINT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            server_id BIGINT PRIMARY KEY,
+            expire_at TIMESTAMPTZ NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS subscription_codes (
+            code TEXT PRIMARY KEY,
+            server_id BIGINT NOT NULL,
+            expire_at TIMESTAMPTZ NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS guild_config (
+            guild_id BIGINT PRIMARY KEY,
+            high_tier_role_id BIGINT,
+            required_role_id BIGINT,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS rarities (
+            name TEXT PRIMARY KEY,
+            emoji_id TEXT NOT NULL,
+            priority INT NOT NULL,
+            custom_emoji TEXT NOT NULL,
+            message TEXT NOT NULL DEFAULT '{emoji} has summoned, claim it!',
+            high_tier BOOLEAN NOT NULL DEFAULT true
+        );
+    """),
+    (2, "daily run checkpoints", """
+        CREATE TABLE IF NOT EXISTS daily_runs (
+            run_date DATE NOT NULL,
+            shard_key TEXT NOT NULL DEFAULT '',
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            finished_at TIMESTAMPTZ,
+            PRIMARY KEY (run_date, shard_key)
+        );
+        CREATE TABLE IF NOT EXISTS daily_run_deliveries (
+            run_date DATE NOT NULL,
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            status TEXT NOT NULL,
+            PRIMARY KEY (run_date, guild_id, user_id)
+        );
+    """),
+    # Les clés primaires couvrent les accès par (guild_id, user_id) et par guild_id seul.
+    (3, "hot query indexes", """
+        CREATE INDEX IF NOT EXISTS reminders_due_idx ON reminders (bot_name, task, expire_at);
+        CREATE INDEX IF NOT EXISTS vote_reminders_due_idx ON vote_reminders (expire_at);
+        CREATE INDEX IF NOT EXISTS subscriptions_expire_idx ON subscriptions (expire_at);
+    """),
+    # Listings paginés (keyset) : l'index suit l'ordre du listing, une page = un parcours d'index borné
+    (4, "keyset listing indexes", """
+        CREATE INDEX IF NOT EXISTS subscriptions_expire_server_idx ON subscriptions (expire_at, server_id);
+        CREATE INDEX IF NOT EXISTS vote_reminders_guild_expire_idx ON vote_reminders (guild_id, expire_at, user_id);
+    """),
+    # Mode queue : bail de livraison, la ligne n'est supprimée qu'une fois le rappel envoyé
+    (5, "job queue leases", """
+        ALTER TABLE reminders ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ;
+        ALTER TABLE vote_reminders ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ;
+    """),
+    # Résumés daily déjà publiés : une guilde entièrement livrée avant un crash est résumée à la reprise
+    (6, "daily run guild summaries", """
+        CREATE TABLE IF NOT EXISTS daily_run_guilds (
+            run_date DATE NOT NULL,
+            guild_id BIGINT NOT NULL,
+            finished_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (run_date, guild_id)
+        );
+    """),
+]
+
+# Stores Postgres des cogs de rappel : table → colonnes de partition (scope du store)
+REMINDER_STORE_TABLES: dict[str, list[str]] = {"reminders": ["bot_name", "task"], "vote_reminders": []}
+
+
+def named_queries() -> dict[str, str]:
+    """Les requêtes nommées du Repository, y compris celles enregistrées par les stores et le tampon de logs."""
+    queries = dict(QUERIES)
+    for table, columns in REMINDER_STORE_TABLES.items():
+        queries.update({f"{table}.{op}": sql for op, sql in store_queries(table, columns).items()})
+    queries["daily_log_channels.channel"] = CHANNEL_QUERY.format(table="daily_log_channels")
+    return queries
+
+
+_SCOPE = ("MemAssistant", "Reminder")
+_SHARDS = (1, [0])  # shard_count, shard_ids
+
+# Requêtes chaudes, par nom → arguments d'exemple pour EXPLAIN.
+# Aucune ne doit retomber sur un Seq Scan quand les index existent.
+HOT_QUERIES: dict[str, tuple] = {
+    "reminders.claim_due": (*_SCOPE, *_SHARDS, 100, 120),
+    "reminders.complete_due": (*_SCOPE, [0], [0], [SAMPLE_TS]),
+    "reminders.get": (*_SCOPE, 0, 0),
+    "reminders.delete": (*_SCOPE, 0, 0, SAMPLE_TS),
+    "reminders.due_between": (*_SCOPE, SAMPLE_TS, SAMPLE_TS, *_SHARDS),
+    "reminders.pop_due": (*_SCOPE, SAMPLE_TS, 100),
+    "reminders.list_by_guild": (*_SCOPE, 0),
+    "reminders.page_by_guild": (*_SCOPE, 0, SAMPLE_TS, 0, 21),
+    "reminders.count_by_shard": (*_SCOPE, *_SHARDS),
+    "vote_reminders.claim_due": (*_SHARDS, 100, 120),
+    "vote_reminders.complete_due": ([0], [0], [SAMPLE_TS]),
+    "vote_reminders.get": (0, 0),
+    "vote_reminders.delete": (0, 0, SAMPLE_TS),
+    "vote_reminders.due_between": (SAMPLE_TS, SAMPLE_TS, *_SHARDS),
+    "vote_reminders.pop_due": (SAMPLE_TS, 100),
+    "vote_reminders.list_by_guild": (0,),
+    "vote_reminders.page_by_guild": (0, SAMPLE_TS, 0, 21),
+    "vote_reminders.count_by_shard": _SHARDS,
+    "daily.subscriber": (0, 0),
+    "daily.subscribers_page": (0, 0, 21),
+    "daily.run_unfinished": (SAMPLE_DATE, ""),
+    "daily.run_pending": (SAMPLE_DATE, SAMPLE_TS, *_SHARDS, 0, 0, 200),
+    "daily.deliveries_by_guild": (SAMPLE_DATE, 0),
+    "daily.unsummarized_guilds": (SAMPLE_DATE, *_SHARDS),
+    "subscriptions.active": (SAMPLE_TS,),
+    "subscriptions.by_server": (0,),
+    "subscriptions.page": (SAMPLE_TS, 0, 21),
+    "subscription_codes.redeem": ("",),
+    "guild_config.get": (0,),
+    "daily_log_channels.channel": (0,),
+}
+
+
+async def migrate(conn: asyncpg.Connection) -> list[int]:
+    """Applique les migrations manquantes, chacune dans sa transaction ; renvoie les versions appliquées."""
+    # La pool impose DB_STATEMENT_TIMEOUT_MS : ni l'attente du verrou (un autre process migre)
+    # ni un CREATE INDEX long ne doivent faire échouer le démarrage. RESET ALL au retour en pool.
+    await conn.execute("SET statement_timeout = 0")
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    applied: list[int] = []
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        done = {r["version"] for r in await conn.fetch("SELECT version FROM schema_migrations")}
+        for version, name, sql in MIGRATIONS:
+            if version in done:
+                continue
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)", version, name
+                )
+            applied.append(version)
+            log.info("🗄️ Migration %s appliquée : %s", version, name)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+    return applied
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found += _seq_scans(child)
+    return found
+
+
+async def check_query_plans(conn: asyncpg.Connection, queries: dict[str, str] | None = None) -> list[str]:
+    """Requêtes chaudes qui font un Seq Scan même avec `enable_seqscan = off` (index manquant)."""
+    queries = named_queries() if queries is None else queries
+    failures: list[str] = []
+    async with conn.transaction():
+        # Sans ça, le planner préfère le Seq Scan sur une table vide ou petite
+        await conn.execute("SET LOCAL enable_seqscan = off")
+        for name, args in HOT_QUERIES.items():
+            sql = queries.get(name)
+            if sql is None:
+                failures.append(f"{name}: no such named query")
+                continue
+            raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args)
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            tables = _seq_scans(plan)
+            if tables:
+                failures.append(f"{name}: Seq Scan on {', '.join(sorted(set(tables)))}")
+    return failures
+
+
+async def run_migrations(pool: asyncpg.Pool, plan_check: str = SCHEMA_PLAN_CHECK):
+    async with pool.acquire() as conn:
+        applied = await migrate(conn)
+        version = await conn.fetchval("SELECT max(version) FROM schema_migrations")
+        log.info("✅ Schéma à jour (version %s, %s migration(s) appliquée(s))", version, len(applied))
+        if plan_check == "off":
+            return
+        failures = await check_query_plans(conn)
+    if not failures:
+        log.info("✅ Plans des %s requêtes chaudes vérifiés (aucun Seq Scan)", len(HOT_QUERIES))
+        return
+    for failure in failures:
+        log.error("❌ %s", failure)
+    if plan_check == "fail":
+        raise MigrationError(f"{len(failures)} hot queries fall back to a sequential scan")
+
+
+async def _main(argv: list[str]) -> int:
+    """`python -m utils.migrations [--check]` : migre, ou vérifie seulement les plans (code 1 si Seq Scan)."""
+    conn = await asyncpg.connect(dsn=os.getenv("DATABASE_URL"))
+    try:
+        if "--check" not in argv:
+            await migrate(conn)
+        failures = await check_query_plans(conn)
+    finally:
+        await conn.close()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(HOT_QUERIES) - len(failures)}/{len(HOT_QUERIES)} hot queries use an index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
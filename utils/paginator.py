@@ -0,0 +1,96 @@
+import os
+from typing import Any, Awaitable, Callable
+
+import discord
+
+from utils.log_buffer import MESSAGE_LIMIT
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "20"))
+PAGINATOR_TIMEOUT = 300  # secondes
+
+Cursor = Any
+PageFetcher = Callable[[Cursor, int], Awaitable[list]]  # (après ce curseur, limite) → lignes
+
+
+class KeysetPaginator(discord.ui.View):
+    """Listing paginé par curseur (keyset) derrière des boutons ◀️ / ▶️.
+
+    `fetch(cursor, limit)` renvoie les lignes strictement après `cursor` dans
+    l'ordre du listing ; `cursor_of(row)` donne le curseur d'une ligne. Une
+    seule page est chargée par clic (PAGE_SIZE + 1 lignes, la dernière sert à
+    savoir s'il y a une suite) : le coût ne dépend pas de la taille de la
+    table. Seul le curseur de début de chaque page déjà vue est conservé,
+    pour revenir en arrière.
+    """
+
+    def __init__(self, owner_id: int, title: str, fetch: PageFetcher, cursor_of: Callable[[Any], Cursor],
+                 render: Callable[[list], Awaitable[list[str]]], first_cursor: Cursor,
+                 page_size: int = PAGE_SIZE, timeout: float = PAGINATOR_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.owner_id = owner_id
+        self.title = title
+        self.fetch = fetch
+        self.cursor_of = cursor_of
+        self.render = render
+        self.page_size = page_size
+        self._starts: list[Cursor] = [first_cursor]
+        self._rows: list = []
+        self._has_next = False
+        self._interaction: discord.Interaction | None = None
+
+    async def _load(self):
+        rows = await self.fetch(self._starts[-1], self.page_size + 1)
+        self._has_next = len(rows) > self.page_size
+        self._rows = rows[:self.page_size]
+        self.previous_page.disabled = len(self._starts) == 1
+        self.next_page.disabled = not self._has_next
+
+    async def _content(self) -> str:
+        lines = await self.render(self._rows) or ["…"]
+        header = f"{self.title} — page {len(self._starts)}"
+        content = "\n".join([header, *lines])
+        if len(content) > MESSAGE_LIMIT:
+            content = content[:MESSAGE_LIMIT - 1] + "…"
+        return content
+
+    async def start(self, interaction: discord.Interaction, empty: str) -> None:
+        """Envoie la première page, ou `empty` s'il n'y a rien à lister."""
+        await self._load()
+        if not self._rows:
+            await interaction.response.send_message(empty, ephemeral=True)
+            self.stop()
+            return
+        self._interaction = interaction
+        if not self._has_next:
+            # Une seule page : pas de boutons, la vue n'a pas à rester en vie
+            await interaction.response.send_message(await self._content(), ephemeral=True)
+            self.stop()
+            return
+        await interaction.response.send_message(await self._content(), view=self, ephemeral=True)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.owner_id
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self._interaction.edit_original_response(view=self)
+        except discord.HTTPException:
+            pass
+
+    async def _show(self, interaction: discord.Interaction):
+        await self._load()
+        await interaction.response.edit_message(content=await self._content(), view=self)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self._starts) > 1:
+            self._starts.pop()
+        await self._show(interaction)
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self._has_next and self._rows:
+            self._starts.append(self.cursor_of(self._rows[-1]))
+        await self._show(interaction)
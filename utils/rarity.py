@@ -0,0 +1,93 @@
+import os
+import re
+import json
+import logging
+from dataclasses import dataclass
+
+import asyncpg
+
+from utils.db import Repository
+
+log = logging.getLogger("rarity")
+
+RARITY_CONFIG = os.getenv("RARITY_CONFIG")  # chemin d'un JSON optionnel
+
+
+@dataclass(frozen=True, slots=True)
+class Rarity:
+    name: str
+    emoji_id: str
+    priority: int
+    custom_emoji: str
+    message: str = "{emoji} has summoned, claim it!"
+    high_tier: bool = True
+
+
+DEFAULT_RARITIES = [
+    Rarity("SR", "1342202597389373530", 1, "<a:13422080344824259361ezgifcomopti:1438537746863095858>"),
+    Rarity("SSR", "1342202212948115510", 2, "<a:emoji_1763043426681:1438533139512430633>"),
+    Rarity("UR", "1342202203515125801", 3, "<a:emoji_1763043453782:1438533253903679618>", "{emoji} has summoned, claim it!!"),
+]
+
+
+class RarityEngine:
+    """Tables de rareté compilées en deux regex.
+
+    - `detect` : une seule passe sur la description (alternation des ids d'emoji),
+      garde la rareté de plus haute priorité ;
+    - `replace_tokens` : remplace SR/SSR/UR… par l'emoji custom, regex précompilée.
+    """
+
+    def __init__(self, rarities: list[Rarity] | None = None):
+        self.compile(rarities or DEFAULT_RARITIES)
+
+    def compile(self, rarities: list[Rarity]):
+        self.rarities = sorted(rarities, key=lambda r: r.priority, reverse=True)
+        self.by_emoji = {r.emoji_id: r for r in self.rarities}
+        self.by_name = {r.name.upper(): r for r in self.rarities}
+        self._top_priority = self.rarities[0].priority if self.rarities else 0
+        self._detect_re = re.compile("|".join(re.escape(r.emoji_id) for r in self.rarities)) if self.rarities else None
+        # Noms les plus longs d'abord pour que SSR ne soit pas pris pour SR
+        names = sorted(self.by_name, key=len, reverse=True)
+        self._token_re = re.compile(r"\b(" + "|".join(map(re.escape, names)) + r")\b", re.IGNORECASE) if names else None
+
+    def detect(self, text: str) -> Rarity | None:
+        if not text or self._detect_re is None:
+            return None
+        found = None
+        for match in self._detect_re.finditer(text):
+            rarity = self.by_emoji[match.group(0)]
+            if found is None or rarity.priority > found.priority:
+                found = rarity
+                if found.priority == self._top_priority:
+                    break
+        return found
+
+    def custom_emoji(self, name: str, default: str = "🌸") -> str:
+        rarity = self.by_name.get(name.upper())
+        return rarity.custom_emoji if rarity else default
+
+    def replace_tokens(self, text: str | None) -> str | None:
+        if not text or self._token_re is None:
+            return text
+        return self._token_re.sub(lambda m: self.custom_emoji(m.group(0), m.group(0)), text)
+
+    # --- Chargement ---
+    @staticmethod
+    def from_config(path: str) -> list[Rarity]:
+        with open(path, encoding="utf-8") as f:
+            return [Rarity(**{**item, "emoji_id": str(item["emoji_id"])}) for item in json.load(f)]
+
+    async def load(self, db: Repository | None):
+        """Base (`rarities`) > fichier RARITY_CONFIG > valeurs par défaut."""
+        rarities: list[Rarity] = []
+        if db is not None:
+            try:
+                rows = await db.fetch("rarities.all")
+                rarities = [Rarity(**{**dict(row), "emoji_id": str(row["emoji_id"])}) for row in rows]
+            except asyncpg.UndefinedTableError:
+                log.info("ℹ️ Table rarities absente, configuration locale utilisée")
+        if not rarities and RARITY_CONFIG:
+            rarities = self.from_config(RARITY_CONFIG)
+        self.compile(rarities or DEFAULT_RARITIES)
+        log.info("✅ %s raretés chargées (%s)", len(self.rarities), ", ".join(r.name for r in self.rarities))
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import asyncio
+import logging
+
+import discord
+
+from utils.embeds import MAZOKU_BOT_ID
+
+log = logging.getLogger("recorder")
+
+GATEWAY_RECORD_FILE = os.getenv("GATEWAY_RECORD_FILE")  # JSONL ; non défini = pas d'enregistrement
+RECORD_FLUSH_SECONDS = float(os.getenv("RECORD_FLUSH_SECONDS", "1"))
+# Options secrètes (code d'abonnement de /activate_sub…) : jamais écrites dans le fichier
+REDACTED_OPTIONS = {"code"}
+REDACTED = "<redacted>"
+
+
+def _message_event(kind: str, message: discord.Message) -> dict:
+    return {
+        "ts": time.time(),
+        "event": kind,
+        "guild_id": message.guild.id,
+        "channel_id": message.channel.id,
+        "channel_name": getattr(message.channel, "name", None),
+        "message_id": message.id,
+        "author_id": message.author.id,
+        "content": message.content,
+        "embeds": [embed.to_dict() for embed in message.embeds],
+    }
+
+
+def _interaction_event(interaction: discord.Interaction) -> dict:
+    data = interaction.data or {}
+    return {
+        "ts": time.time(),
+        "event": "interaction",
+        "guild_id": interaction.guild_id,
+        "channel_id": interaction.channel_id,
+        "channel_name": getattr(interaction.channel, "name", None),
+        "user_id": interaction.user.id,
+        "admin": bool(interaction.permissions.administrator),
+        "command": data.get("name"),
+        "options": {
+            o["name"]: REDACTED if o["name"] in REDACTED_OPTIONS else o.get("value")
+            for o in data.get("options", [])
+        },
+    }
+
+
+class GatewayRecorder:
+    """Enregistre en JSONL les événements gateway que les cogs consomment.
+
+    Edits et messages de Mazoku avec embed, commandes slash. Chaque ligne a
+    son horodatage `ts` ; `python -m bench.replay` rejoue le fichier contre
+    les vrais cogs. Les lignes sont tamponnées et écrites toutes les
+    RECORD_FLUSH_SECONDS.
+    """
+
+    def __init__(self, bot, path: str | None = GATEWAY_RECORD_FILE, flush_seconds: float = RECORD_FLUSH_SECONDS):
+        self.bot = bot
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.recorded = 0
+        self._lines: list[str] = []
+        self._file = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._task = asyncio.create_task(self._flush_loop())
+        log.info("⏺️ Enregistrement des événements gateway dans %s", self.path)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._file:
+            self.flush()
+            self._file.close()
+            self._file = None
+            log.info("⏹️ %s événements enregistrés dans %s", self.recorded, self.path)
+
+    def record(self, event: dict):
+        if self._file is None:
+            return
+        self._lines.append(json.dumps(event, ensure_ascii=False))
+        self.recorded += 1
+
+    def flush(self):
+        if not self._lines or self._file is None:
+            return
+        lines, self._lines = self._lines, []
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError as e:
+                log.error("❌ Écriture de %s impossible : %s", self.path, e)
+
+    # --- Listeners gateway (branchés par main.py) ---
+    async def on_message_edit(self, before: discord.Message, after: discord.Message):
+        if after.author.id == MAZOKU_BOT_ID and after.guild and after.embeds:
+            self.record(_message_event("message_edit", after))
+
+    async def on_message(self, message: discord.Message):
+        if message.author.id == MAZOKU_BOT_ID and message.guild and message.embeds:
+            self.record(_message_event("message", message))
+
+    async def on_interaction(self, interaction: discord.Interaction):
+        if interaction.type == discord.InteractionType.application_command and interaction.guild_id:
+            self.record(_interaction_event(interaction))
@@ -0,0 +1,467 @@
+import os
+import abc
+import time
+import bisect
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+
+from utils.sharding import owned_shards, shard_clause, shard_for
+
+log = logging.getLogger("reminder-store")
+
+REMINDER_STORE = os.getenv("REMINDER_STORE", "postgres")  # postgres | redis | memory
+GUILD_INDEX_BUILD_TTL = 60  # secondes : verrou de construction de l'index Redis par guilde
+
+Key = tuple[int, int]                  # (guild_id, user_id)
+Entry = tuple[Key, float, int]         # (clé, échéance timestamp, channel_id)
+
+# KEYS = zset, hash, puis le zset de guilde de chaque candidat ; ARGV = now, puis (membre, membre de guilde).
+# Les candidats sont lus avant l'appel : le script revérifie l'échéance, un seul replica retire chaque rappel.
+POP_DUE_SCRIPT = """
+local out = {}
+for i = 3, #KEYS do
+    local member = ARGV[2 * i - 4]
+    local score = redis.call('zscore', KEYS[1], member)
+    if score and tonumber(score) <= tonumber(ARGV[1]) then
+        out[#out + 1] = member
+        out[#out + 1] = score
+        out[#out + 1] = redis.call('hget', KEYS[2], member) or false
+        redis.call('zrem', KEYS[1], member)
+        redis.call('hdel', KEYS[2], member)
+        redis.call('zrem', KEYS[i], ARGV[2 * i - 3])
+    end
+end
+return out
+"""
+CANCEL_SCRIPT = """
+local score = redis.call('zscore', KEYS[1], ARGV[1])
+if score and tonumber(score) <= tonumber(ARGV[2]) then
+    redis.call('zrem', KEYS[1], ARGV[1])
+    redis.call('zrem', KEYS[3], ARGV[3])
+    return redis.call('hdel', KEYS[2], ARGV[1])
+end
+return 0
+"""
+
+
+def _utc(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+
+class ReminderStore(abc.ABC):
+    """Stockage des rappels, indépendant du backend.
+
+    - put(key, due_ts, channel_id) : crée ou remplace le rappel du membre ;
+    - get(key) : le rappel du membre, échu ou non, ou None ;
+    - cancel(key, fired_at) : supprime le rappel s'il échoit au plus tard à
+      `fired_at` (un rappel relancé entre-temps est conservé) ;
+    - due_between(start, until) : rappels de nos shards échus dans ]start, until]
+      (chargement de la fenêtre du scheduler) ;
+    - pop_due(now, limit) : retire et renvoie les rappels échus (tous shards) ;
+    - list_by_guild(guild_id) ;
+    - page_by_guild(guild_id, after, limit) : rappels de la guilde triés par
+      (échéance, user_id), strictement après le curseur `after` (keyset) ;
+      chaque backend a un index par guilde, une page ne lit que `limit` rappels ;
+    - count_by_shard() : rappels en attente sur nos shards.
+    """
+
+    backend = "abstract"
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def _owned(self, entries: list[Entry]) -> list[Entry]:
+        shard_count, shard_ids = owned_shards(self.bot)
+        if len(shard_ids) == shard_count:
+            return entries
+        owned = set(shard_ids)
+        return [e for e in entries if shard_for(e[0][0], shard_count) in owned]
+
+    def _count(self, entries: list[Entry]) -> dict[int, int]:
+        shard_count, _ = owned_shards(self.bot)
+        return dict(sorted(Counter(shard_for(e[0][0], shard_count) for e in self._owned(entries)).items()))
+
+    @abc.abstractmethod
+    async def put(self, key: Key, due_ts: float, channel_id: int):
+        ...
+
+    @abc.abstractmethod
+    async def cancel(self, key: Key, fired_at: float):
+        ...
+
+    @abc.abstractmethod
+    async def get(self, key: Key) -> Entry | None:
+        ...
+
+    @abc.abstractmethod
+    async def due_between(self, start: float, until: float) -> list[Entry]:
+        ...
+
+    @abc.abstractmethod
+    async def pop_due(self, now: float, limit: int | None = None) -> list[Entry]:
+        ...
+
+    @abc.abstractmethod
+    async def list_by_guild(self, guild_id: int) -> list[Entry]:
+        ...
+
+    @abc.abstractmethod
+    async def page_by_guild(self, guild_id: int, after: tuple[float, int], limit: int) -> list[Entry]:
+        ...
+
+    @abc.abstractmethod
+    async def count_by_shard(self) -> dict[int, int]:
+        ...
+
+
+def store_queries(table: str, columns: list[str]) -> dict[str, str]:
+    """SQL de PostgresReminderStore par opération, `columns` étant les colonnes de partition."""
+    n = len(columns)
+    where = "".join(f"{c}=${i} AND " for i, c in enumerate(columns, start=1))
+    key_columns = ", ".join(columns + ["guild_id", "user_id"])
+    placeholders = ", ".join(f"${i}" for i in range(1, n + 5))
+    return {
+        "upsert": (
+            f"INSERT INTO {table} ({', '.join(columns + ['guild_id', 'user_id', 'channel_id', 'expire_at'])}) "
+            f"VALUES ({placeholders}) "
+            f"ON CONFLICT ({key_columns}) DO UPDATE SET channel_id=${n + 3}, expire_at=${n + 4}"
+        ),
+        "get": (
+            f"SELECT guild_id, user_id, channel_id, expire_at FROM {table} "
+            f"WHERE {where}guild_id=${n + 1} AND user_id=${n + 2}"
+        ),
+        # expire_at <= fired_at : ne supprime jamais un rappel relancé entre-temps
+        "delete": (
+            f"DELETE FROM {table} WHERE {where}guild_id=${n + 1} AND user_id=${n + 2} AND expire_at <= ${n + 3}"
+        ),
+        "due_between": (
+            f"SELECT guild_id, user_id, channel_id, expire_at FROM {table} "
+            f"WHERE {where}expire_at > ${n + 1} AND expire_at <= ${n + 2} "
+            f"AND {shard_clause('guild_id', n + 3, n + 4)}"
+        ),
+        "pop_due": (
+            f"DELETE FROM {table} WHERE ctid IN ("
+            f"SELECT ctid FROM {table} WHERE {where}expire_at <= ${n + 1} "
+            f"ORDER BY expire_at LIMIT ${n + 2}"
+            ") RETURNING guild_id, user_id, channel_id, expire_at"
+        ),
+        "list_by_guild": (
+            f"SELECT guild_id, user_id, channel_id, expire_at FROM {table} "
+            f"WHERE {where}guild_id=${n + 1} ORDER BY expire_at"
+        ),
+        "page_by_guild": (
+            f"SELECT guild_id, user_id, channel_id, expire_at FROM {table} "
+            f"WHERE {where}guild_id=${n + 1} AND (expire_at, user_id) > (${n + 2}, ${n + 3}) "
+            f"ORDER BY expire_at, user_id LIMIT ${n + 4}"
+        ),
+        "count_by_shard": (
+            f"SELECT (guild_id >> 22) % ${n + 1}::bigint AS shard_id, count(*) AS pending FROM {table} "
+            f"WHERE {where}expire_at > now() AND {shard_clause('guild_id', n + 1, n + 2)} "
+            "GROUP BY 1 ORDER BY 1"
+        ),
+    }
+
+
+class PostgresReminderStore(ReminderStore):
+    """Tables `reminders` / `vote_reminders` ; écritures via le WriteBehindWriter.
+
+    `scope` fixe les colonnes de partition de la table (ex. bot_name, task) ;
+    elles font partie de la clé primaire avec (guild_id, user_id). Les requêtes
+    sont enregistrées dans le Repository sous `<table>.<opération>`.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, bot, table: str, scope: dict[str, object] | None = None):
+        super().__init__(bot)
+        self.table = table
+        self.scope_values = tuple((scope or {}).values())
+        for op, sql in store_queries(table, list(scope or {})).items():
+            bot.db.register(f"{table}.{op}", sql)
+        bot.writer.register(table, f"{table}.upsert", f"{table}.delete")
+
+    @staticmethod
+    def _entries(rows) -> list[Entry]:
+        return [((r["guild_id"], r["user_id"]), r["expire_at"].timestamp(), r["channel_id"]) for r in rows]
+
+    async def put(self, key: Key, due_ts: float, channel_id: int):
+        self.bot.writer.upsert(self.table, key, (*self.scope_values, *key, channel_id, _utc(due_ts)))
+
+    async def cancel(self, key: Key, fired_at: float):
+        self.bot.writer.delete(self.table, key, (*self.scope_values, *key, _utc(fired_at)))
+
+    async def get(self, key: Key) -> Entry | None:
+        # Le tampon du write-behind (et le lot en cours d'écriture) est plus récent que la table
+        upsert, delete = self.bot.writer.pending(self.table, key)
+        if upsert:
+            entry = (key, upsert[-1].timestamp(), upsert[-2])
+        else:
+            row = await self.bot.db.fetchrow(f"{self.table}.get", *self.scope_values, *key)
+            entry = self._entries([row])[0] if row else None
+        # Même condition que le DELETE du store : expire_at <= fired_at
+        if entry and delete and entry[1] <= delete[-1].timestamp():
+            return None
+        return entry
+
+    async def due_between(self, start: float, until: float) -> list[Entry]:
+        await self.bot.writer.flush()
+        shard_count, shard_ids = owned_shards(self.bot)
+        rows = await self.bot.db.fetch(
+            f"{self.table}.due_between", *self.scope_values, _utc(start), _utc(until), shard_count, shard_ids
+        )
+        return self._entries(rows)
+
+    async def pop_due(self, now: float, limit: int | None = None) -> list[Entry]:
+        await self.bot.writer.flush()
+        rows = await self.bot.db.fetch(f"{self.table}.pop_due", *self.scope_values, _utc(now), limit)
+        return self._entries(rows)
+
+    async def list_by_guild(self, guild_id: int) -> list[Entry]:
+        await self.bot.writer.flush()
+        rows = await self.bot.db.fetch(f"{self.table}.list_by_guild", *self.scope_values, guild_id)
+        return self._entries(rows)
+
+    async def page_by_guild(self, guild_id: int, after: tuple[float, int], limit: int) -> list[Entry]:
+        await self.bot.writer.flush()
+        rows = await self.bot.db.fetch(
+            f"{self.table}.page_by_guild", *self.scope_values, guild_id, _utc(after[0]), after[1], limit
+        )
+        return self._entries(rows)
+
+    async def count_by_shard(self) -> dict[int, int]:
+        shard_count, shard_ids = owned_shards(self.bot)
+        rows = await self.bot.db.fetch(f"{self.table}.count_by_shard", *self.scope_values, shard_count, shard_ids)
+        return {r["shard_id"]: r["pending"] for r in rows}
+
+
+class RedisReminderStore(ReminderStore):
+    """Sorted set `reminders:<namespace>` (score = échéance) + hash des salons.
+
+    Écritures immédiates (pas de write-behind) ; pop_due et cancel passent par
+    des scripts Lua pour rester atomiques entre replicas du bot, toutes les
+    clés touchées passant par KEYS. Elles ne partagent pas de hash slot :
+    Redis Cluster n'est pas supporté (un seul primaire). Un seul sorted set
+    pour tous les shards : un changement de SHARD_COUNT ne perd aucun rappel.
+    Les listings par guilde lisent un sorted set par guilde,
+    `reminders:<namespace>:guild:<guild_id>` (membre = user_id sur 20 chiffres,
+    pour qu'à échéance égale l'ordre de Redis soit celui des user_id).
+    """
+
+    backend = "redis"
+
+    def __init__(self, bot, namespace: str):
+        super().__init__(bot)
+        self.zkey = f"reminders:{namespace}"
+        self.hkey = f"reminders:{namespace}:channels"
+        self.gprefix = f"reminders:{namespace}:guild:"
+        self.index_key = f"reminders:{namespace}:guild-index"
+        self.index_lock_key = f"{self.index_key}:building"
+        self._indexed = False
+
+    @property
+    def redis(self):
+        return self.bot.redis
+
+    @staticmethod
+    def _member(key: Key) -> str:
+        return f"{key[0]}:{key[1]}"
+
+    @staticmethod
+    def _key(member: str) -> Key:
+        guild_id, user_id = member.split(":")
+        return int(guild_id), int(user_id)
+
+    def _gkey(self, guild_id: int) -> str:
+        return f"{self.gprefix}{guild_id}"
+
+    @staticmethod
+    def _gmember(user_id: int) -> str:
+        return f"{user_id:020d}"
+
+    async def _guild_index_ready(self) -> bool:
+        """Indexe par guilde, une seule fois par namespace, les rappels écrits avant l'index.
+
+        Le marqueur n'est posé qu'une fois l'index complet ; la construction est
+        protégée par un verrou à durée limitée, repris si le process meurt en route.
+        Tant que l'index n'est pas prêt, les listings repassent par un ZSCAN.
+        """
+        if self._indexed:
+            return True
+        if await self.redis.exists(self.index_key):
+            self._indexed = True
+            return True
+        if not await self.redis.set(self.index_lock_key, 1, nx=True, ex=GUILD_INDEX_BUILD_TTL):
+            return False  # un autre process construit l'index
+        try:
+            count = 0
+            async with self.redis.pipeline(transaction=False) as pipe:
+                async for member, score in self.redis.zscan_iter(self.zkey):
+                    guild_id, user_id = self._key(member)
+                    pipe.zadd(self._gkey(guild_id), {self._gmember(user_id): score})
+                    count += 1
+                await pipe.execute()
+            await self.redis.set(self.index_key, 1)
+        finally:
+            await self.redis.delete(self.index_lock_key)
+        log.info("🗂️ Index par guilde de %s construit (%s rappels)", self.zkey, count)
+        self._indexed = True
+        return True
+
+    async def _scan_guild(self, guild_id: int) -> list[Entry]:
+        scored = [item async for item in self.redis.zscan_iter(self.zkey, match=f"{guild_id}:*")]
+        return sorted(await self._entries(scored), key=lambda e: (e[1], e[0][1]))
+
+    async def _entries(self, scored: list[tuple[str, float]]) -> list[Entry]:
+        if not scored:
+            return []
+        channels = await self.redis.hmget(self.hkey, [m for m, _ in scored])
+        return [
+            (self._key(member), float(score), int(channel_id))
+            for (member, score), channel_id in zip(scored, channels) if channel_id is not None
+        ]
+
+    async def put(self, key: Key, due_ts: float, channel_id: int):
+        member = self._member(key)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.zkey, {member: due_ts})
+            pipe.hset(self.hkey, member, channel_id)
+            pipe.zadd(self._gkey(key[0]), {self._gmember(key[1]): due_ts})
+            await pipe.execute()
+
+    async def cancel(self, key: Key, fired_at: float):
+        await self.redis.eval(
+            CANCEL_SCRIPT, 3, self.zkey, self.hkey, self._gkey(key[0]),
+            self._member(key), fired_at, self._gmember(key[1])
+        )
+
+    async def get(self, key: Key) -> Entry | None:
+        member = self._member(key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zscore(self.zkey, member)
+            pipe.hget(self.hkey, member)
+            score, channel_id = await pipe.execute()
+        if score is None or channel_id is None:
+            return None
+        return key, float(score), int(channel_id)
+
+    async def due_between(self, start: float, until: float) -> list[Entry]:
+        scored = await self.redis.zrangebyscore(self.zkey, f"({start}", until, withscores=True)
+        return self._owned(await self._entries(scored))
+
+    async def pop_due(self, now: float, limit: int | None = None) -> list[Entry]:
+        members = await self.redis.zrangebyscore(self.zkey, "-inf", now, start=0, num=limit or -1)
+        if not members:
+            return []
+        keys = [self.zkey, self.hkey]
+        argv: list = [now]
+        for member in members:
+            guild_id, user_id = self._key(member)
+            keys.append(self._gkey(guild_id))
+            argv += [member, self._gmember(user_id)]
+        flat = await self.redis.eval(POP_DUE_SCRIPT, len(keys), *keys, *argv)
+        return [
+            (self._key(flat[i]), float(flat[i + 1]), int(flat[i + 2]))
+            for i in range(0, len(flat), 3) if flat[i + 2] is not None
+        ]
+
+    async def list_by_guild(self, guild_id: int) -> list[Entry]:
+        if not await self._guild_index_ready():
+            return await self._scan_guild(guild_id)
+        scored = await self.redis.zrangebyscore(self._gkey(guild_id), "-inf", "+inf", withscores=True)
+        return await self._entries([(f"{guild_id}:{int(u)}", s) for u, s in scored])
+
+    async def page_by_guild(self, guild_id: int, after: tuple[float, int], limit: int) -> list[Entry]:
+        if not await self._guild_index_ready():
+            return [e for e in await self._scan_guild(guild_id) if (e[1], e[0][1]) > after][:limit]
+        gkey = self._gkey(guild_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            # Même échéance que le curseur : seuls les user_id suivants ; puis la suite, bornée par LIMIT
+            pipe.zrangebyscore(gkey, after[0], after[0], withscores=True)
+            pipe.zrangebyscore(gkey, f"({after[0]}", "+inf", withscores=True, start=0, num=limit)
+            ties, scored = await pipe.execute()
+        page = [(u, s) for u, s in ties if int(u) > after[1]] + scored
+        return await self._entries([(f"{guild_id}:{int(u)}", s) for u, s in page[:limit]])
+
+    async def count_by_shard(self) -> dict[int, int]:
+        scored = await self.redis.zrangebyscore(self.zkey, f"({time.time()}", "+inf", withscores=True)
+        return self._count([(self._key(member), score, 0) for member, score in scored])
+
+
+class MemoryReminderStore(ReminderStore):
+    """Dictionnaire en mémoire (tests, benchmarks) : rien ne survit au redémarrage."""
+
+    backend = "memory"
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self._items: dict[Key, tuple[float, int]] = {}
+        self._by_guild: dict[int, list[tuple[float, int]]] = {}  # (échéance, user_id) triés, par guilde
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _unindex(self, key: Key, due_ts: float):
+        entries = self._by_guild.get(key[0], [])
+        i = bisect.bisect_left(entries, (due_ts, key[1]))
+        if i < len(entries) and entries[i] == (due_ts, key[1]):
+            del entries[i]
+        if not entries:
+            self._by_guild.pop(key[0], None)
+
+    async def put(self, key: Key, due_ts: float, channel_id: int):
+        current = self._items.get(key)
+        if current:
+            self._unindex(key, current[0])
+        self._items[key] = (due_ts, channel_id)
+        bisect.insort(self._by_guild.setdefault(key[0], []), (due_ts, key[1]))
+
+    async def cancel(self, key: Key, fired_at: float):
+        item = self._items.get(key)
+        if item and item[0] <= fired_at:
+            del self._items[key]
+            self._unindex(key, item[0])
+
+    async def get(self, key: Key) -> Entry | None:
+        item = self._items.get(key)
+        return (key, *item) if item else None
+
+    async def due_between(self, start: float, until: float) -> list[Entry]:
+        return self._owned([(k, due, ch) for k, (due, ch) in self._items.items() if start < due <= until])
+
+    async def pop_due(self, now: float, limit: int | None = None) -> list[Entry]:
+        due = sorted(((k, d, ch) for k, (d, ch) in self._items.items() if d <= now), key=lambda e: e[1])
+        if limit is not None:
+            due = due[:limit]
+        for key, due_ts, _ in due:
+            del self._items[key]
+            self._unindex(key, due_ts)
+        return due
+
+    def _guild_entries(self, guild_id: int, indexed: list[tuple[float, int]]) -> list[Entry]:
+        return [((guild_id, user_id), due, self._items[(guild_id, user_id)][1]) for due, user_id in indexed]
+
+    async def list_by_guild(self, guild_id: int) -> list[Entry]:
+        return self._guild_entries(guild_id, self._by_guild.get(guild_id, []))
+
+    async def page_by_guild(self, guild_id: int, after: tuple[float, int], limit: int) -> list[Entry]:
+        entries = self._by_guild.get(guild_id, [])
+        start = bisect.bisect_right(entries, after)
+        return self._guild_entries(guild_id, entries[start:start + limit])
+
+    async def count_by_shard(self) -> dict[int, int]:
+        now = time.time()
+        return self._count([(k, d, ch) for k, (d, ch) in self._items.items() if d > now])
+
+
+def make_reminder_store(bot, table: str, scope: dict[str, object] | None = None,
+                        backend: str = REMINDER_STORE) -> ReminderStore:
+    """Backend choisi par REMINDER_STORE ; repli sur Postgres si Redis est absent."""
+    if backend == "redis":
+        if getattr(bot, "redis", None):
+            return RedisReminderStore(bot, table)
+        log.warning("⚠️ REMINDER_STORE=redis sans Redis : repli sur Postgres pour %s", table)
+    elif backend == "memory":
+        log.warning("⚠️ REMINDER_STORE=memory : les rappels de %s ne survivront pas au redémarrage", table)
+        return MemoryReminderStore(bot)
+    return PostgresReminderStore(bot, table, scope)
@@ -0,0 +1,157 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+import discord
+
+log = logging.getLogger("resolver")
+
+RESOLVER_CACHE_SIZE = int(os.getenv("RESOLVER_CACHE_SIZE", "10000"))
+RESOLVER_TTL = int(os.getenv("RESOLVER_TTL", "900"))
+RESOLVER_NEGATIVE_TTL = 120
+
+
+class _TTLCache:
+    """LRU borné dont chaque entrée expire ; `None` est une entrée négative valide."""
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._items: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key) -> tuple[bool, object]:
+        entry = self._items.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return False, None
+        self._items.move_to_end(key)
+        return True, value
+
+    def put(self, key, value):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._items.pop(key, None)
+        self._items[key] = (time.monotonic() + ttl, value)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def discard(self, key):
+        self._items.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[object, object], bool]):
+        for key in [k for k, (_, v) in self._items.items() if predicate(k, v)]:
+            del self._items[key]
+
+
+class EntityResolver:
+    """Résolution des salons, rôles configurés et salons DM sans appel REST évitable.
+
+    Le cache discord.py répond d'abord ; sinon le résultat de l'API est gardé
+    RESOLVER_TTL secondes, et un échec (salon supprimé, accès refusé, rôle non
+    configuré) RESOLVER_NEGATIVE_TTL. Les événements gateway de salons et de
+    rôles invalident les entrées concernées.
+    """
+
+    def __init__(self, bot, max_size: int = RESOLVER_CACHE_SIZE, ttl: float = RESOLVER_TTL,
+                 negative_ttl: float = RESOLVER_NEGATIVE_TTL):
+        self.bot = bot
+        self._channels = _TTLCache(max_size, ttl, negative_ttl)  # channel_id → salon
+        self._roles = _TTLCache(max_size, ttl, negative_ttl)     # (guild_id, nom) → role_id
+        self._dms = _TTLCache(max_size, ttl, negative_ttl)       # user_id → DMChannel
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels), "roles": len(self._roles), "dms": len(self._dms),
+            "hits": self.hits, "misses": self.misses, "fetched": self.fetched,
+        }
+
+    async def channel(self, guild: discord.Guild, channel_id: int) -> discord.abc.GuildChannel | None:
+        """Salon `channel_id` vu depuis `guild` ; peut appartenir à une autre guilde (salons fixes)."""
+        channel = guild.get_channel(channel_id) or self.bot.get_channel(channel_id)
+        if channel:
+            return channel
+        found, channel = self._channels.get(channel_id)
+        if found:
+            self.hits += 1
+            return channel
+        self.misses += 1
+        try:
+            channel = await self.bot.fetch_channel(channel_id)
+            self.fetched += 1
+        except (discord.NotFound, discord.Forbidden):
+            channel = None
+        except discord.HTTPException as e:
+            log.warning("⚠️ fetch_channel %s failed: %s", channel_id, e)
+            return None
+        self._channels.put(channel_id, channel)
+        return channel
+
+    async def role(self, guild: discord.Guild, name: str,
+                   load_id: Callable[[], Awaitable[int | None]]) -> discord.Role | None:
+        """Rôle configuré `name` de la guilde ; `load_id` n'est appelé qu'en cas d'absence du cache."""
+        key = (guild.id, name)
+        found, role_id = self._roles.get(key)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+            role_id = await load_id()
+            self._roles.put(key, role_id)
+        return guild.get_role(role_id) if role_id else None
+
+    def invalidate_role(self, guild_id: int, name: str | None = None):
+        """À appeler quand la configuration d'un rôle change."""
+        if name:
+            self._roles.discard((guild_id, name))
+        else:
+            self._roles.discard_where(lambda key, _: key[0] == guild_id)
+
+    async def dm_channel(self, user: discord.abc.User) -> discord.DMChannel | None:
+        # discord.py ne garde que 128 salons DM : au-delà, create_dm refait un POST à chaque fois
+        channel = user.dm_channel
+        if channel:
+            return channel
+        found, channel = self._dms.get(user.id)
+        if found:
+            self.hits += 1
+            return channel
+        self.misses += 1
+        try:
+            channel = await user.create_dm()
+            self.fetched += 1
+        except discord.HTTPException as e:
+            log.warning("⚠️ create_dm %s failed: %s", user.id, e)
+            channel = None
+        self._dms.put(user.id, channel)
+        return channel
+
+    # --- Listeners gateway (branchés par main.py) ---
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self._channels.discard(channel.id)
+
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        self._channels.discard(after.id)
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self._channels.discard(channel.id)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        self._roles.discard_where(lambda _, role_id: role_id == after.id)
+
+    async def on_guild_role_delete(self, role: discord.Role):
+        self._roles.discard_where(lambda _, role_id: role_id == role.id)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.invalidate_role(guild.id)
+        self._channels.discard_where(lambda _, channel: channel is not None and channel.guild.id == guild.id)
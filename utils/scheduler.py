@@ -0,0 +1,156 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import Counter
+from typing import Any, Awaitable, Callable, Hashable
+
+log = logging.getLogger("scheduler")
+
+SCHEDULER_WINDOW_SECONDS = int(os.getenv("SCHEDULER_WINDOW_SECONDS", "3600"))  # 1h
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "200"))
+
+# fire(batch) reçoit une liste de (key, payload) arrivés à échéance
+FireHandler = Callable[[list[tuple[Hashable, Any]]], Awaitable[None]]
+# load(until) renvoie les (key, due_ts, payload) persistés qui tombent dans la fenêtre
+LoadHandler = Callable[[float], Awaitable[list[tuple[Hashable, float, Any]]]]
+
+
+class ReminderScheduler:
+    """Tas de timers partagé par tous les cogs de rappel.
+
+    Une seule tâche asyncio pour tout le bot. Seuls les rappels dus dans la
+    fenêtre glissante (`window` secondes) sont gardés en mémoire, le reste
+    est relu depuis Postgres quand il entre dans la fenêtre.
+    """
+
+    def __init__(self, bot, window: int = SCHEDULER_WINDOW_SECONDS, batch_size: int = SCHEDULER_BATCH_SIZE):
+        self.bot = bot
+        self.window = window
+        self.batch_size = batch_size
+        self._heap: list[tuple[float, int, str, Hashable]] = []
+        self._entries: dict[tuple[str, Hashable], tuple[float, int, Any]] = {}
+        self._counts: Counter[str] = Counter()  # entrées par kind, lues à chaque scrape des métriques
+        self._handlers: dict[str, tuple[FireHandler, LoadHandler | None]] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._window_end = 0.0
+        self._task: asyncio.Task | None = None
+        self._firing: set[asyncio.Task] = set()
+
+    # --- Enregistrement ---
+    def register(self, kind: str, fire: FireHandler, load: LoadHandler | None = None):
+        self._handlers[kind] = (fire, load)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._firing:
+            await asyncio.gather(*self._firing, return_exceptions=True)
+
+    # --- API utilisée par les cogs ---
+    def schedule(self, kind: str, key: Hashable, due_ts: float, payload: Any = None):
+        _, load = self._handlers[kind]
+        if load is not None and due_ts > self._window_end:
+            # Hors fenêtre : la ligne est en base, elle sera rechargée plus tard
+            return
+        current = self._entries.get((kind, key))
+        if current and current[0] == due_ts and current[2] == payload:
+            return
+        if current is None:
+            self._counts[kind] += 1
+        seq = next(self._seq)
+        self._entries[(kind, key)] = (due_ts, seq, payload)
+        heapq.heappush(self._heap, (due_ts, seq, kind, key))
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+
+    def cancel(self, kind: str, key: Hashable):
+        # Suppression paresseuse : l'entrée du tas sera ignorée au pop
+        if self._entries.pop((kind, key), None) is not None:
+            self._counts[kind] -= 1
+
+    def is_scheduled(self, kind: str, key: Hashable) -> bool:
+        return (kind, key) in self._entries
+
+    def kinds(self) -> list[str]:
+        return list(self._handlers)
+
+    def pending(self, kind: str | None = None) -> int:
+        if kind is None:
+            return len(self._entries)
+        return self._counts[kind]
+
+    # --- Boucle interne ---
+    async def _refresh_window(self):
+        until = time.time() + self.window
+        self._window_end = until
+        for kind, (_, load) in self._handlers.items():
+            if load is None:
+                continue
+            try:
+                rows = await load(until)
+            except Exception:
+                log.exception("❌ Scheduler: failed to load window for %s", kind)
+                continue
+            for key, due_ts, payload in rows:
+                self.schedule(kind, key, due_ts, payload)
+            log.info("🪟 Scheduler window loaded: %s %s entries (%s pending)", len(rows), kind, self.pending(kind))
+
+        # Compactage si le tas est encombré d'entrées annulées
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._heap = [(due, seq, kind, key) for (kind, key), (due, seq, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> dict[str, list[tuple[Hashable, Any]]]:
+        due: dict[str, list[tuple[Hashable, Any]]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, kind, key = heapq.heappop(self._heap)
+            entry = self._entries.get((kind, key))
+            if not entry or entry[1] != seq:
+                continue
+            del self._entries[(kind, key)]
+            self._counts[kind] -= 1
+            due.setdefault(kind, []).append((key, entry[2]))
+        return due
+
+    async def _fire_batch(self, kind: str, batch: list[tuple[Hashable, Any]]):
+        fire, _ = self._handlers[kind]
+        try:
+            await fire(batch)
+        except Exception:
+            log.exception("❌ Scheduler: %s batch of %s failed", kind, len(batch))
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        next_refresh = 0.0
+        while True:
+            now = time.time()
+            if now >= next_refresh:
+                await self._refresh_window()
+                next_refresh = now + self.window / 2
+
+            for kind, entries in self._pop_due(time.time()).items():
+                for i in range(0, len(entries), self.batch_size):
+                    task = asyncio.create_task(self._fire_batch(kind, entries[i:i + self.batch_size]))
+                    self._firing.add(task)
+                    task.add_done_callback(self._firing.discard)
+
+            next_due = self._heap[0][0] if self._heap else float("inf")
+            timeout = max(0.0, min(next_refresh, next_due) - time.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,27 @@
+import os
+from collections import Counter
+from typing import Iterable
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None          # None → nombre recommandé par Discord
+SHARD_IDS = [int(s) for s in os.getenv("SHARD_IDS", "").split(",") if s.strip()] or None
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    """Formule Discord : (guild_id >> 22) % shard_count."""
+    return (guild_id >> 22) % shard_count
+
+
+def owned_shards(bot) -> tuple[int, list[int]]:
+    """(shard_count, shard_ids) servis par ce process ; (1, [0]) sans sharding."""
+    shard_count = bot.shard_count or 1
+    shard_ids = sorted(bot.shard_ids) if getattr(bot, "shard_ids", None) else list(range(shard_count))
+    return shard_count, shard_ids
+
+
+def shard_clause(column: str, count_param: int, ids_param: int) -> str:
+    """Filtre SQL sur les guildes de nos shards, ex. shard_clause("guild_id", 3, 4)."""
+    return f"(({column} >> 22) % ${count_param}::bigint) = ANY(${ids_param}::bigint[])"
+
+
+def shard_counts(guild_ids: Iterable[int], shard_count: int) -> dict[int, int]:
+    return dict(sorted(Counter(shard_for(g, shard_count) for g in guild_ids).items()))
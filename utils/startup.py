@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from contextlib import contextmanager
+
+log = logging.getLogger("startup")
+
+COMMAND_HASH_FILE = os.getenv("COMMAND_HASH_FILE", ".command_tree_hash")
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "0") == "1"
+
+
+class StartupTimer:
+    """Durée de chaque phase du démarrage, résumée en une ligne de log."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        self._checkpoint = self.started
+
+    @contextmanager
+    def phase(self, name: str):
+        self._checkpoint = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name)
+
+    def mark(self, name: str):
+        """Enregistre le temps écoulé depuis la fin de la phase précédente."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._checkpoint))
+        self._checkpoint = now
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        parts = [f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases]
+        return " | ".join(parts + [f"total {self.elapsed():.2f}s"])
+
+
+def command_tree_hash(tree) -> str:
+    """Empreinte des commandes globales telles qu'envoyées à Discord."""
+    payload = sorted((cmd.to_dict(tree) for cmd in tree.get_commands()), key=lambda c: (c["type"], c["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def _stored_hash(bot, key: str) -> str | None:
+    if getattr(bot, "redis", None):
+        try:
+            return await bot.redis.get(key)
+        except Exception as e:
+            log.warning("⚠️ Lecture du hash des commandes impossible (Redis) : %s", e)
+            return None
+    try:
+        with open(COMMAND_HASH_FILE) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+async def _store_hash(bot, key: str, digest: str):
+    if getattr(bot, "redis", None):
+        try:
+            await bot.redis.set(key, digest)
+        except Exception as e:
+            log.warning("⚠️ Écriture du hash des commandes impossible (Redis) : %s", e)
+        return
+    try:
+        with open(COMMAND_HASH_FILE, "w") as f:
+            f.write(digest)
+    except OSError as e:
+        log.warning("⚠️ Écriture de %s impossible : %s", COMMAND_HASH_FILE, e)
+
+
+async def sync_commands_if_changed(bot) -> bool:
+    """`tree.sync()` seulement si les définitions ont changé depuis le dernier sync."""
+    digest = command_tree_hash(bot.tree)
+    key = f"commands:hash:{bot.application_id}"
+    if not FORCE_COMMAND_SYNC and await _stored_hash(bot, key) == digest:
+        log.info("✅ Commandes slash inchangées (%s), sync ignoré", digest[:12])
+        return False
+    synced = await bot.tree.sync()
+    await _store_hash(bot, key, digest)
+    log.info("✅ %s commandes slash synchronisées (%s)", len(synced), digest[:12])
+    return True
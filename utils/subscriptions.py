@@ -0,0 +1,110 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+log = logging.getLogger("subscriptions")
+
+SUBSCRIPTION_CACHE_TTL = int(os.getenv("SUBSCRIPTION_CACHE_TTL", "600"))        # 10 min
+SUBSCRIPTION_NEGATIVE_TTL = int(os.getenv("SUBSCRIPTION_NEGATIVE_TTL", "120"))  # 2 min
+INVALIDATION_CHANNEL = "memassistant:subscriptions"
+
+
+class SubscriptionService:
+    """Cache guild → expire_at partagé par tous les cogs.
+
+    - une entrée positive reste valide jusqu'à min(expire_at, TTL) : l'expiration
+      est comparée à l'heure courante, la guilde bascule inactive à la seconde près
+      sans requête ;
+    - les guildes sans abonnement (ou expirées) sont mises en cache négatif ;
+    - `invalidate` est diffusé sur Redis pour que chaque process recharge.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        # guild_id -> (expire_at | None, valide jusqu'à (monotonic))
+        self._cache: dict[int, tuple[datetime | None, float]] = {}
+        self._inflight: dict[int, asyncio.Future] = {}
+        self._listener: asyncio.Task | None = None
+
+    async def start(self):
+        await self.warm()
+        if getattr(self.bot, "redis", None) and self._listener is None:
+            self._listener = asyncio.create_task(self._listen_invalidations())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def warm(self):
+        rows = await self.bot.db.fetch("subscriptions.active", datetime.now(timezone.utc))
+        for row in rows:
+            self._store(row["server_id"], row["expire_at"])
+        log.info("✅ Subscription cache warmed (%s active guilds)", len(rows))
+
+    def _store(self, guild_id: int, expire_at: datetime | None):
+        now = time.monotonic()
+        if expire_at is None or expire_at <= datetime.now(timezone.utc):
+            valid_until = now + SUBSCRIPTION_NEGATIVE_TTL
+        else:
+            remaining = (expire_at - datetime.now(timezone.utc)).total_seconds()
+            valid_until = now + min(SUBSCRIPTION_CACHE_TTL, remaining)
+        self._cache[guild_id] = (expire_at, valid_until)
+
+    async def _fetch(self, guild_id: int) -> datetime | None:
+        row = await self.bot.db.fetchrow("subscriptions.by_server", guild_id)
+        expire_at = row["expire_at"] if row else None
+        self._store(guild_id, expire_at)
+        return expire_at
+
+    async def get_expire_at(self, guild_id: int) -> datetime | None:
+        cached = self._cache.get(guild_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        # Une seule requête en vol par guilde, même sous une rafale de spawns
+        pending = self._inflight.get(guild_id)
+        if pending:
+            return await asyncio.shield(pending)
+        future = asyncio.ensure_future(self._fetch(guild_id))
+        self._inflight[guild_id] = future
+        try:
+            return await future
+        finally:
+            self._inflight.pop(guild_id, None)
+
+    async def is_active(self, guild_id: int) -> bool:
+        expire_at = await self.get_expire_at(guild_id)
+        return expire_at is not None and expire_at > datetime.now(timezone.utc)
+
+    async def invalidate(self, guild_id: int, broadcast: bool = True):
+        self._cache.pop(guild_id, None)
+        if not broadcast or not getattr(self.bot, "redis", None):
+            return
+        try:
+            await self.bot.redis.publish(INVALIDATION_CHANNEL, str(guild_id))
+        except Exception as e:
+            log.error("❌ Impossible de diffuser l'invalidation d'abonnement: %s", e)
+
+    async def _listen_invalidations(self):
+        while True:
+            try:
+                # Le context manager ferme la connexion pub/sub, y compris sur erreur : pas de fuite par retry
+                async with self.bot.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        self._cache.pop(int(message["data"]), None)
+                        log.info("♻️ Subscription cache invalidated for %s", message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("❌ Subscription invalidation listener error: %s", e)
+                await asyncio.sleep(5)
@@ -0,0 +1,141 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Hashable
+
+log = logging.getLogger("write-behind")
+
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "250"))
+
+
+class WriteBehindWriter:
+    """Persistance différée des upserts/deletes de rappels.
+
+    Les écritures sont fusionnées par clé puis envoyées toutes les
+    WRITE_BEHIND_FLUSH_MS en `executemany`, dans une seule transaction par
+    flush : les upserts d'abord, puis les deletes. Un upsert remplace ce qui
+    le précède ; un delete (conditionnel côté SQL) ne supprime pas l'upsert
+    en attente, c'est la requête qui décide au flush. `register` prend les
+    noms des requêtes du Repository. `stop()` vide le tampon.
+    """
+
+    def __init__(self, bot, interval_ms: int = WRITE_BEHIND_FLUSH_MS):
+        self.bot = bot
+        self.interval = interval_ms / 1000
+        self._sql: dict[str, tuple[str, str]] = {}
+        self._upserts: dict[str, dict[Hashable, tuple]] = {}
+        self._deletes: dict[str, dict[Hashable, tuple]] = {}
+        # Lot en cours d'écriture : encore visible par pending() jusqu'au commit
+        self._flushing: tuple[dict[str, dict], dict[str, dict]] = ({}, {})
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.flushes = 0
+        self.rows = 0
+        self.last_batch = 0
+        self.max_batch = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def register(self, table: str, upsert_query: str, delete_query: str):
+        self._sql[table] = (upsert_query, delete_query)
+        self._upserts.setdefault(table, {})
+        self._deletes.setdefault(table, {})
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        log.info("🛑 Write-behind flushed (%s)", self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "flushes": self.flushes,
+            "rows": self.rows,
+            "last_batch": self.last_batch,
+            "max_batch": self.max_batch,
+            "avg_latency_ms": round(self.total_latency / self.flushes * 1000, 2) if self.flushes else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+            "pending": sum(map(len, self._upserts.values())) + sum(map(len, self._deletes.values())),
+        }
+
+    # --- API utilisée par les cogs ---
+    def upsert(self, table: str, key: Hashable, args: tuple):
+        self._deletes[table].pop(key, None)
+        self._upserts[table][key] = args
+
+    def delete(self, table: str, key: Hashable, args: tuple):
+        # L'upsert en attente est gardé : il part avant le delete, dont la condition SQL tranche
+        self._deletes[table][key] = args
+
+    def pending(self, table: str, key: Hashable) -> tuple[tuple | None, tuple | None]:
+        """(upsert, delete) pas encore commités pour la clé, tampon puis lot en cours d'écriture."""
+        upsert = self._upserts[table].get(key)
+        delete = self._deletes[table].get(key)
+        if upsert is None:
+            flushing_upserts, flushing_deletes = self._flushing
+            upsert = flushing_upserts.get(table, {}).get(key)
+            if delete is None:
+                delete = flushing_deletes.get(table, {}).get(key)
+        return upsert, delete
+
+    # --- Flush ---
+    def _requeue(self, upserts: dict, deletes: dict):
+        # Une opération arrivée pendant le flush est plus récente que le lot échoué :
+        # un upsert récent rend caduc tout le lot pour la clé, un delete récent remplace le sien
+        for table, ops in deletes.items():
+            for key, args in ops.items():
+                if key not in self._upserts[table]:
+                    self._deletes[table].setdefault(key, args)
+        for table, ops in upserts.items():
+            for key, args in ops.items():
+                self._upserts[table].setdefault(key, args)
+
+    async def flush(self):
+        async with self._lock:
+            upserts = {t: ops for t, ops in self._upserts.items() if ops}
+            deletes = {t: ops for t, ops in self._deletes.items() if ops}
+            if not upserts and not deletes:
+                return
+            for table in self._sql:
+                self._upserts[table] = {}
+                self._deletes[table] = {}
+
+            batch = sum(map(len, upserts.values())) + sum(map(len, deletes.values()))
+            started = time.perf_counter()
+            self._flushing = (upserts, deletes)
+            try:
+                async with self.bot.db.transaction() as conn:
+                    for table, ops in upserts.items():
+                        await self.bot.db.executemany(self._sql[table][0], list(ops.values()), conn=conn)
+                    for table, ops in deletes.items():
+                        await self.bot.db.executemany(self._sql[table][1], list(ops.values()), conn=conn)
+            except Exception as e:
+                self._requeue(upserts, deletes)
+                log.error("❌ Write-behind flush of %s rows failed: %s", batch, e)
+                return
+            finally:
+                self._flushing = ({}, {})
+
+            latency = time.perf_counter() - started
+            self.flushes += 1
+            self.rows += batch
+            self.last_batch = batch
+            self.max_batch = max(self.max_batch, batch)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            log.debug("💾 Write-behind: %s rows in %.1fms", batch, latency * 1000)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()